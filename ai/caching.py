@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from magictale.api.cache import get_version, bump_version, bump_versions
+from .models import StoryProject
+
+STORY_VERSION_KEY = "story_version_{project_id}"
+STORY_RESPONSE_KEY = "story_response_{project_id}"
+LIBRARY_VERSION_KEY = "library_version_{user_id}"
+CACHEABLE_STATUSES = {StoryProject.Status.DONE, StoryProject.Status.FAILED, StoryProject.Status.CANCELED}
+
+
+def story_version_key(project_id: int) -> str:
+    return STORY_VERSION_KEY.format(project_id=project_id)
+
+
+def get_story_version(project_id: int) -> int:
+    return get_version(story_version_key(project_id))
+
+
+def get_library_version(user_id: int) -> int:
+    return get_version(LIBRARY_VERSION_KEY.format(user_id=user_id))
+
+
+def get_cached_story_responses(project_ids, user_id: int) -> dict[int, tuple[int, bytes | None]]:
+    """Maps each story to its current version and, if still valid for this user, its cached response body.
+
+    One round trip for any number of stories."""
+    keys = {pid: (story_version_key(pid), STORY_RESPONSE_KEY.format(project_id=pid)) for pid in project_ids}
+    cached = cache.get_many([key for pair in keys.values() for key in pair])
+
+    results = {}
+    for pid, (version_key, response_key) in keys.items():
+        if cached.get(version_key) is None:
+            results[pid] = (get_story_version(pid), None)
+            continue
+        current_version, entry = int(cached[version_key]), cached.get(response_key)
+        if entry and entry[0] == current_version and entry[1] == user_id:
+            results[pid] = (current_version, entry[2])
+        else:
+            results[pid] = (current_version, None)
+    return results
+
+
+def get_cached_story_response(project_id: int, user_id: int) -> tuple[int, bytes | None]:
+    return get_cached_story_responses([project_id], user_id)[project_id]
+
+
+def cache_story_response(project: StoryProject, version: int, data) -> bytes:
+    """Renders `data` and stores it if the story is finished. Returns the rendered bytes.
+
+    `version` must be read before `data` was serialized, so a concurrent bump leaves the entry unusable."""
+    content = JSONRenderer().render(data)
+    if project.status in CACHEABLE_STATUSES:
+        cache.set(
+            STORY_RESPONSE_KEY.format(project_id=project.pk),
+            (version, project.user_id, content),
+            timeout=settings.STORY_RESPONSE_CACHE_SECONDS,
+        )
+    return content
+
+
+def invalidate_story(project_id: int, parent_project_id: int | None = None, user_id: int | None = None) -> None:
+    bump_version(story_version_key(project_id))
+    if parent_project_id:
+        bump_version(story_version_key(parent_project_id))
+    if user_id:
+        bump_version(LIBRARY_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_stories(project_ids, user_id: int | None = None) -> None:
+    keys = [story_version_key(pid) for pid in project_ids]
+    if user_id:
+        keys.append(LIBRARY_VERSION_KEY.format(user_id=user_id))
+    bump_versions(keys)
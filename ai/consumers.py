@@ -1,28 +1,46 @@
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from magictale.api.throttling import consume, parse_rate
+from magictale.realtime import user_group_name
 from .models import StoryProject
+from . import progress
+
+ACTIVE_STATUSES = (StoryProject.Status.PENDING, StoryProject.Status.RUNNING)
+
+
+async def _admit(consumer) -> bool:
+    """Shared connect checks: an authenticated user within the connect rate. Closes the socket otherwise."""
+    if not consumer.user or not consumer.user.is_authenticated:
+        await consumer.close(code=4001)
+        return False
+
+    limit, period = parse_rate(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['ws_connect'])
+    allowed, _retry_after = await sync_to_async(consume)(f"ws_connect_{consumer.user.id}", limit, period)
+    if not allowed:
+        await consumer.close(code=4429)
+        return False
+    return True
+
 
 class StoryProgressConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.project_id = self.scope["url_route"]["kwargs"]["project_id"]
-        self.group_name = f"story_{self.project_id}"
+        self.group_name = progress.group_name(self.project_id)
         self.user = self.scope.get("user")
+        # Reconnecting clients pass the last seq they saw; anything newer arrives as one snapshot.
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            self.last_seq = int(query.get("last_seq", ["0"])[0])
+        except ValueError:
+            self.last_seq = 0
 
-        if not self.user or not self.user.is_authenticated:
-            await self.close(code=4001)
+        if not await _admit(self):
             return
 
-        rate_limit_key = f"ws_throttle_{self.user.id}"
-        attempts = cache.get(rate_limit_key, 0)
-        
-        if attempts >= 20:
-            await self.close(code=4429)
-            return
-            
-        cache.set(rate_limit_key, attempts + 1, timeout=60)
-
         if not await self._is_project_owner():
             await self.close(code=4003)
             return
@@ -30,6 +48,10 @@ class StoryProgressConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        snapshot = await sync_to_async(progress.get_snapshot, thread_sensitive=False)(self.project_id)
+        if snapshot:
+            await self.progress({"event": snapshot})
+
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
@@ -37,8 +59,126 @@ class StoryProgressConsumer(AsyncWebsocketConsumer):
         pass
 
     async def progress(self, event):
-        await self.send(json.dumps(event["event"]))
+        snapshot = event["event"]
+        seq = snapshot.get("seq", 0)
+        if seq and seq <= self.last_seq:
+            return
+        self.last_seq = seq or self.last_seq
+        await self.send(json.dumps(snapshot))
 
     @database_sync_to_async
     def _is_project_owner(self):
-        return StoryProject.objects.filter(id=self.project_id, user=self.user).exists()
\ No newline at end of file
+        return StoryProject.objects.filter(id=self.project_id, user_id=self.user.id).exists()
+
+
+class UserRealtimeConsumer(AsyncWebsocketConsumer):
+    """One socket per user, multiplexing story progress, subscription updates and new notifications.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "topics": [...]} where a topic is "stories",
+    "subscription", "notifications" or "story:<id>". Every message sent is {"topic": ..., "data": ...}."""
+
+    TOPICS = {"stories", "subscription", "notifications"}
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+        self.topics = set(self.TOPICS)
+        self.story_groups = set()
+        self.last_seq = {}
+
+        if not await _admit(self):
+            return
+
+        self.group_name = user_group_name(self.user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        for project_id in await self._active_project_ids():
+            await self._follow_story(project_id)
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for project_id in list(self.story_groups):
+            await self._unfollow_story(project_id)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or "")
+            action, topics = message["action"], message["topics"]
+        except (ValueError, KeyError, TypeError):
+            await self._emit("error", {"detail": "Expected {\"action\": ..., \"topics\": [...]}."})
+            return
+
+        for topic in topics:
+            if isinstance(topic, str) and topic.startswith("story:") and topic[6:].isdigit():
+                project_id = int(topic[6:])
+                if action == "subscribe" and await self._is_project_owner(project_id):
+                    await self._follow_story(project_id)
+                elif action == "unsubscribe":
+                    await self._unfollow_story(project_id)
+            elif topic in self.TOPICS:
+                if action == "subscribe" and topic not in self.topics:
+                    self.topics.add(topic)
+                    if topic == "stories":
+                        for project_id in await self._active_project_ids():
+                            await self._follow_story(project_id)
+                elif action == "unsubscribe" and topic in self.topics:
+                    self.topics.discard(topic)
+                    if topic == "stories":
+                        for project_id in list(self.story_groups):
+                            await self._unfollow_story(project_id)
+
+    async def _emit(self, topic, data, **extra):
+        await self.send(json.dumps({"topic": topic, **extra, "data": data}))
+
+    async def _follow_story(self, project_id: int):
+        if project_id not in self.story_groups:
+            self.story_groups.add(project_id)
+            await self.channel_layer.group_add(progress.group_name(project_id), self.channel_name)
+        snapshot = await sync_to_async(progress.get_snapshot, thread_sensitive=False)(project_id)
+        if snapshot:
+            await self.progress({"project_id": project_id, "event": snapshot})
+
+    async def _unfollow_story(self, project_id: int):
+        if project_id in self.story_groups:
+            self.story_groups.discard(project_id)
+            self.last_seq.pop(project_id, None)
+            await self.channel_layer.group_discard(progress.group_name(project_id), self.channel_name)
+
+    async def progress(self, event):
+        project_id, snapshot = int(event["project_id"]), event["event"]
+        seq = snapshot.get("seq", 0)
+        if project_id not in self.story_groups or (seq and seq <= self.last_seq.get(project_id, 0)):
+            return
+        self.last_seq[project_id] = seq
+        await self._emit("stories", snapshot, project_id=project_id)
+        if snapshot.get("status") in progress.TERMINAL_STATUSES:
+            await self._unfollow_story(project_id)
+
+    async def story_started(self, event):
+        if "stories" in self.topics:
+            await self._follow_story(int(event["project_id"]))
+
+    async def send_subscription_update(self, event):
+        if "subscription" in self.topics:
+            await self._emit("subscription", event["status_data"])
+
+    async def notification_created(self, event):
+        if "notifications" in self.topics:
+            await self._emit("notifications", event["notification"])
+            if event.get("unread_count") is not None:
+                await self._emit("unread_count", {"count": event["unread_count"]})
+
+    async def unread_count(self, event):
+        if "notifications" in self.topics:
+            await self._emit("unread_count", {"count": event["count"]})
+
+    @database_sync_to_async
+    def _active_project_ids(self):
+        return list(
+            StoryProject.objects.filter(user_id=self.user.id, status__in=ACTIVE_STATUSES).values_list("id", flat=True)[:50]
+        )
+
+    @database_sync_to_async
+    def _is_project_owner(self, project_id):
+        return StoryProject.objects.filter(id=project_id, user_id=self.user.id).exists()
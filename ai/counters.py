@@ -0,0 +1,150 @@
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField
+from django.utils import timezone
+from magictale.redis_client import get_redis_connection
+from .models import StoryProject, StoryCounterFlush
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("read_count", "likes_count", "shares_count")
+PENDING_KEY = "story_counters:{field}"
+FLUSHING_KEY = "story_counters:{field}:flushing"
+BATCH_KEY = "story_counters:batch"
+FLUSH_LOCK_KEY = "story_counters:flush_lock"
+SEEN_KEY = "story_counters_seen_{field}_{project_id}_{user_id}"
+FLUSH_CHUNK_SIZE = 500
+
+# Deletes the flush lock only while it still holds this run's token, so a run that outlived the lock
+# timeout can't release the lock a later run has since taken.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def increment(project_id: int, field: str, user_id: int | None = None, amount: int = 1) -> bool:
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f"Unknown story counter '{field}'.")
+
+    dedupe_seconds = settings.STORY_COUNTER_DEDUPE_SECONDS
+    if user_id is not None and dedupe_seconds:
+        seen_key = SEEN_KEY.format(field=field, project_id=project_id, user_id=user_id)
+        if not cache.add(seen_key, 1, timeout=dedupe_seconds):
+            return False
+
+    redis = get_redis_connection()
+    if redis is not None:
+        try:
+            redis.hincrby(PENDING_KEY.format(field=field), project_id, amount)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to buffer {field} for project {project_id}, writing through: {e}")
+
+    StoryProject.objects.filter(pk=project_id).update(**{field: F(field) + amount})
+    return True
+
+
+def pending_deltas(project_ids) -> dict[int, dict[str, int]]:
+    project_ids = list(project_ids)
+    redis = get_redis_connection()
+    if redis is None or not project_ids:
+        return {}
+
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for field in COUNTER_FIELDS:
+            pipe.hmget(PENDING_KEY.format(field=field), project_ids)
+            pipe.hmget(FLUSHING_KEY.format(field=field), project_ids)
+        results = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to read pending story counters: {e}")
+        return {}
+
+    deltas = {}
+    for i, field in enumerate(COUNTER_FIELDS):
+        pending, flushing = results[2 * i], results[2 * i + 1]
+        for project_id, a, b in zip(project_ids, pending, flushing):
+            delta = int(a or 0) + int(b or 0)
+            if delta:
+                deltas.setdefault(project_id, {})[field] = delta
+    return deltas
+
+
+def apply_pending(projects):
+    deltas = pending_deltas(p.pk for p in projects)
+    for project in projects:
+        for field, delta in deltas.get(project.pk, {}).items():
+            setattr(project, field, getattr(project, field) + delta)
+    return projects
+
+
+def flush() -> int:
+    """Adds the buffered deltas to StoryProject, one run at a time.
+
+    Each batch gets an id recorded in StoryCounterFlush in the same transaction as the updates, so a run
+    retried after a crash between commit and clearing Redis drops the batch instead of adding it twice.
+
+    Cached story responses are left alone: readers overlay the pending deltas, so moving them into the
+    table doesn't change the totals anyone sees."""
+    redis = get_redis_connection()
+    if redis is None:
+        return 0
+
+    token = uuid.uuid4().hex
+    if not redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=settings.STORY_COUNTER_FLUSH_LOCK_SECONDS):
+        logger.info("Story counter flush already running; skipping.")
+        return 0
+    try:
+        return _flush(redis)
+    finally:
+        redis.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+
+
+def _flush(redis) -> int:
+    batch_id = redis.get(BATCH_KEY)
+    if batch_id is None:
+        batch_id = uuid.uuid4().hex
+        redis.set(BATCH_KEY, batch_id)
+        for field in COUNTER_FIELDS:
+            pending_key, flushing_key = PENDING_KEY.format(field=field), FLUSHING_KEY.format(field=field)
+            if not redis.exists(flushing_key) and redis.exists(pending_key):
+                redis.rename(pending_key, flushing_key)
+    else:
+        # A leftover batch means the previous run died part-way; finish it before taking new deltas.
+        batch_id = batch_id.decode()
+
+    deltas = {}
+    for field in COUNTER_FIELDS:
+        for project_id, delta in redis.hgetall(FLUSHING_KEY.format(field=field)).items():
+            deltas.setdefault(int(project_id), {})[field] = int(delta)
+
+    if not deltas:
+        redis.delete(BATCH_KEY)
+        return 0
+
+    project_ids = sorted(deltas)
+    with transaction.atomic():
+        _, created = StoryCounterFlush.objects.get_or_create(batch_id=batch_id, defaults={"projects": len(project_ids)})
+        if not created:
+            logger.warning(f"Story counter batch {batch_id} was already applied; discarding it.")
+            project_ids = []
+        StoryCounterFlush.objects.filter(applied_at__lt=timezone.now() - timedelta(days=1)).delete()
+        for start in range(0, len(project_ids), FLUSH_CHUNK_SIZE):
+            chunk = project_ids[start:start + FLUSH_CHUNK_SIZE]
+            updates = {}
+            for field in COUNTER_FIELDS:
+                whens = [When(pk=pid, then=Value(deltas[pid][field])) for pid in chunk if field in deltas[pid]]
+                if whens:
+                    updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+            StoryProject.objects.filter(pk__in=chunk).update(**updates)
+
+    # One DEL for the hashes and the batch id, so they can't be cleared separately.
+    redis.delete(BATCH_KEY, *(FLUSHING_KEY.format(field=field) for field in COUNTER_FIELDS))
+    return len(project_ids)
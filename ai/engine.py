@@ -8,8 +8,8 @@ import shutil
 import tempfile
 from pathlib import Path
 from django.utils import timezone
+from django.db import transaction
 from asgiref.sync import sync_to_async
-from channels.layers import get_channel_layer
 from django.conf import settings
 from openai import AsyncOpenAI, RateLimitError, APIError, BadRequestError, AuthenticationError
 from elevenlabs.client import AsyncElevenLabs
@@ -19,6 +19,10 @@ from pydub import AudioSegment
 from django.utils.translation import gettext as _
 import logging
 from .models import StoryProject, GenerationEvent, StoryPage
+from .caching import invalidate_story
+from .progress import publish
+from magictale.realtime import send_to_user
+from .search import index_story
 from .prompts import get_story_prompts
 from elevenlabs import Voice, VoiceSettings
 from urllib.parse import urlparse
@@ -81,16 +85,21 @@ def _update_project_state(project: StoryProject, status: str = None, progress: i
     
     if changed: 
         project.save(update_fields=changed)
+        invalidate_story(project.pk, project.parent_project_id, project.user_id)
     
     return project.progress, project.status
 
 @sync_to_async
-def _delete_pages(project: StoryProject):
-    return project.pages.all().delete()
-
-@sync_to_async
-def _create_page(project: StoryProject, index: int, text: str) -> StoryPage:
-    return StoryPage.objects.create(project=project, index=index, text=text)
+def _replace_pages(project: StoryProject, page_texts: list[str]) -> list[StoryPage]:
+    with transaction.atomic():
+        project.pages.all().delete()
+        pages = StoryPage.objects.bulk_create(
+            [StoryPage(project=project, index=i, text=text) for i, text in enumerate(page_texts, start=1)]
+        )
+        project.page_count = len(pages)
+        project.save(update_fields=["page_count"])
+    invalidate_story(project.pk, project.parent_project_id, project.user_id)
+    return pages
 
 @sync_to_async
 def _create_variant_project(parent_project: StoryProject, choice_name: str) -> StoryProject:
@@ -115,11 +124,12 @@ def _create_variant_project(parent_project: StoryProject, choice_name: str) -> S
         progress=0,
         started_at=timezone.now()
     )
+    invalidate_story(parent_project.pk, user_id=parent_project.user_id)
+    send_to_user(parent_project.user_id, {"type": "story_started", "project_id": variant.pk})
     return variant
 
 async def _send(project_id: int, event: dict):
-    layer = get_channel_layer()
-    await layer.group_send(f"story_{project_id}", {"type": "progress", "event": event})
+    await publish(project_id, event)
 
 def _split_text_into_pages(full_text: str):
     lines = full_text.splitlines()
@@ -326,8 +336,7 @@ async def generate_text_logic(project_id: int):
 
             await _update_project_state(project, progress=30, text=full_text, model_used=model_to_use)
             page_texts = _split_text_into_pages(full_text)
-            await _delete_pages(project)
-            page_objects = [await _create_page(project, i, text) for i, text in enumerate(page_texts, start=1)]
+            page_objects = await _replace_pages(project, page_texts)
             await _save_event(project, "stage1_done", {"pages_created": len(page_objects)})
             
         except Exception as e:
@@ -349,6 +358,10 @@ async def generate_metadata_and_cover_logic(project_id: int):
         metadata = await _generate_synopsis_and_tags_async(project.text)
         image_metadata = await _generate_cover_image_async(metadata, project)
         await _update_project_state(project, progress=65, **metadata, **image_metadata)
+        try:
+            await sync_to_async(index_story)(project_id)
+        except Exception as e:
+            logger.warning(f"Failed to update search index for project {project_id}: {e}")
         await _save_event(project, "stage2_done", {})
     except Exception as e:
         await handle_generation_failure(project_id, e)
@@ -390,7 +403,7 @@ async def generate_audio_logic(project_id: int):
 
         if combined_audio is None:
             logger.warning(f"No valid audio generated for Project {project_id}. Completing text-only.")
-            await _update_project_state(project, status="done", progress=100, finished=True)
+            await _update_project_state(project, status="done", progress=100, finished=True, audio_failed=True)
             await _save_event(project, "done", {"warning": "Audio generation failed"})
             await _send(project_id, {"status": "done", "progress": 100, "message": _("Your story is ready (audio was unavailable).")})
             return
@@ -405,7 +418,8 @@ async def generate_audio_logic(project_id: int):
 
         await _update_project_state(project,
             audio_url=final_audio_url,
-            audio_duration_seconds=int(combined_audio.duration_seconds)
+            audio_duration_seconds=int(combined_audio.duration_seconds),
+            audio_failed=False
         )
 
         await _update_project_state(project, status="done", progress=100, finished=True)
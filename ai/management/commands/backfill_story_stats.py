@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, OuterRef
+
+from ai.models import StoryProject, GenerationEvent
+
+
+class Command(BaseCommand):
+    help = "Backfills the denormalized page_count and audio_failed columns on existing stories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        audio_failed_events = GenerationEvent.objects.filter(
+            project=OuterRef("pk"), kind="done", payload__warning="Audio generation failed"
+        )
+        last_id = 0
+        updated = 0
+
+        while True:
+            batch = list(
+                StoryProject.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .annotate(pages_total=Count("pages"), has_audio_failure=Exists(audio_failed_events))
+                .only("pk", "page_count", "audio_failed")[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+
+            changed = []
+            for project in batch:
+                if project.page_count != project.pages_total or project.audio_failed != project.has_audio_failure:
+                    project.page_count = project.pages_total
+                    project.audio_failed = project.has_audio_failure
+                    changed.append(project)
+            StoryProject.objects.bulk_update(changed, ["page_count", "audio_failed"])
+            updated += len(changed)
+            self.stdout.write(f"Processed stories up to id {last_id} ({updated} updated)")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill complete: {updated} stories updated."))
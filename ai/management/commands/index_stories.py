@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from ai.models import StoryProject
+from ai.search import index_stories
+
+
+class Command(BaseCommand):
+    help = "Builds the story full-text search index (Postgres tsvector or SQLite FTS5) for existing stories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        indexed = 0
+
+        while True:
+            project_ids = list(
+                StoryProject.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not project_ids:
+                break
+            index_stories(project_ids)
+            last_id = project_ids[-1]
+            indexed += len(project_ids)
+            self.stdout.write(f"Indexed stories up to id {last_id} ({indexed} total)")
+
+        self.stdout.write(self.style.SUCCESS(f"Search index built for {indexed} stories."))
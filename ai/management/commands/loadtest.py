@@ -0,0 +1,397 @@
+import asyncio
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+import httpx
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ai.caching import invalidate_stories
+from ai.models import StoryProject, StoryPage, GenerationEvent
+from authentication.models import UserProfile
+from authentication.serializers import MyTokenObtainPairSerializer
+from notifications.models import Notification
+from subscription.models import Subscription
+
+# Every seeded row belongs to a user with this address, so --cleanup can find and delete them. The
+# reserved .invalid domain means no real account can ever match.
+LOADTEST_EMAIL_PREFIX = "loadtest+"
+LOADTEST_EMAIL_DOMAIN = "@loadtest.invalid"
+# Keeps the debug toolbar (INTERNAL_IPS) out of the measured request path.
+LOADTEST_CLIENT_ADDR = "10.0.0.2"
+
+THEMES = list(settings.ALL_THEMES_DATA.keys())
+ART_STYLES = [style["id"] for style in settings.ALL_ART_STYLES_DATA]
+EVENT_KINDS = ["stage1_start", "stage1_done", "stage2_start", "stage2_done", "stage3_start", "done"]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    p95_ms: float
+    max_queries: int
+    body: dict | None = None
+    # Measure queries with the per-story response cache invalidated, i.e. the serializer path.
+    cold_story_cache: bool = False
+
+    def build_path(self, vclient) -> str:
+        return self.path.format(
+            story_id=random.choice(vclient.story_ids),
+            remixed_story_id=random.choice(vclient.remixed_story_ids or vclient.story_ids),
+            story_ids=",".join(map(str, random.sample(vclient.story_ids, min(10, len(vclient.story_ids))))),
+        )
+
+
+@dataclass
+class VirtualClient:
+    user_id: int
+    token: str
+    story_ids: list
+    remixed_story_ids: list
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+STORY_CREATE_BODY = {
+    "hero": {
+        "child_name": "Leo",
+        "age": 5,
+        "pronouns": "he/him",
+        "favorite_animal": "Lion",
+        "favorite_color": "Blue",
+    },
+    "theme": "space",
+    "art_style": "pixar",
+    "voice": settings.ALL_NARRATOR_VOICES[0],
+    "length": "short",
+    "difficulty": 2,
+}
+
+ENDPOINT_BUDGETS = [
+    Endpoint("library", "GET", "/api/ai/stories/", p95_ms=250, max_queries=2),
+    Endpoint("library_cursor", "GET", "/api/ai/stories/?pagination=cursor", p95_ms=250, max_queries=1),
+    Endpoint("library_search", "GET", "/api/ai/stories/?q=magic%20adv", p95_ms=250, max_queries=3),
+    Endpoint("story_detail", "GET", "/api/ai/stories/{story_id}/", p95_ms=150, max_queries=3),
+    Endpoint("story_detail_uncached", "GET", "/api/ai/stories/{story_id}/", p95_ms=250, max_queries=3, cold_story_cache=True),
+    # Same budget as story_detail_uncached: variant count must not change the query count.
+    Endpoint("story_detail_variants", "GET", "/api/ai/stories/{remixed_story_id}/", p95_ms=250, max_queries=3, cold_story_cache=True),
+    Endpoint("story_batch", "GET", "/api/ai/stories/batch/?ids={story_ids}", p95_ms=400, max_queries=2, cold_story_cache=True),
+    Endpoint("generation_options", "GET", "/api/ai/generation-options/", p95_ms=100, max_queries=0),
+    Endpoint("profile", "GET", "/api/auth/profile/", p95_ms=100, max_queries=0),
+    Endpoint("notifications", "GET", "/api/notifications/", p95_ms=150, max_queries=2),
+    Endpoint("notifications_cursor", "GET", "/api/notifications/?pagination=cursor", p95_ms=150, max_queries=1),
+    Endpoint("unread_count", "GET", "/api/notifications/unread-count/", p95_ms=50, max_queries=0),
+    Endpoint("story_create", "POST", "/api/ai/stories/", p95_ms=300, max_queries=7, body=STORY_CREATE_BODY),
+]
+
+
+def loadtest_users():
+    return User.objects.filter(username__startswith=LOADTEST_EMAIL_PREFIX, username__endswith=LOADTEST_EMAIL_DOMAIN)
+
+
+def user_factory(index: int, password_hash: str) -> User:
+    email = f"{LOADTEST_EMAIL_PREFIX}{index}{LOADTEST_EMAIL_DOMAIN}"
+    return User(
+        username=email, email=email, password=password_hash,
+        first_name="Load", last_name=f"Tester {index}", is_active=True,
+    )
+
+
+def subscription_factory(user_id: int, now) -> Subscription:
+    return Subscription(
+        user_id=user_id, plan="trial", status="trialing",
+        trial_start=now, trial_end=now + timedelta(days=3650),
+    )
+
+
+def story_factory(user_id: int, index: int, page_count: int) -> StoryProject:
+    status = StoryProject.Status.DONE if index % 10 else StoryProject.Status.FAILED
+    return StoryProject(
+        user_id=user_id,
+        title=f"The Magic Adventure #{index}",
+        child_name=random.choice(["Leo", "Mia", "Ava", "Noah", "Zara", "Omar"]),
+        age=random.randint(3, 9),
+        pronouns="they/them",
+        favorite_animal=random.choice(["Lion", "Owl", "Dolphin", "Fox"]),
+        favorite_color=random.choice(["Blue", "Red", "Green", "Yellow"]),
+        theme=random.choice(THEMES),
+        art_style=random.choice(ART_STYLES),
+        text="Once upon a time...\n\n" * 12,
+        synopsis="A wonderful and magical adventure through a land of wonder.",
+        tags="Adventure, Magic, Friendship",
+        image_url=f"/media/covers/story_{index}_cover.png",
+        cover_image_url=f"/media/covers/story_{index}_cover.png",
+        audio_url=f"/media/audio/story_{index}_full.mp3",
+        audio_duration_seconds=random.randint(60, 600),
+        audio_failed=index % 7 == 0,
+        page_count=page_count,
+        is_saved=index % 3 != 0,
+        status=status,
+        progress=100,
+        read_count=random.randint(0, 500),
+    )
+
+
+def variant_factory(parent: StoryProject, index: int) -> StoryProject:
+    return StoryProject(
+        user_id=parent.user_id,
+        parent_project_id=parent.pk,
+        title=f"{parent.title} (Variant {index})",
+        child_name=parent.child_name,
+        age=parent.age,
+        pronouns=parent.pronouns,
+        favorite_animal=parent.favorite_animal,
+        favorite_color=parent.favorite_color,
+        theme=parent.theme,
+        art_style=parent.art_style,
+        custom_prompt=f"Variant based on choice: {index}",
+        text=parent.text,
+        synopsis=parent.synopsis,
+        audio_url=parent.audio_url,
+        audio_failed=index % 2 == 0,
+        page_count=parent.page_count,
+        status=StoryProject.Status.DONE,
+        progress=100,
+    )
+
+
+def page_factory(project_id: int, index: int) -> StoryPage:
+    return StoryPage(project_id=project_id, index=index, text="Once upon a time...\n\n" * 3)
+
+
+def event_factory(project_id: int, kind: str) -> GenerationEvent:
+    return GenerationEvent(project_id=project_id, kind=kind, payload={})
+
+
+def notification_factory(user_id: int, index: int) -> Notification:
+    if index % 2:
+        return Notification(user_id=user_id, title="Your Story is Ready!", body="The adventure is complete and waiting for you.", read=index % 5 != 0)
+    return Notification(user_id=user_id, title="We're Building Your Story!", body="Your magical adventure is now being created.", read=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds realistic data volumes and runs concurrent authenticated clients against the ASGI app, "
+        "asserting p95 latency and query-count budgets for the hottest endpoints. "
+        "Runs entirely in-process: Celery tasks are routed to an in-memory broker and never executed. "
+        "It writes to the configured database, so it refuses to run with DEBUG off unless --allow-nondebug is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Seed load-test data before running.")
+        parser.add_argument("--seed-only", action="store_true", help="Seed load-test data and exit.")
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--stories-per-user", type=int, default=50)
+        parser.add_argument("--pages-per-story", type=int, default=4)
+        parser.add_argument("--variants-per-story", type=int, default=3, help="Variants seeded for every fifth story.")
+        parser.add_argument("--notifications-per-user", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--clients", type=int, default=100, help="Number of distinct authenticated users issuing requests.")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=200, help="Requests issued per endpoint.")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only run the named endpoint(s).")
+        parser.add_argument("--no-assert", action="store_true", help="Report results without failing on budget violations.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the load-test users and everything under them, then exit.")
+        parser.add_argument(
+            "--allow-nondebug", action="store_true",
+            help="Run even though DEBUG is off. Seeding and POST endpoints write to whatever DATABASE_URL points at.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["allow_nondebug"]:
+            raise CommandError(
+                f"DEBUG is off, so '{connection.settings_dict['NAME']}' may be a real database. "
+                "Point DATABASE_URL at a disposable one, or pass --allow-nondebug."
+            )
+        self._isolate_celery()
+
+        if options["cleanup"]:
+            self.cleanup(options["batch_size"])
+            return
+
+        if options["seed"] or options["seed_only"]:
+            self.seed(options)
+            if options["seed_only"]:
+                return
+
+        endpoints = ENDPOINT_BUDGETS
+        if options["endpoints"]:
+            endpoints = [e for e in ENDPOINT_BUDGETS if e.name in options["endpoints"]]
+            if not endpoints:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(options['endpoints'])}")
+
+        vclients = self._build_clients(options["clients"])
+        if not vclients:
+            raise CommandError("No load-test users with stories found. Run with --seed first.")
+
+        violations = []
+        self.stdout.write(f"{'endpoint':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'budget':>10}{'queries':>9}{'budget':>8}")
+        for endpoint in endpoints:
+            query_count = self._measure_queries(endpoint, vclients[0])
+            latencies, errors = asyncio.run(self._run_endpoint(endpoint, vclients, options["requests"], options["concurrency"]))
+            close_old_connections()
+
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=100)[94] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(
+                f"{endpoint.name:<22}{len(latencies):>10}{errors:>8}{p50:>10.1f}{p95:>10.1f}{endpoint.p95_ms:>10.0f}"
+                f"{query_count:>9}{endpoint.max_queries:>8}"
+            )
+            if p95 > endpoint.p95_ms:
+                violations.append(f"{endpoint.name}: p95 {p95:.1f}ms exceeds budget of {endpoint.p95_ms:.0f}ms")
+            if query_count > endpoint.max_queries:
+                violations.append(f"{endpoint.name}: {query_count} queries exceeds budget of {endpoint.max_queries}")
+            if errors:
+                violations.append(f"{endpoint.name}: {errors} requests returned an error status")
+
+        if violations:
+            message = "Budget violations:\n  " + "\n  ".join(violations)
+            if options["no_assert"]:
+                self.stdout.write(self.style.WARNING(message))
+            else:
+                raise CommandError(message)
+        else:
+            self.stdout.write(self.style.SUCCESS("All endpoints within budget."))
+
+    def _isolate_celery(self):
+        from magictale.celery import app as celery_app
+        celery_app.conf.broker_url = "memory://"
+
+    def seed(self, options):
+        batch_size = options["batch_size"]
+        existing = loadtest_users().count()
+        if existing >= options["users"]:
+            self.stdout.write(f"{existing} load-test users already seeded, skipping.")
+            return
+
+        started = time.perf_counter()
+        now = timezone.now()
+        password_hash = make_password("LoadTest123!")
+
+        for start in range(existing, options["users"], batch_size):
+            end = min(start + batch_size, options["users"])
+            users = User.objects.bulk_create([user_factory(i, password_hash) for i in range(start, end)])
+            user_ids = [u.pk for u in users]
+            UserProfile.objects.bulk_create([UserProfile(user_id=uid) for uid in user_ids])
+            Subscription.objects.bulk_create([subscription_factory(uid, now) for uid in user_ids])
+            self._seed_stories(user_ids, options)
+            Notification.objects.bulk_create(
+                (notification_factory(uid, i) for uid in user_ids for i in range(options["notifications_per_user"])),
+                batch_size=batch_size,
+            )
+            self.stdout.write(f"Seeded users {start}-{end} ({time.perf_counter() - started:.0f}s elapsed)")
+
+        self.stdout.write(self.style.SUCCESS(f"Seeding complete in {time.perf_counter() - started:.0f}s."))
+
+    def cleanup(self, batch_size: int):
+        # Stories, pages, events, notifications and subscriptions cascade from the users.
+        deleted = 0
+        while True:
+            user_ids = list(loadtest_users().values_list("pk", flat=True)[:batch_size])
+            if not user_ids:
+                break
+            User.objects.filter(pk__in=user_ids).delete()
+            deleted += len(user_ids)
+            self.stdout.write(f"Deleted {deleted} load-test users")
+        self.stdout.write(self.style.SUCCESS(f"Cleanup complete: {deleted} load-test users removed."))
+
+    def _seed_stories(self, user_ids, options):
+        batch_size = options["batch_size"]
+        stories = [
+            story_factory(uid, i, options["pages_per_story"])
+            for uid in user_ids for i in range(options["stories_per_user"])
+        ]
+        for offset in range(0, len(stories), batch_size):
+            created = StoryProject.objects.bulk_create(stories[offset:offset + batch_size])
+            created += StoryProject.objects.bulk_create(
+                [variant_factory(parent, v) for parent in created[::5] for v in range(1, options["variants_per_story"] + 1)],
+                batch_size=batch_size,
+            )
+            project_ids = [p.pk for p in created]
+            StoryPage.objects.bulk_create(
+                (page_factory(pid, i) for pid in project_ids for i in range(1, options["pages_per_story"] + 1)),
+                batch_size=batch_size,
+            )
+            GenerationEvent.objects.bulk_create(
+                (event_factory(pid, kind) for pid in project_ids for kind in EVENT_KINDS),
+                batch_size=batch_size,
+            )
+
+    def _build_clients(self, count: int) -> list[VirtualClient]:
+        users = list(
+            loadtest_users().filter(story_projects__isnull=False)
+            .select_related("subscription").distinct().order_by("id")[:count]
+        )
+        vclients = []
+        for user in users:
+            story_ids = list(
+                StoryProject.objects.filter(user=user, parent_project__isnull=True)
+                .order_by("-created_at").values_list("id", flat=True)[:50]
+            )
+            remixed_story_ids = list(
+                StoryProject.objects.filter(user=user, variants__isnull=False)
+                .distinct().values_list("id", flat=True)[:50]
+            )
+            token = str(MyTokenObtainPairSerializer.get_token(user).access_token)
+            vclients.append(VirtualClient(user_id=user.id, token=token, story_ids=story_ids, remixed_story_ids=remixed_story_ids))
+        return vclients
+
+    def _measure_queries(self, endpoint: Endpoint, vclient: VirtualClient) -> int:
+        client = Client(
+            SERVER_NAME="localhost", REMOTE_ADDR=LOADTEST_CLIENT_ADDR,
+            HTTP_AUTHORIZATION=vclient.headers["Authorization"],
+        )
+        path = endpoint.build_path(vclient)
+
+        def request():
+            if endpoint.method == "GET":
+                return client.get(path, secure=True)
+            return client.post(path, data=endpoint.body, content_type="application/json", secure=True)
+
+        # Warm caches first so the budget reflects the steady state.
+        request()
+        if endpoint.cold_story_cache:
+            invalidate_stories(vclient.story_ids + vclient.remixed_story_ids)
+        with CaptureQueriesContext(connection) as ctx:
+            request()
+        return len(ctx.captured_queries)
+
+    async def _run_endpoint(self, endpoint: Endpoint, vclients, total: int, concurrency: int):
+        from magictale.asgi import application
+
+        if endpoint.method != "GET" and connection.vendor == "sqlite":
+            # SQLite serializes writers; concurrent POSTs would only measure lock contention.
+            concurrency = 1
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+        transport = httpx.ASGITransport(app=application, client=(LOADTEST_CLIENT_ADDR, 0))
+
+        async with httpx.AsyncClient(transport=transport, base_url="https://localhost") as http:
+            async def one(i: int):
+                nonlocal errors
+                vclient = vclients[i % len(vclients)]
+                path = endpoint.build_path(vclient)
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await http.request(endpoint.method, path, headers=vclient.headers, json=endpoint.body)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+
+            await asyncio.gather(*(one(i) for i in range(total)))
+
+        return latencies, errors
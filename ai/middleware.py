@@ -4,20 +4,23 @@ from channels.middleware import BaseMiddleware
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from jwt import decode as jwt_decode
 import jwt
 
 @database_sync_to_async
 def get_user_from_jwt(token_key: str):
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
+    from authentication.entitlements import claims_current
+    from authentication.identity import get_identity
     try:
-        UntypedToken(token_key)
+        token = UntypedToken(token_key)
+        if claims_current(token):
+            return TokenUser(token)
         decoded_data = jwt_decode(token_key, settings.SECRET_KEY, algorithms=[settings.SIMPLE_JWT['ALGORITHM']])
         user_id = decoded_data.get('user_id')
-        return User.objects.get(id=user_id)
-    except (InvalidToken, TokenError, jwt.ExpiredSignatureError, jwt.InvalidTokenError, User.DoesNotExist, Exception):
+        return get_identity(user_id) or AnonymousUser()
+    except (InvalidToken, TokenError, jwt.ExpiredSignatureError, jwt.InvalidTokenError, Exception):
         return AnonymousUser()
 
 class JWTAuthMiddleware(BaseMiddleware):
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyproject',
+            name='audio_failed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='storyproject',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_storyproject_audio_failed_storyproject_page_count'),
+        ('authentication', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storyproject',
+            index=models.Index(fields=['user', 'is_saved', 'created_at'], name='story_library_idx'),
+        ),
+    ]
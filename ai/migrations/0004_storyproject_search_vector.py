@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:44
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_storyproject_story_library_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyproject',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+    ]
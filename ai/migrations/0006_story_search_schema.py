@@ -0,0 +1,52 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+POSTGRES_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS story_search_vector_idx ON ai_storyproject USING gin (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS story_child_name_trgm_idx ON ai_storyproject USING gin (child_name gin_trgm_ops)",
+]
+SQLITE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ai_storyproject_fts USING fts5("
+    "title, child_name, tags, synopsis, text, tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+class PostgresTrigramExtension(TrigramExtension):
+    # CreateExtension skips other backends going forwards but not backwards.
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def create_search_schema(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for statement in POSTGRES_INDEXES:
+            schema_editor.execute(statement)
+    elif vendor == "sqlite":
+        schema_editor.execute(SQLITE_FTS_TABLE)
+
+
+def drop_search_schema(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS story_child_name_trgm_idx")
+        schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS story_search_vector_idx")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS ai_storyproject_fts")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; it keeps the story table writable meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('ai', '0005_storycounterflush'),
+    ]
+
+    operations = [
+        # A no-op outside Postgres. Fails the migration if the role may not create extensions, rather than
+        # leaving trigram search to fail at query time.
+        PostgresTrigramExtension(),
+        migrations.RunPython(create_search_schema, drop_search_schema),
+    ]
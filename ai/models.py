@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class StoryProject(models.Model):
@@ -35,6 +36,9 @@ class StoryProject(models.Model):
     image_url = models.URLField(max_length=1024, blank=True, default="")
     audio_url = models.URLField(max_length=1024, blank=True, default="")
     audio_duration_seconds = models.PositiveIntegerField(null=True, blank=True, help_text="The duration of the generated audio in seconds.")
+    audio_failed = models.BooleanField(default=False)
+    page_count = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
     synopsis = models.TextField(blank=True, default="")
     tags = models.CharField(max_length=255, blank=True, default="")
     cover_image_url = models.URLField(max_length=1024, blank=True, default="")
@@ -50,6 +54,11 @@ class StoryProject(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_saved", "created_at"], name="story_library_idx"),
+        ]
+
     def __str__(self):
         display_title = self.title if self.title else f"Story for {self.child_name}"
         return f"{display_title} ({self.user.username}) - {self.status}"
@@ -72,4 +81,13 @@ class GenerationEvent(models.Model):
     project = models.ForeignKey(StoryProject, on_delete=models.CASCADE, related_name="events")
     ts = models.DateTimeField(auto_now_add=True)
     kind = models.CharField(max_length=40)
-    payload = models.JSONField(default=dict, blank=True)
\ No newline at end of file
+    payload = models.JSONField(default=dict, blank=True)
+
+class StoryCounterFlush(models.Model):
+    """A buffered counter batch already added to StoryProject, so a retried flush skips it."""
+    batch_id = models.CharField(max_length=32, unique=True)
+    projects = models.PositiveIntegerField(default=0)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.batch_id
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from magictale.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "story_progress:{project_id}"
+TERMINAL_STATUSES = {"done", "failed", "canceled"}
+
+# Merges an event into the snapshot hash and returns the whole hash. A status change starts a fresh
+# snapshot so a stale message or error from the previous phase doesn't linger.
+RECORD_SCRIPT = """
+local status_changed = false
+for i = 2, #ARGV, 2 do
+    if ARGV[i] == 'status' then status_changed = true end
+end
+if status_changed then
+    redis.call('HDEL', KEYS[1], 'message', 'error')
+end
+redis.call('HINCRBY', KEYS[1], 'seq', 1)
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+_scripts = {}
+_pending = {}
+
+
+def group_name(project_id: int) -> str:
+    return f"story_{project_id}"
+
+
+def _decode(fields: dict) -> dict:
+    snapshot = {}
+    for field, value in fields.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        snapshot[field] = int(value) if field == "seq" else json.loads(value)
+    return snapshot
+
+
+def _script_for(redis):
+    script = _scripts.get(id(redis))
+    if script is None:
+        script = _scripts[id(redis)] = redis.register_script(RECORD_SCRIPT)
+    return script
+
+
+def record(project_id: int, event: dict) -> dict:
+    """Merges `event` into the story's progress snapshot and returns the snapshot with its new `seq`."""
+    key = SNAPSHOT_KEY.format(project_id=project_id)
+    ttl = settings.STORY_PROGRESS_TTL_SECONDS
+    redis = get_redis_connection()
+    if redis is not None:
+        try:
+            args = [ttl]
+            for field, value in event.items():
+                args += [field, json.dumps(value)]
+            flat = _script_for(redis)(keys=[key], args=args)
+            return _decode(dict(zip(flat[::2], flat[1::2])))
+        except Exception as e:
+            logger.warning(f"Failed to record progress for project {project_id}: {e}")
+            return {**event, "seq": 0}
+
+    snapshot = cache.get(key) or {"seq": 0}
+    if "status" in event:
+        snapshot.pop("message", None)
+        snapshot.pop("error", None)
+    snapshot = {**snapshot, **event, "seq": snapshot["seq"] + 1}
+    cache.set(key, snapshot, timeout=ttl)
+    return snapshot
+
+
+def get_snapshot(project_id: int) -> dict | None:
+    key = SNAPSHOT_KEY.format(project_id=project_id)
+    redis = get_redis_connection()
+    if redis is None:
+        return cache.get(key)
+    try:
+        fields = redis.hgetall(key)
+    except Exception as e:
+        logger.warning(f"Failed to read progress snapshot for project {project_id}: {e}")
+        return None
+    return _decode(fields) if fields else None
+
+
+async def _broadcast(project_id: int, snapshot: dict):
+    layer = get_channel_layer()
+    await layer.group_send(group_name(project_id), {"type": "progress", "project_id": project_id, "event": snapshot})
+
+
+async def _flush_later(project_id: int):
+    await asyncio.sleep(settings.STORY_PROGRESS_DEBOUNCE_MS / 1000)
+    snapshot = _pending.pop(project_id, (None, None))[1]
+    if snapshot is not None:
+        await _broadcast(project_id, snapshot)
+
+
+async def publish(project_id: int, event: dict):
+    """Records `event` and broadcasts the merged snapshot to the story's group.
+
+    Non-terminal events are coalesced: a burst within the debounce window goes out as one message
+    carrying the latest snapshot. Terminal events go out immediately."""
+    snapshot = await sync_to_async(record, thread_sensitive=False)(project_id, event)
+
+    if snapshot.get("status") in TERMINAL_STATUSES or settings.STORY_PROGRESS_DEBOUNCE_MS <= 0:
+        task, _ = _pending.pop(project_id, (None, None))
+        if task is not None:
+            task.cancel()
+        await _broadcast(project_id, snapshot)
+        return
+
+    pending = _pending.get(project_id)
+    if pending is not None and not pending[0].done():
+        _pending[project_id] = (pending[0], snapshot)
+    else:
+        _pending[project_id] = (asyncio.create_task(_flush_later(project_id)), snapshot)
+
+
+def publish_sync(project_id: int, event: dict):
+    snapshot = record(project_id, event)
+    async_to_sync(_broadcast)(project_id, snapshot)
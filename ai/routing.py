@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import StoryProgressConsumer
+from .consumers import StoryProgressConsumer, UserRealtimeConsumer
 
 websocket_urlpatterns = [
     re_path(r"^ws/ai/stories/(?P<project_id>\d+)/$", StoryProgressConsumer.as_asgi()),
+    re_path(r"^ws/realtime/$", UserRealtimeConsumer.as_asgi()),
 ]
\ No newline at end of file
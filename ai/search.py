@@ -0,0 +1,92 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+from .models import StoryProject
+
+# 'simple' avoids English stemming; stories are generated in many languages.
+SEARCH_CONFIG = "simple"
+MAX_QUERY_TERMS = 8
+FTS_TABLE = "ai_storyproject_fts"
+SQLITE_MAX_MATCHES = 500
+
+# pg_trgm, the GIN indexes and the SQLite FTS5 table are created by migration ai.0006_story_search_schema.
+
+
+def _search_vector():
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("child_name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("tags", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("synopsis", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("text", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def _terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())[:MAX_QUERY_TERMS]
+
+
+def index_stories(project_ids) -> None:
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+
+    if connection.vendor == "postgresql":
+        StoryProject.objects.filter(pk__in=project_ids).update(search_vector=_search_vector())
+    elif connection.vendor == "sqlite":
+        rows = StoryProject.objects.filter(pk__in=project_ids).values_list(
+            "pk", "title", "child_name", "tags", "synopsis", "text"
+        )
+        placeholders = ",".join("%s" for _ in project_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", project_ids)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, child_name, tags, synopsis, text) VALUES (%s, %s, %s, %s, %s, %s)",
+                list(rows),
+            )
+
+
+def index_story(project_id: int) -> None:
+    index_stories([project_id])
+
+
+def search_stories(queryset, q: str):
+    """Filters `queryset` to stories matching `q`, best match first. Every term is prefix-matched."""
+    terms = _terms(q)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == "postgresql":
+        query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+        # A story not yet indexed, or matched by hero name alone, has no text rank; NULL would sort first.
+        text_rank = Coalesce(SearchRank(F("search_vector"), query), Value(0.0), output_field=FloatField())
+        return (
+            queryset
+            .filter(Q(search_vector=query) | Q(child_name__trigram_similar=q))
+            .annotate(search_rank=text_rank + TrigramSimilarity("child_name", q))
+            .order_by("-search_rank", "-created_at", "-id")
+        )
+
+    if connection.vendor == "sqlite":
+        # Local-dev fallback: rank inside FTS5 once, then restrict the queryset to the best matches.
+        match = " ".join(f'"{term}"*' for term in terms)
+        scope_sql, scope_params = queryset.order_by().values("pk").query.sql_with_params()
+        # The unary + keeps SQLite from driving the plan off the rowid list and running MATCH per row.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({scope_sql}) "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 10.0, 5.0, 5.0, 1.0) LIMIT %s",
+                [match, *scope_params, SQLITE_MAX_MATCHES],
+            )
+            ranked_ids = [row[0] for row in cursor.fetchall()]
+        if not ranked_ids:
+            return queryset.none()
+        rank = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ranked_ids)], output_field=IntegerField())
+        return queryset.filter(pk__in=ranked_ids).annotate(search_rank=rank).order_by("search_rank", "-created_at", "-id")
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(child_name__icontains=term) | Q(tags__icontains=term) | Q(synopsis__icontains=term)
+    return queryset.filter(condition).order_by("-created_at", "-id")
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from .models import StoryProject, StoryPage
-from authentication.models import OnboardingStatus
+from authentication.models import OnboardingStatus, UserProfile
 from django.conf import settings
 from django.db import transaction
 from types import SimpleNamespace
+from authentication.entitlements import get_subscription
 from django.utils.translation import gettext as _
-from django.core.cache import cache
 
 class StoryPageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -29,43 +29,49 @@ class StoryProjectCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         user = self.context["request"].user
-        try:
-            subscription = user.subscription
-        except (AttributeError, user.subscription.RelatedObjectDoesNotExist):
-            subscription = SimpleNamespace(plan='trial', status='trialing')
+        subscription = get_subscription(self.context["request"]) or SimpleNamespace(plan='trial', status='trialing')
 
         is_master_plan = subscription.plan == 'master' and subscription.status == 'active'
         if is_master_plan:
             return data
 
-        profile = user.profile
+        add_art_style, add_narrator_voice = self._trial_additions(user.profile, data)
+        if add_art_style:
+            data['_add_art_style'] = add_art_style
+        if add_narrator_voice:
+            data['_add_narrator_voice'] = add_narrator_voice
+        
+        submitted_theme = data.get('theme')
+        if submitted_theme and submitted_theme not in settings.THEME_ID_TO_NAME_MAP:
+             raise serializers.ValidationError({
+                'theme': _("The theme '{submitted_theme}' is not a valid option.")
+            })
+
+        return data
+
+    def _trial_additions(self, profile, data):
         used_styles = set(profile.used_art_styles.split(',') if profile.used_art_styles else [])
         used_voices = set(profile.used_narrator_voices.split(',') if profile.used_narrator_voices else [])
 
         submitted_style = data.get('art_style')
         submitted_voice = data.get('voice')
-        
+        add_art_style = add_narrator_voice = None
+
         if submitted_style and submitted_style not in used_styles:
             if len(used_styles) >= 5:
                 raise serializers.ValidationError({
                     'art_style': _("You have already used your 5 available art styles for this trial period. Please upgrade to unlock all styles.")
                 })
-            data['_add_art_style'] = submitted_style 
+            add_art_style = submitted_style
 
         if submitted_voice and submitted_voice not in used_voices:
             if len(used_voices) >= 3:
                 raise serializers.ValidationError({
                     'voice': _("You have already used your 3 available narrator voices for this trial period. Please upgrade to unlock all voices.")
                 })
-            data['_add_narrator_voice'] = submitted_voice 
-        
-        submitted_theme = data.get('theme')
-        if submitted_theme and submitted_theme not in settings.THEME_ID_TO_NAME_MAP:
-             raise serializers.ValidationError({
-                'theme': _("The theme '{submitted_theme}' is not a valid option.")
-            })
+            add_narrator_voice = submitted_voice
 
-        return data
+        return add_art_style, add_narrator_voice
 
     def create(self, validated_data):
         with transaction.atomic():
@@ -80,7 +86,13 @@ class StoryProjectCreateSerializer(serializers.ModelSerializer):
                 setattr(onboarding_profile, attr, value)
             onboarding_profile.save()
             
-            profile = user.profile
+            if add_art_style or add_narrator_voice:
+                # request.user.profile comes from the identity cache and may be a few seconds old;
+                # recheck the trial limits against the locked row so concurrent requests can't overshoot them.
+                profile = UserProfile.objects.select_for_update().get(user=user)
+                add_art_style, add_narrator_voice = self._trial_additions(
+                    profile, {'art_style': add_art_style, 'voice': add_narrator_voice}
+                )
             update_fields = []
             
             if add_art_style:
@@ -134,13 +146,11 @@ class VariantSerializer(serializers.ModelSerializer):
         return None
 
     def get_audio_error(self, obj) -> str | None:
-        error_event = obj.events.filter(kind='done', payload__warning='Audio generation failed').first()
-        if error_event:
+        if obj.audio_failed:
             return _("Audio generation failed due to quota or service issues.")
         return None
 
 class StoryProjectDetailSerializer(serializers.ModelSerializer):
-    page_count = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
     audio_url = serializers.SerializerMethodField()
     audio_error = serializers.SerializerMethodField()
@@ -156,9 +166,7 @@ class StoryProjectDetailSerializer(serializers.ModelSerializer):
             "likes_count", "shares_count", "created_at", "started_at", "finished_at", "text", "image_url", "audio_url",
             "audio_duration_seconds", "audio_error", "page_count", "variants"
         ]
-    def get_page_count(self, obj) -> int:
-        return getattr(obj, 'page_count_annotated', obj.pages.count())
-        
+
     def get_image_url(self, obj) -> str | None:
         if obj.image_url:
             if settings.USE_S3_STORAGE or obj.image_url.startswith("http"):
@@ -174,27 +182,12 @@ class StoryProjectDetailSerializer(serializers.ModelSerializer):
         return None
 
     def get_audio_error(self, obj) -> str | None:
-        error_event = obj.events.filter(kind='done', payload__warning='Audio generation failed').first()
-        if error_event:
+        if obj.audio_failed:
             return _("Audio generation failed due to quota or service issues.")
         return None
     
     def get_variants(self, obj) -> list[dict]:
-        # We only cache variants when the story is DONE to avoid stale data during running phase
-        if obj.status == StoryProject.Status.DONE:
-            cache_key = f"story_variants_{obj.id}"
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
-            variants = obj.variants.all()
-            data = VariantSerializer(variants, many=True).data
-            cache.set(cache_key, data, timeout=300)
-            return data
-        
-        # fallback for running/pending stories
-        variants = obj.variants.all()
-        return VariantSerializer(variants, many=True).data
+        return VariantSerializer(obj.variants.all(), many=True).data
 
 class StoryProjectListSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
@@ -219,4 +212,10 @@ class StoryProjectListSerializer(serializers.ModelSerializer):
             if settings.USE_S3_STORAGE:
                 return obj.audio_url
             return f"{settings.BACKEND_BASE_URL}{obj.audio_url}"
-        return None
\ No newline at end of file
+        return None
+
+class StoryBulkActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=["save", "unsave", "delete"])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.STORY_BULK_MAX_IDS
+    )
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from authentication.identity import CachedJWTAuthentication
+from magictale.api.throttling import consume, parse_rate
+from .models import StoryProject
+from . import progress
+
+
+def _error(status_code: int, message, headers=None):
+    return JsonResponse(
+        {"success": False, "code": status_code, "message": str(message), "timestamp": int(time.time()), "data": None},
+        status=status_code, headers=headers,
+    )
+
+
+def _authenticate(request):
+    # EventSource can't set headers, so the access token may also come as ?token=.
+    auth = CachedJWTAuthentication()
+    try:
+        raw_token = request.GET.get("token")
+        if raw_token:
+            return auth.get_user(auth.get_validated_token(raw_token.encode()))
+        result = auth.authenticate(request)
+        return result[0] if result else None
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def _format(snapshot: dict) -> str:
+    return f"id: {snapshot.get('seq', 0)}\nevent: progress\ndata: {json.dumps(snapshot)}\n\n"
+
+
+async def _progress_stream(project_id: int, current: dict, last_seq: int):
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    group = progress.group_name(project_id)
+    await layer.group_add(group, channel)
+    try:
+        yield f"retry: {settings.STORY_EVENTS_RETRY_MS}\n\n"
+
+        snapshot = await sync_to_async(progress.get_snapshot, thread_sensitive=False)(project_id)
+        if snapshot is None and current["status"] in progress.TERMINAL_STATUSES:
+            # The snapshot expired long after the story finished; the row still knows how it ended.
+            snapshot = {"seq": 0, **current}
+
+        while True:
+            if snapshot is not None:
+                seq = snapshot.get("seq", 0)
+                if not seq or seq > last_seq:
+                    last_seq = seq or last_seq
+                    yield _format(snapshot)
+                if snapshot.get("status") in progress.TERMINAL_STATUSES:
+                    return
+
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), timeout=settings.STORY_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies and mobile networks from dropping an idle stream.
+                yield ": heartbeat\n\n"
+                snapshot = None
+                continue
+            snapshot = message.get("event")
+    finally:
+        await layer.group_discard(group, channel)
+
+
+async def story_events(request, pk: int):
+    """Server-Sent Events stream of a story's progress, for clients that can't open a websocket.
+
+    Sends the current state first, then each update, and ends after done, failed or canceled.
+    Resumes from the standard Last-Event-ID header."""
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _error(401, _("Authentication credentials were not provided or are invalid."))
+
+    limit, period = parse_rate(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['ws_connect'])
+    allowed, retry_after = await sync_to_async(consume)(f"ws_connect_{user.id}", limit, period)
+    if not allowed:
+        return _error(429, _("Too many connections. Please retry shortly."), headers={"Retry-After": str(int(retry_after) + 1)})
+
+    current = await StoryProject.objects.filter(pk=pk, user_id=user.id).values("status", "progress").afirst()
+    if current is None:
+        return _error(404, _("Story not found."))
+
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID") or request.GET.get("last_seq") or 0)
+    except ValueError:
+        last_seq = 0
+
+    response = StreamingHttpResponse(_progress_stream(pk, current, last_seq), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx buffers proxied responses; this header turns it off for the stream only.
+    response["X-Accel-Buffering"] = "no"
+    return response
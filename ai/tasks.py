@@ -3,7 +3,8 @@ from celery import shared_task, chain, group
 import asyncio
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .models import StoryProject
+from .models import StoryProject, StoryPage
+from . import counters
 from .engine import (
     _reload_project,
     _update_project_state,
@@ -172,10 +173,9 @@ async def remix_text_logic(project_id: int, choice_id: str):
 
     await _update_project_state(project, progress=30, text=new_full_text)
     
-    from .engine import _split_text_into_pages, _delete_pages, _create_page
+    from .engine import _split_text_into_pages, _replace_pages
     page_texts = _split_text_into_pages(new_full_text)
-    await _delete_pages(project)
-    await asyncio.gather(*[_create_page(project, i, text) for i, text in enumerate(page_texts, start=1)])
+    await _replace_pages(project, page_texts)
     await _save_event(project, "remix_done", {"pages_created": len(page_texts)})
 
 
@@ -411,4 +411,37 @@ def cleanup_stalled_projects_task():
         print(f"Successfully cleaned up {count} stalled projects.")
         
     except Exception as e:
-        print(f"Fatal error during cleanup task: {e}")
\ No newline at end of file
+        print(f"Fatal error during cleanup task: {e}")
+
+@shared_task
+def flush_story_counters_task():
+    try:
+        flushed = counters.flush()
+        if flushed:
+            print(f"Flushed buffered counters for {flushed} stories.")
+    except Exception as e:
+        print(f"Error flushing story counters: {e}")
+
+
+def collect_story_file_paths(project_ids) -> list[str]:
+    urls = []
+    for cover_image_url, image_url, audio_url in StoryProject.objects.filter(pk__in=project_ids).values_list('cover_image_url', 'image_url', 'audio_url'):
+        urls += [cover_image_url, image_url, audio_url]
+    urls += StoryPage.objects.filter(project_id__in=project_ids).exclude(audio_url="").values_list('audio_url', flat=True)
+    return sorted({urlparse(url).path.lstrip('/') for url in urls if url})
+
+@shared_task
+def delete_story_files_task(paths: list[str], project_ids: list[int]):
+    deleted = 0
+    for path in paths:
+        try:
+            if default_storage.exists(path):
+                default_storage.delete(path)
+                deleted += 1
+        except Exception as e:
+            print(f"Error deleting story file {path}: {e}")
+
+    for project_id in project_ids:
+        asyncio.run(_cleanup_audio_chunks(project_id))
+
+    print(f"Deleted {deleted} files for {len(project_ids)} deleted stories.")
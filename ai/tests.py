@@ -1,3 +1,128 @@
+from unittest import mock
+
+import fakeredis
+from django.contrib.auth.models import User
 from django.test import TestCase
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient
+
+from . import counters
+from .caching import get_story_version, invalidate_stories
+from .models import StoryProject
+
+
+class StoryDetailQueryCountTests(TestCase):
+    # Auth and permission lookups are warmed by a first request. What remains is the story, its variants
+    # and the read count update, which writes through when Redis is not configured.
+    DETAIL_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", email="reader@example.com", password="x")
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost", secure=True)
+        self.client.force_authenticate(self.user)
+
+    def _story(self, variants: int) -> StoryProject:
+        fields = dict(
+            user=self.user, child_name="Leo", age=5, pronouns="he/him", favorite_animal="Lion",
+            favorite_color="Blue", theme="space", art_style="pixar", status=StoryProject.Status.DONE,
+        )
+        story = StoryProject.objects.create(**fields)
+        StoryProject.objects.bulk_create([StoryProject(parent_project=story, **fields) for _ in range(variants)])
+        return story
+
+    def _get_detail(self, story: StoryProject):
+        invalidate_stories([story.pk])
+        response = self.client.get(f"/api/ai/stories/{story.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_detail_query_count_does_not_depend_on_variant_count(self):
+        one_variant, many_variants = self._story(1), self._story(25)
+        self._get_detail(self._story(0))
+
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self._get_detail(one_variant)
+        self.assertEqual(len(response.json()["data"]["variants"]), 1)
+
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self._get_detail(many_variants)
+        self.assertEqual(len(response.json()["data"]["variants"]), 25)
+
+
+class CounterFlushTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(counters, "get_redis_connection", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = User.objects.create_user(username="reader", email="reader@example.com", password="x")
+        self.story = StoryProject.objects.create(
+            user=user, child_name="Leo", age=5, pronouns="he/him", favorite_animal="Lion",
+            favorite_color="Blue", theme="space", art_style="pixar", status=StoryProject.Status.DONE,
+        )
+
+    def _read(self, times: int):
+        for _ in range(times):
+            counters.increment(self.story.pk, "read_count")
+
+    def _read_count(self) -> int:
+        return StoryProject.objects.get(pk=self.story.pk).read_count
+
+    def test_flush_applies_each_delta_once(self):
+        self._read(3)
+        version = get_story_version(self.story.pk)
+
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(counters.flush(), 0)
+
+        self.assertEqual(self._read_count(), 3)
+        self.assertEqual(counters.pending_deltas([self.story.pk]), {})
+        # Counter-only changes must not evict cached responses or change their ETags.
+        self.assertEqual(get_story_version(self.story.pk), version)
+
+    def test_batch_committed_before_a_crash_is_not_applied_twice(self):
+        self._read(3)
+        with mock.patch.object(self.redis, "delete", side_effect=RedisConnectionError("down")):
+            with self.assertRaises(RedisConnectionError):
+                counters.flush()
+        self.assertEqual(self._read_count(), 3)
+
+        # Reads that arrive meanwhile wait for the run after the leftover batch is cleared.
+        self._read(2)
+        self.assertEqual(counters.flush(), 0)
+        self.assertEqual(self._read_count(), 3)
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self._read_count(), 5)
+
+    def test_batch_renamed_before_a_crash_is_recovered(self):
+        self._read(3)
+        with mock.patch.object(counters.StoryCounterFlush.objects, "get_or_create", side_effect=RuntimeError("worker killed")):
+            with self.assertRaises(RuntimeError):
+                counters.flush()
+        self.assertEqual(self._read_count(), 0)
+        self.assertTrue(self.redis.exists(counters.BATCH_KEY))
+        self.assertEqual(counters.pending_deltas([self.story.pk]), {self.story.pk: {"read_count": 3}})
+
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self._read_count(), 3)
+
+    def test_lock_taken_over_mid_run_is_not_released(self):
+        self._read(1)
+
+        def outlive_the_lock(redis):
+            # The lock timed out and another run took it while this one was still working.
+            redis.set(counters.FLUSH_LOCK_KEY, "other-run")
+            return 0
+
+        with mock.patch.object(counters, "_flush", side_effect=outlive_the_lock):
+            counters.flush()
+        self.assertEqual(self.redis.get(counters.FLUSH_LOCK_KEY), b"other-run")
+        self.assertEqual(counters.flush(), 0)
 
-# Create your tests here.
+        self.redis.delete(counters.FLUSH_LOCK_KEY)
+        self.assertEqual(counters.flush(), 1)
+        self.assertIsNone(self.redis.get(counters.FLUSH_LOCK_KEY))
@@ -1,22 +1,15 @@
-from rest_framework.throttling import ScopedRateThrottle
-from django.utils import timezone
+from authentication.entitlements import get_subscription
+from magictale.api.throttling import ScopedGCRAThrottle
 
-class SubscriptionBasedThrottle(ScopedRateThrottle):
-    def allow_request(self, request, view):
-        user = request.user
+class SubscriptionBasedThrottle(ScopedGCRAThrottle):
+    def get_scope(self, request, view):
+        if getattr(view, 'action', None) != 'create':
+            return None
 
-        try:
-            subscription = user.subscription
-            is_active_or_grace = (
-                subscription.status == 'active' or 
-                (subscription.current_period_end and subscription.current_period_end > timezone.now())
-            )
-            
-            if is_active_or_grace:
-                self.scope = 'story_creation_paid'
-            else:
-                self.scope = 'story_creation_free'
-        except (AttributeError, user.subscription.RelatedObjectDoesNotExist):
-            self.scope = 'story_creation_free'
+        subscription = get_subscription(request)
+        if subscription is None:
+            return 'story_creation_free'
 
-        return super().allow_request(request, view)
\ No newline at end of file
+        if subscription.status == 'active':
+            return 'story_creation_paid'
+        return 'story_creation_free'
\ No newline at end of file
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import StoryProjectViewSet, GenerationOptionsView
+from .streams import story_events
 
 router = DefaultRouter()
 router.register(r"stories", StoryProjectViewSet, basename="stories")
 
 urlpatterns = [
+    path("stories/<int:pk>/events/", story_events, name="story-events"),
     path("", include(router.urls)),
     path("generation-options/", GenerationOptionsView.as_view(), name="generation-options"),
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
+import json
 from django.db import transaction
-from django.db.models import F, Count
+from django.http import HttpResponse
 from django.utils import timezone
-from asgiref.sync import async_to_sync
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,37 +11,56 @@ from django.conf import settings
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.utils.translation import gettext as _
 from django.core.cache import cache
-from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, inline_serializer
+from drf_spectacular.types import OpenApiTypes
 from rest_framework import serializers
-from .tasks import start_story_generation_pipeline, start_story_remix_pipeline
+from .tasks import start_story_generation_pipeline, start_story_remix_pipeline, collect_story_file_paths, delete_story_files_task
 from .models import StoryProject
+from . import counters, caching, search, progress
 from .serializers import (
     StoryProjectCreateSerializer,
     StoryProjectDetailSerializer,
     StoryProjectListSerializer,
+    StoryBulkActionSerializer,
 )
 from authentication.permissions import HasActiveSubscription, IsOwner, IsStoryMaster
+from magictale.api.pagination import HybridCursorPagination
+from magictale.api.renderers import render_prerendered
+from magictale.api import conditional
+from magictale.realtime import send_to_user
 from .throttling import SubscriptionBasedThrottle
 from notifications.tasks import create_and_send_notification_task
 
+def _library_etag(view, request, *args, **kwargs):
+    return conditional.make_etag("library", request.user.id, caching.get_library_version(request.user.id), request.get_full_path())
+
+def _generation_options_etag(view, request, *args, **kwargs):
+    return conditional.make_etag(
+        "generation_options",
+        conditional.settings_fingerprint("ALL_THEMES_DATA", "ALL_ART_STYLES_DATA", "ELEVENLABS_VOICE_MAP", "BACKEND_BASE_URL"),
+    )
+
 class StoryProjectViewSet(viewsets.ModelViewSet):
     queryset = StoryProject.objects.all() 
     serializer_class = StoryProjectDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner, HasActiveSubscription]
     throttle_classes = [SubscriptionBasedThrottle]
+    pagination_class = HybridCursorPagination
 
     def get_queryset(self):
         queryset = (
             super().get_queryset()
             .filter(user=self.request.user)
             .select_related('user', 'onboarding') 
-            .prefetch_related('variants', 'events')
-            .annotate(page_count_annotated=Count('pages'))
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
         if self.action == 'list':
-            return queryset.filter(is_saved=True)
-        return queryset
+            queryset = queryset.filter(is_saved=True)
+            q = self.request.query_params.get('q', '').strip()
+            if q:
+                queryset = search.search_stories(queryset, q)
+            return queryset
+        return queryset.prefetch_related('variants')
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -57,6 +76,7 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         project.progress = 1
         project.error = ""
         project.save(update_fields=["status", "started_at", "progress", "error"])
+        send_to_user(project.user_id, {"type": "story_started", "project_id": project.id})
         start_story_generation_pipeline(project.id)
 
     def retrieve(self, request, *args, **kwargs):
@@ -64,11 +84,36 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         if not pk or not pk.isdigit():
             raise NotFound(_("Invalid Story ID."))
         
+        version, cached = caching.get_cached_story_response(int(pk), request.user.id)
+        # The tag is bound to the requesting user, so only the owner can ever hold a matching one.
+        etag = conditional.make_etag("story", pk, version, request.user.id)
+        not_modified = conditional.evaluate(request, etag=etag)
+        if not_modified is not None or cached is not None:
+            counters.increment(int(pk), 'read_count', user_id=request.user.id)
+            if not_modified is not None:
+                return conditional.tag(not_modified, etag=etag)
+            return conditional.tag(HttpResponse(render_prerendered(cached), content_type="application/json"), etag=etag)
+
         instance = self.get_object()
-        instance.read_count = F('read_count') + 1
-        instance.save(update_fields=['read_count'])
-        
-        return super().retrieve(request, *args, **kwargs)
+        counters.increment(instance.pk, 'read_count', user_id=request.user.id)
+        counters.apply_pending([instance])
+        serializer = self.get_serializer(instance)
+        caching.cache_story_response(instance, version, serializer.data)
+        return conditional.tag(Response(serializer.data), etag=etag)
+
+    @extend_schema(
+        parameters=[OpenApiParameter("q", OpenApiTypes.STR, description="Full-text search over title, hero name, tags, synopsis and text, ranked by relevance.")]
+    )
+    @conditional.conditional(etag_func=_library_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        project_id, parent_project_id, user_id = instance.pk, instance.parent_project_id, instance.user_id
+        paths = collect_story_file_paths([project_id])
+        instance.delete()
+        caching.invalidate_story(project_id, parent_project_id, user_id)
+        transaction.on_commit(lambda: delete_story_files_task.delay(paths, [project_id]))
 
     def create(self, request, *args, **kwargs):
         story_master_permission = IsStoryMaster()
@@ -78,12 +123,14 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        # story_id lets the "ready" notification replace this one once the story finishes.
         create_and_send_notification_task.delay(
             request.user.id,
             "We're Building Your Story!",
-            "Your magical adventure is now being created."
+            "Your magical adventure is now being created.",
+            data={"type": "story_building", "story_id": serializer.instance.id}
         )
-        self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_202_ACCEPTED, headers=headers)
 
@@ -96,6 +143,7 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         if not latest_story:
             raise NotFound(_("No stories found for this user."))
         
+        counters.apply_pending([latest_story])
         serializer = self.get_serializer(latest_story)
         return Response(serializer.data)
 
@@ -118,6 +166,12 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
     def choices(self, request, pk=None):
         project = self.get_object()
         theme_id = project.theme
+        etag = conditional.make_etag(
+            "choices", theme_id, request.get_host(), conditional.settings_fingerprint("ALL_THEMES_DATA")
+        )
+        not_modified = conditional.evaluate(request, etag=etag)
+        if not_modified is not None:
+            return conditional.tag(not_modified, etag=etag)
         
         theme_data = settings.ALL_THEMES_DATA.get(theme_id)
         if not theme_data:
@@ -130,7 +184,7 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
                 "name": choice['name'],
                 "description": choice['description'],
                 "image_url": request.build_absolute_uri(staticfiles_storage.url(f"images/themes/{choice['image_file']}"))})
-        return Response(choices_with_urls)
+        return conditional.tag(Response(choices_with_urls), etag=etag)
 
     @extend_schema(
         request=None,
@@ -142,12 +196,8 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         if project.status == StoryProject.Status.RUNNING or project.status == StoryProject.Status.PENDING:
             project.status = StoryProject.Status.CANCELED
             project.save(update_fields=["status"])
-            from channels.layers import get_channel_layer
-            layer = get_channel_layer()
-            async_to_sync(layer.group_send)(
-                f"story_{project.id}",
-                {"type": "progress", "event": {"progress": project.progress, "status": "canceled"}}
-            )
+            caching.invalidate_story(project.pk, project.parent_project_id, project.user_id)
+            progress.publish_sync(project.id, {"progress": project.progress, "status": "canceled"})
         serializer = self.get_serializer(project)
         return Response(serializer.data)
 
@@ -166,9 +216,86 @@ class StoryProjectViewSet(viewsets.ModelViewSet):
         
         project.is_saved = True
         project.save(update_fields=['is_saved'])
+        caching.invalidate_story(project.pk, project.parent_project_id, project.user_id)
         
         return Response({"message": _("Story saved to library.")}, status=status.HTTP_200_OK)
 
+    @extend_schema(
+        parameters=[OpenApiParameter("ids", OpenApiTypes.STR, required=True, description="Comma-separated story IDs.")],
+        responses={
+            200: inline_serializer(
+                name='StoryBatchResponse',
+                fields={
+                    'results': StoryProjectDetailSerializer(many=True),
+                    'missing': serializers.ListField(child=serializers.IntegerField())
+                }
+            ),
+            400: OpenApiResponse(description="Invalid or too many IDs.")
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        raw_ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        if not raw_ids or not all(value.strip().isdigit() for value in raw_ids):
+            raise ValidationError({"ids": _("Provide a comma-separated list of story IDs.")})
+        ids = list(dict.fromkeys(int(value) for value in raw_ids))
+        if len(ids) > settings.STORY_BATCH_MAX_IDS:
+            raise ValidationError({"ids": _("At most {max} stories can be fetched at once.").format(max=settings.STORY_BATCH_MAX_IDS)})
+
+        cached = caching.get_cached_story_responses(ids, request.user.id)
+        contents = {pk: content for pk, (version, content) in cached.items() if content is not None}
+        misses = [pk for pk in ids if pk not in contents]
+        if misses:
+            projects = list(self.get_queryset().filter(pk__in=misses))
+            counters.apply_pending(projects)
+            for project in projects:
+                data = self.get_serializer(project).data
+                contents[project.pk] = caching.cache_story_response(project, cached[project.pk][0], data)
+
+        missing = [pk for pk in ids if pk not in contents]
+        body = b"".join([
+            b'{"results":[', b",".join(contents[pk] for pk in ids if pk in contents),
+            b'],"missing":', json.dumps(missing).encode(), b"}",
+        ])
+        return HttpResponse(render_prerendered(body), content_type="application/json")
+
+    @extend_schema(
+        request=StoryBulkActionSerializer,
+        responses={
+            200: inline_serializer(
+                name='StoryBulkActionResponse',
+                fields={'affected': serializers.IntegerField()}
+            ),
+            400: OpenApiResponse(description="Validation errors.")
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = StoryBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bulk_action, ids = serializer.validated_data['action'], serializer.validated_data['ids']
+        stories = StoryProject.objects.filter(user=request.user, pk__in=ids)
+
+        if bulk_action == 'delete':
+            with transaction.atomic():
+                rows = list(stories.values_list('pk', 'parent_project_id'))
+                project_ids = [pk for pk, _parent in rows]
+                paths = collect_story_file_paths(project_ids)
+                stories.delete()
+                transaction.on_commit(lambda: delete_story_files_task.delay(paths, project_ids))
+            affected = len(project_ids)
+            caching.invalidate_stories(project_ids + [parent for _pk, parent in rows if parent], request.user.id)
+            message = _("Stories deleted.")
+        else:
+            if bulk_action == 'save':
+                stories = stories.filter(status=StoryProject.Status.DONE)
+            rows = list(stories.values_list('pk', 'parent_project_id'))
+            affected = stories.update(is_saved=bulk_action == 'save')
+            caching.invalidate_stories([pk for pk, _parent in rows] + [parent for _pk, parent in rows if parent], request.user.id)
+            message = _("Stories saved to library.") if bulk_action == 'save' else _("Stories removed from library.")
+
+        return Response({"message": message, "affected": affected}, status=status.HTTP_200_OK)
+
 class GenerationOptionsView(APIView):
     permission_classes = [permissions.IsAuthenticated, HasActiveSubscription]
 
@@ -208,6 +335,7 @@ class GenerationOptionsView(APIView):
             )
         }
     )
+    @conditional.conditional(etag_func=_generation_options_etag)
     def get(self, request):
         cache_key = "generation_options_all_v3" 
         cached_data = cache.get(cache_key)
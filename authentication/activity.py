@@ -0,0 +1,114 @@
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from magictale.redis_client import get_redis_connection
+from .models import UserActivityLog
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "user_activity_log"
+FLUSHING_KEY = "user_activity_log:flushing"
+FLUSH_LOCK_KEY = "user_activity_log_flush_lock"
+
+
+def _entry(user_id: int, activity_type: str, ip_address=None, user_agent=None, details=None) -> dict:
+    return {
+        "user_id": user_id,
+        "activity_type": activity_type,
+        "ip_address": ip_address,
+        "user_agent": (user_agent or "")[:255] or None,
+        "details": details,
+        "timestamp": timezone.now().isoformat(),
+    }
+
+
+def _push(entry: dict):
+    redis = get_redis_connection()
+    if redis is not None:
+        try:
+            redis.rpush(PENDING_KEY, json.dumps(entry))
+            return
+        except Exception as e:
+            logger.warning(f"Failed to buffer activity '{entry['activity_type']}' for user {entry['user_id']}, writing through: {e}")
+
+    entry = dict(entry, timestamp=parse_datetime(entry["timestamp"]))
+    UserActivityLog.objects.create(**entry)
+
+
+def record(user_id: int, activity_type: str, ip_address=None, user_agent=None, details=None):
+    """Queues an audit row for the next flush instead of inserting it on the request path.
+
+    Deferred to commit so a rolled-back signup leaves no entry behind."""
+    entry = _entry(user_id, activity_type, ip_address, user_agent, details)
+    transaction.on_commit(lambda: _push(entry))
+
+
+def flush() -> int:
+    """Moves buffered entries into the table with bulk_create, a batch at a time.
+
+    A batch is trimmed from the list only after it is written, so a crash mid-flush repeats at most one
+    batch rather than losing it. Runs hold a lock, so overlapping runs never insert the same batch."""
+    redis = get_redis_connection()
+    if redis is None:
+        return 0
+
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=settings.ACTIVITY_LOG_FLUSH_LOCK_SECONDS):
+        logger.info("Activity log flush already running; skipping.")
+        return 0
+    try:
+        return _flush(redis)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def _flush(redis) -> int:
+    # A leftover flushing list means the previous run died part-way; finish it before taking new entries.
+    if not redis.exists(FLUSHING_KEY):
+        if not redis.exists(PENDING_KEY):
+            return 0
+        redis.rename(PENDING_KEY, FLUSHING_KEY)
+
+    batch_size = settings.ACTIVITY_LOG_FLUSH_BATCH_SIZE
+    flushed = 0
+    while True:
+        raw = redis.lrange(FLUSHING_KEY, 0, batch_size - 1)
+        if not raw:
+            break
+
+        entries = []
+        for item in raw:
+            try:
+                entry = json.loads(item)
+                entry["timestamp"] = parse_datetime(entry["timestamp"])
+                entries.append(entry)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Dropping malformed activity log entry: {e}")
+
+        # Accounts deleted since the event was queued would fail the whole insert on the foreign key.
+        live_user_ids = set(User.objects.filter(pk__in={e["user_id"] for e in entries}).values_list("pk", flat=True))
+        rows = [UserActivityLog(**e) for e in entries if e["user_id"] in live_user_ids]
+        UserActivityLog.objects.bulk_create(rows, batch_size=batch_size)
+
+        redis.ltrim(FLUSHING_KEY, len(raw), -1)
+        flushed += len(rows)
+
+    redis.delete(FLUSHING_KEY)
+    return flushed
+
+
+def prune() -> int:
+    """Deletes rows past ACTIVITY_LOG_RETENTION_DAYS in primary-key batches, keeping each delete short."""
+    cutoff = timezone.now() - timedelta(days=settings.ACTIVITY_LOG_RETENTION_DAYS)
+    batch_size = settings.ACTIVITY_LOG_PRUNE_BATCH_SIZE
+    deleted = 0
+    while True:
+        ids = list(UserActivityLog.objects.filter(timestamp__lt=cutoff).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += UserActivityLog.objects.filter(pk__in=ids).delete()[0]
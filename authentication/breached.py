@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Index layout: MAGIC, a uint64 key count, a 65537-entry fanout table of uint64 offsets keyed by the
+# first two bytes of the key, then the keys themselves. A key is the first 8 bytes of the password's
+# SHA-1, big-endian, sorted ascending, so byte order is numeric order and one bucket is a contiguous
+# slice. 8 bytes keeps the full HIBP corpus around 7 GB with a negligible false-positive rate.
+MAGIC = b"MTBPWD01"
+KEY_SIZE = 8
+FANOUT_SIZE = 65537
+HEADER = struct.Struct("<8sQ")
+FANOUT = struct.Struct(f"<{FANOUT_SIZE}Q")
+DATA_OFFSET = HEADER.size + FANOUT.size
+
+RANGE_CACHE_KEY = "pwned_range_{prefix}"
+RANGE_URL = "https://api.pwnedpasswords.com/range/{prefix}"
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class BreachedPasswordIndex:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a breached-password index.")
+        self._fanout = FANOUT.unpack_from(self._map, HEADER.size)
+
+    def __contains__(self, key: bytes) -> bool:
+        bucket = int.from_bytes(key[:2], "big")
+        lo, hi = self._fanout[bucket], self._fanout[bucket + 1]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = DATA_OFFSET + mid * KEY_SIZE
+            probe = self._map[offset:offset + KEY_SIZE]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def write_index(path, keys) -> int:
+    """Writes sorted, de-duplicated 8-byte `keys` as an index at `path`. Returns the key count."""
+    fanout = [0] * FANOUT_SIZE
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 0))
+        f.write(FANOUT.pack(*fanout))
+        previous = None
+        for key in keys:
+            if key == previous:
+                continue
+            if previous is not None and key < previous:
+                raise ValueError("Keys must be sorted.")
+            f.write(key)
+            fanout[int.from_bytes(key[:2], "big") + 1] += 1
+            previous = key
+            count += 1
+        for i in range(1, FANOUT_SIZE):
+            fanout[i] += fanout[i - 1]
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count))
+        f.write(FANOUT.pack(*fanout))
+    os.replace(tmp_path, path)
+    return count
+
+
+def key_for_sha1(sha1_hex: str) -> bytes:
+    return bytes.fromhex(sha1_hex[:KEY_SIZE * 2])
+
+
+def get_index():
+    global _index
+    path = settings.BREACHED_PASSWORDS_INDEX
+    if not path:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = BreachedPasswordIndex(path)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load breached-password index {path}: {e}")
+                    return None
+    return _index
+
+
+def _range_suffixes(prefix: str) -> str | None:
+    key = RANGE_CACHE_KEY.format(prefix=prefix)
+    suffixes = cache.get(key)
+    if suffixes is None:
+        try:
+            response = requests.get(RANGE_URL.format(prefix=prefix), timeout=settings.BREACHED_PASSWORDS_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Breached-password range lookup failed for {prefix}: {e}")
+            return None
+        suffixes = "\n".join(line.split(":", 1)[0] for line in response.text.splitlines())
+        cache.set(key, suffixes, timeout=settings.BREACHED_PASSWORDS_RANGE_CACHE_SECONDS)
+    return suffixes
+
+
+def is_breached(password: str) -> bool:
+    """Checks the local index when one is configured, else (if enabled) the cached HIBP range API.
+
+    Never raises; an unavailable source counts as not breached."""
+    sha1 = hashlib.sha1(password.encode()).hexdigest().upper()
+
+    index = get_index()
+    if index is not None:
+        return key_for_sha1(sha1) in index
+
+    if settings.BREACHED_PASSWORDS_ONLINE:
+        suffixes = _range_suffixes(sha1[:5])
+        return suffixes is not None and sha1[5:] in suffixes.split("\n")
+    return False
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from magictale.api.cache import get_version, bump_version
+
+PROFILE_VERSION_KEY = "profile_version_{user_id}"
+PROFILE_RESPONSE_KEY = "user_profile_{user_id}"
+
+
+def get_profile_version(user_id: int) -> int:
+    return get_version(PROFILE_VERSION_KEY.format(user_id=user_id))
+
+
+def get_cached_profile(user_id: int, version: int):
+    entry = cache.get(PROFILE_RESPONSE_KEY.format(user_id=user_id))
+    if entry and entry[0] == version:
+        return entry[1]
+    return None
+
+
+def cache_profile(user_id: int, version: int, data) -> None:
+    """`version` must be read before `data` was built, so a body built from rows an invalidation has since
+    replaced is stored under the old version and never served under the new ETag."""
+    cache.set(PROFILE_RESPONSE_KEY.format(user_id=user_id), (version, data), timeout=3600)
+
+
+def invalidate_profile(user_id: int) -> None:
+    cache.delete(PROFILE_RESPONSE_KEY.format(user_id=user_id))
+    bump_version(PROFILE_VERSION_KEY.format(user_id=user_id))
@@ -0,0 +1,82 @@
+import datetime
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from magictale.api.cache import get_version, bump_version
+from subscription.models import Subscription
+
+ENTITLEMENT_VERSION_KEY = "entitlement_version_{user_id}"
+
+
+class TokenSubscription:
+    """The subset of Subscription that permissions read, rebuilt from token claims."""
+
+    def __init__(self, plan, status, current_period_end, trial_end):
+        self.plan = plan
+        self.status = status
+        self.current_period_end = current_period_end
+        self.trial_end = trial_end
+
+
+def get_entitlement_version(user_id) -> int:
+    return get_version(ENTITLEMENT_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_entitlements(user_id) -> None:
+    """Marks every token issued so far for this user as carrying stale entitlements."""
+    bump_version(ENTITLEMENT_VERSION_KEY.format(user_id=user_id))
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def _datetime(value):
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc) if value else None
+
+
+def add_entitlement_claims(token, user):
+    # Version first, then the row from the database rather than `user`, which may come from the identity cache.
+    # A change committed after this read bumps the version past `ent_ver`, so the claims are never newer than it.
+    ent_ver = get_entitlement_version(user.pk)
+    subscription = Subscription.objects.filter(user_id=user.pk).first()
+
+    token['plan'] = subscription.plan if subscription else None
+    token['subscription_status'] = subscription.status if subscription else 'inactive'
+    token['period_end'] = _timestamp(subscription.current_period_end) if subscription else None
+    token['trial_end'] = _timestamp(subscription.trial_end) if subscription else None
+    token['ent_ver'] = ent_ver
+    token['ent_exp'] = _timestamp(timezone.now()) + settings.ENTITLEMENT_CLAIMS_SECONDS
+    return token
+
+
+def claims_current(token) -> bool:
+    """True if `token`'s entitlement claims can stand in for the database. Memoized on the token."""
+    current = getattr(token, '_entitlements_current', None)
+    if current is None:
+        current = (
+            'ent_ver' in token
+            and token.get('ent_exp', 0) > timezone.now().timestamp()
+            and token['ent_ver'] == get_entitlement_version(token[api_settings.USER_ID_CLAIM])
+        )
+        token._entitlements_current = current
+    return current
+
+
+def get_subscription(request):
+    """The request user's subscription, from the access token when its claims are current.
+
+    Returns None if the user has no subscription."""
+    token = request.auth
+    if token is not None and not isinstance(token, str) and claims_current(token):
+        if token['plan'] is None:
+            return None
+        return TokenSubscription(
+            token['plan'], token['subscription_status'], _datetime(token['period_end']), _datetime(token['trial_end'])
+        )
+
+    try:
+        return request.user.subscription
+    except (AttributeError, ObjectDoesNotExist):
+        return None
@@ -0,0 +1,86 @@
+import logging
+import pickle
+import threading
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_KEY = "identity_{user_id}"
+
+# Process-local tier. It can't see invalidations from other processes, so its TTL is the
+# staleness bound for subscription and profile changes made elsewhere; keep it to a few seconds.
+_local = TTLCache(maxsize=settings.IDENTITY_LOCAL_CACHE_SIZE, ttl=max(settings.IDENTITY_LOCAL_CACHE_SECONDS, 1))
+_local_lock = threading.Lock()
+
+
+def _load(user_id: int):
+    User = get_user_model()
+    try:
+        return User.objects.select_related("profile", "subscription").get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+
+
+def get_identity(user_id: int):
+    """The user with `profile` and `subscription` already loaded, or None if the user doesn't exist.
+
+    Each call gets its own copy, so callers may modify and save it."""
+    key = IDENTITY_KEY.format(user_id=user_id)
+    if settings.IDENTITY_LOCAL_CACHE_SECONDS > 0:
+        with _local_lock:
+            blob = _local.get(key)
+        if blob is not None:
+            return pickle.loads(blob)
+
+    blob = cache.get(key)
+    if blob is None:
+        user = _load(user_id)
+        if user is None:
+            return None
+        blob = pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+        cache.set(key, blob, timeout=settings.IDENTITY_CACHE_SECONDS)
+    else:
+        user = pickle.loads(blob)
+
+    if settings.IDENTITY_LOCAL_CACHE_SECONDS > 0:
+        with _local_lock:
+            _local[key] = blob
+    return user
+
+
+def invalidate_identity(user_id: int) -> None:
+    key = IDENTITY_KEY.format(user_id=user_id)
+    with _local_lock:
+        _local.pop(key, None)
+    cache.delete(key)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user through the identity cache instead of a query per request."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_identity(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
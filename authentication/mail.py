@@ -0,0 +1,59 @@
+import logging
+import time
+from smtplib import SMTPServerDisconnected
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+# One connection per worker process, kept open between tasks so consecutive messages share a
+# single SMTP session and TLS handshake instead of paying for one each.
+_connection = None
+_last_used = 0.0
+
+
+def _get_connection():
+    global _connection
+    if _connection is not None and time.monotonic() - _last_used > settings.EMAIL_CONNECTION_IDLE_SECONDS:
+        # Servers drop idle sessions; reconnecting is cheaper than failing the next send.
+        close_connection()
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+    return _connection
+
+
+def close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing mail connection: {e}")
+        _connection = None
+
+
+def deliver(subject, message, recipient_list, html_message=None, html_template=None, context=None) -> int:
+    global _last_used
+    if html_template:
+        html_message = render_to_string(html_template, context or {})
+
+    connection = _get_connection()
+    email = EmailMultiAlternatives(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list, connection=connection)
+    if html_message:
+        email.attach_alternative(html_message, "text/html")
+
+    try:
+        sent = connection.send_messages([email])
+    except SMTPServerDisconnected:
+        # The session died under us; reconnect once before handing the failure to the task's retry.
+        close_connection()
+        connection = _get_connection()
+        email.connection = connection
+        sent = connection.send_messages([email])
+    except Exception:
+        close_connection()
+        raise
+    _last_used = time.monotonic()
+    return sent
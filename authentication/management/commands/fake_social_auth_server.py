@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jwt.algorithms import RSAAlgorithm
+
+from authentication.social import APPLE_ISSUER, GOOGLE_ISSUERS
+
+
+class FakeProvider:
+    """Signing keys plus per-path hit counts, shared by the request handler threads."""
+
+    def __init__(self, max_age: int):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.keys = []
+        self.rotate()
+
+    def rotate(self):
+        with self.lock:
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            # Keep the previous key published, as Google and Apple do during a rotation.
+            self.keys = [(uuid.uuid4().hex, key)] + self.keys[:1]
+            return self.keys[0][0]
+
+    def jwks(self) -> dict:
+        keys = []
+        for kid, key in self.keys:
+            jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+            keys.append({**jwk, "kid": kid, "alg": "RS256", "use": "sig"})
+        return {"keys": keys}
+
+    def mint(self, provider: str, email: str, sub: str | None, expires_in: int) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": GOOGLE_ISSUERS[1] if provider == "google" else APPLE_ISSUER,
+            "aud": settings.GOOGLE_CLIENT_ID if provider == "google" else settings.APPLE_CLIENT_ID,
+            "sub": sub or uuid.uuid5(uuid.NAMESPACE_URL, email).hex,
+            "email": email,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + expires_in,
+        }
+        kid, key = self.keys[0]
+        return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+def make_handler(provider: FakeProvider, stdout):
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status: int, body: dict, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with provider.lock:
+                provider.hits[url.path] = provider.hits.get(url.path, 0) + 1
+
+            if url.path in ("/google/certs", "/apple/keys"):
+                self._json(200, provider.jwks(), {"Cache-Control": f"public, max-age={provider.max_age}"})
+            elif url.path == "/google/userinfo":
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                if not token.startswith("ya29.") or "@" not in token:
+                    self._json(401, {"error": "invalid_token"})
+                    return
+                email = token.removeprefix("ya29.")
+                self._json(200, {"sub": uuid.uuid5(uuid.NAMESPACE_URL, email).hex, "email": email, "email_verified": True})
+            elif url.path in ("/google/token", "/apple/token"):
+                self._json(200, {"id_token": provider.mint(
+                    url.path.split("/")[1], query.get("email", "user@example.com"), query.get("sub"),
+                    int(query.get("expires_in", 3600)),
+                )})
+            elif url.path == "/rotate":
+                self._json(200, {"kid": provider.rotate()})
+            elif url.path == "/stats":
+                self._json(200, provider.hits)
+            else:
+                self._json(404, {"error": "not_found"})
+
+        def log_message(self, format, *args):
+            stdout.write(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for the Google and Apple key, userinfo and token endpoints, for exercising "
+        "social login without the real providers. Point GOOGLE_CERTS_URL, GOOGLE_USERINFO_URL and "
+        "APPLE_KEYS_URL at it, then mint tokens from /google/token or /apple/token?email=...; /rotate "
+        "swaps the signing key and /stats reports hits per path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--max-age", type=int, default=3600, help="Cache-Control max-age on the key sets.")
+
+    def handle(self, *args, **options):
+        provider = FakeProvider(options["max_age"])
+        server = ThreadingHTTPServer((options["host"], options["port"]), make_handler(provider, self.stdout))
+        base = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(self.style.SUCCESS(f"Fake social auth server on {base}"))
+        self.stdout.write(f"  GOOGLE_CERTS_URL={base}/google/certs")
+        self.stdout.write(f"  GOOGLE_USERINFO_URL={base}/google/userinfo")
+        self.stdout.write(f"  APPLE_KEYS_URL={base}/apple/keys")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
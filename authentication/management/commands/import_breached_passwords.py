@@ -0,0 +1,47 @@
+import hashlib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.breached import key_for_sha1, write_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the memory-mapped breached-password index from a HIBP 'SHA1:count' dump (or a plain "
+        "password list with --plaintext). Sorted input, like the official download, streams in constant "
+        "memory; unsorted input is sorted in memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path of the hash dump or password list.")
+        parser.add_argument("--output", default=None, help="Index path. Defaults to BREACHED_PASSWORDS_INDEX.")
+        parser.add_argument("--plaintext", action="store_true", help="Source lines are passwords, not SHA-1 hashes.")
+        parser.add_argument("--min-count", type=int, default=0, help="Skip hashes seen fewer times than this.")
+
+    def _keys(self, options):
+        with open(options["source"], encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+                if options["plaintext"]:
+                    yield key_for_sha1(hashlib.sha1(line.encode()).hexdigest())
+                    continue
+                sha1, _, count = line.partition(":")
+                sha1 = sha1.strip()
+                if len(sha1) != 40 or (options["min_count"] and count and int(count) < options["min_count"]):
+                    continue
+                yield key_for_sha1(sha1)
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.BREACHED_PASSWORDS_INDEX
+        if not output:
+            raise CommandError("Pass --output or set BREACHED_PASSWORDS_INDEX.")
+
+        try:
+            count = write_index(output, self._keys(options))
+        except ValueError:
+            self.stdout.write("Source is not sorted by hash; sorting in memory.")
+            count = write_index(output, sorted(self._keys(options)))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} breached-password hashes to {output}."))
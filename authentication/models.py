@@ -108,9 +108,15 @@ class UserActivityLog(models.Model):
     activity_type = models.CharField(max_length=100)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.CharField(max_length=255, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the buffered row is flushed.
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     details = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='activity_log_user_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.activity_type} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
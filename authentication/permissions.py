@@ -1,6 +1,5 @@
 from rest_framework import permissions
-from django.utils import timezone
-from django.contrib.auth.models import User
+from .entitlements import get_subscription
 
 class HasActiveSubscription(permissions.BasePermission):
     message = "An active subscription or trial is required to use this feature."
@@ -10,24 +9,13 @@ class HasActiveSubscription(permissions.BasePermission):
         if not user or not user.is_authenticated:
             return False
 
-        try:
-            subscription = user.subscription
-        except (AttributeError, User.subscription.RelatedObjectDoesNotExist):
+        subscription = get_subscription(request)
+        if subscription is None:
             self.message = "You do not have a subscription or trial."
             return False
 
-        is_paid_active = (
-            subscription.status == 'active' and 
-            subscription.current_period_end is not None and 
-            subscription.current_period_end > timezone.now()
-        )
-        is_in_trial = (
-            subscription.status == 'trialing' and
-            subscription.trial_end is not None and
-            subscription.trial_end > timezone.now()
-        )
-
-        is_allowed = is_paid_active or is_in_trial
+        # Lapsed trials and periods are moved to 'expired' by the expiry sweep, so status alone is authoritative.
+        is_allowed = subscription.status in ('active', 'trialing')
         
         if not is_allowed:
             self.message = "Your subscription or trial has ended. Please subscribe to continue."
@@ -48,9 +36,8 @@ class IsStoryMaster(permissions.BasePermission):
         if not user or not user.is_authenticated:
             return False
 
-        try:
-            subscription = user.subscription
-        except (AttributeError, User.subscription.RelatedObjectDoesNotExist):
+        subscription = get_subscription(request)
+        if subscription is None:
             self.message = "You do not have a subscription or trial."
             return False
         
@@ -1,6 +1,4 @@
 import re
-import hashlib
-import requests
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import check_password
@@ -8,8 +6,12 @@ from rest_framework import serializers
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from subscription.models import Subscription
 from .models import UserProfile, AuthToken, PasswordHistory, UserActivityLog
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .entitlements import add_entitlement_claims
+from .breached import is_breached
+from .identity import get_identity
 from rest_framework.exceptions import AuthenticationFailed
 from notifications.tasks import create_and_send_notification_task
 from django.utils.translation import gettext as _
@@ -18,13 +20,14 @@ from datetime import datetime
 class PasswordValidator:
     @staticmethod
     def validate_breached_password(password):
-        sha1 = hashlib.sha1(password.encode()).hexdigest().upper()
-        prefix, suffix = sha1[:5], sha1[5:]
-        try:
-            response = requests.get(f"https://api.pwnedpasswords.com/range/{prefix}", timeout=2.0)
-            return suffix in response.text
-        except requests.RequestException:
-            return False
+        return is_breached(password)
+
+    @staticmethod
+    def validate_not_breached(password):
+        if is_breached(password):
+            raise serializers.ValidationError(
+                _("This password has appeared in a data breach. Please choose a different password.")
+            )
 
     @staticmethod
     def validate_password_strength(password):
@@ -41,7 +44,7 @@ class PasswordValidator:
 
 class SignupSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(write_only=True, required=True)
-    password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength])
+    password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength, PasswordValidator.validate_not_breached])
     email = serializers.EmailField(required=True)
 
     class Meta:
@@ -86,13 +89,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token['is_staff'] = user.is_staff
         token['username'] = user.username
-        try:
-            subscription = user.subscription
-            token['plan'] = subscription.plan
-            token['subscription_status'] = subscription.status
-        except (AttributeError, User.subscription.RelatedObjectDoesNotExist):
-            token['plan'] = None
-            token['subscription_status'] = 'inactive'
+        add_entitlement_claims(token, user)
         return token
 
     def validate(self, attrs):
@@ -126,6 +123,17 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return data
 
+class EntitlementTokenRefreshSerializer(TokenRefreshSerializer):
+    # The default refresh copies claims from the refresh token; reissue the access token with current entitlements.
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'], verify=False)
+        user = get_identity(access[api_settings.USER_ID_CLAIM])
+        if user is not None:
+            add_entitlement_claims(access, user)
+            data['access'] = str(access)
+        return data
+
 class FCMDeviceSerializer(serializers.Serializer):
     registration_id = serializers.CharField(required=True)
     type = serializers.ChoiceField(choices=['ios', 'android', 'web'], required=False, default='web')
@@ -160,7 +168,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 class UnifiedProfileUpdateSerializer(serializers.Serializer):
     full_name = serializers.CharField(max_length=301, required=False)
     new_email = serializers.EmailField(required=False, write_only=True)
-    new_password = serializers.CharField(style={'input_type': 'password'}, write_only=True, required=False, validators=[PasswordValidator.validate_password_strength])
+    new_password = serializers.CharField(style={'input_type': 'password'}, write_only=True, required=False, validators=[PasswordValidator.validate_password_strength, PasswordValidator.validate_not_breached])
     profile_picture = serializers.ImageField(required=False, allow_null=True)
     phone_number = serializers.CharField(max_length=20, required=False, allow_blank=True)
     allow_push_notifications = serializers.BooleanField(required=False)
@@ -213,7 +221,7 @@ class UnifiedProfileUpdateSerializer(serializers.Serializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 class PasswordResetFormSerializer(serializers.Serializer):
-    new_password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength])
+    new_password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength, PasswordValidator.validate_not_breached])
     confirm_password = serializers.CharField(write_only=True, required=True)
     def validate(self, data):
         if data['new_password'] != data['confirm_password']:
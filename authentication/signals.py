@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from .models import UserProfile
+from .caching import invalidate_profile
+from .identity import invalidate_identity
+from .entitlements import bump_entitlements
 from subscription.models import Subscription
 from django.utils import timezone
 from datetime import timedelta
@@ -24,4 +28,36 @@ def create_user_relationships(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+        instance.profile.save()
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_profile(user_id))
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_cached_identity(sender, instance, **kwargs):
+    user_id = instance.pk if sender is User else instance.user_id
+    # After commit, so a concurrent request can't re-cache the row as it was before this write.
+    transaction.on_commit(lambda: invalidate_identity(user_id))
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_profile_on_subscription_change(sender, instance, **kwargs):
+    # The profile body carries the plan and trial end, so its cached copy and ETag follow the subscription.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_profile(user_id))
+
+@receiver([post_save, post_delete], sender=Subscription)
+def revoke_subscription_claims(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_entitlements(user_id))
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_deactivated_user_claims(sender, instance, **kwargs):
+    # Only deactivation and deletion; routine saves such as last_login must not void fresh tokens.
+    if kwargs.get('signal') is post_delete or not instance.is_active:
+        user_id = instance.pk
+        transaction.on_commit(lambda: bump_entitlements(user_id))
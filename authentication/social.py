@@ -0,0 +1,152 @@
+import logging
+import re
+import threading
+import time
+import jwt
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+APPLE_ISSUER = "https://appleid.apple.com"
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """One pooled, keep-alive session per process for calls to Google and Apple."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.SOCIAL_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _max_age(response) -> int:
+    header = response.headers.get("Cache-Control", "")
+    if "no-store" in header or "no-cache" in header:
+        return settings.SOCIAL_JWKS_MIN_AGE_SECONDS
+    match = MAX_AGE_RE.search(header)
+    seconds = int(match.group(1)) if match else settings.SOCIAL_JWKS_DEFAULT_AGE_SECONDS
+    return max(settings.SOCIAL_JWKS_MIN_AGE_SECONDS, min(seconds, settings.SOCIAL_JWKS_MAX_AGE_SECONDS))
+
+
+class KeySet:
+    """A provider's signing keys, cached as parsed key objects in process and as raw JWKS in the shared cache.
+
+    Keys are fetched once per Cache-Control max-age across all workers. A token signed with an unknown
+    `kid` (the provider rotated) first picks up a newer JWKS another worker has already cached, and only
+    then forces a fetch, at most once per SOCIAL_JWKS_REFRESH_SECONDS across all workers."""
+
+    def __init__(self, name: str, url_setting: str):
+        self.name = name
+        self.url_setting = url_setting
+        self.cache_key = f"social_jwks_{name}"
+        self.refresh_key = f"social_jwks_refresh_{name}"
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, document: dict, expires_at: float, fetched_at: float):
+        keys = {}
+        for jwk in document.get("keys", []):
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+            except (KeyError, jwt.PyJWKError) as e:
+                logger.warning(f"Skipping unusable {self.name} signing key: {e}")
+        self._keys, self._expires_at, self._fetched_at = keys, expires_at, fetched_at
+
+    def _fetch(self):
+        response = get_session().get(getattr(settings, self.url_setting), timeout=settings.SOCIAL_HTTP_TIMEOUT)
+        response.raise_for_status()
+        max_age = _max_age(response)
+        document = response.json()
+        fetched_at = time.time()
+        cache.set(
+            self.cache_key,
+            {"document": document, "expires_at": fetched_at + max_age, "fetched_at": fetched_at},
+            timeout=max_age,
+        )
+        self._load(document, fetched_at + max_age, fetched_at)
+
+    def _load_shared(self, newer_only=False) -> bool:
+        cached = cache.get(self.cache_key)
+        if not cached or cached["expires_at"] <= time.time():
+            return False
+        if newer_only and cached.get("fetched_at", 0.0) <= self._fetched_at:
+            return False
+        self._load(cached["document"], cached["expires_at"], cached.get("fetched_at", 0.0))
+        return True
+
+    def _refresh(self, force=False):
+        with self._lock:
+            if not force and time.time() < self._expires_at:
+                return
+            if not force and self._load_shared():
+                return
+            self._fetch()
+
+    def get_key(self, kid: str):
+        if time.time() >= self._expires_at:
+            self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Another worker may already have fetched the rotated keys.
+            with self._lock:
+                self._load_shared(newer_only=True)
+            key = self._keys.get(kid)
+        if key is None and cache.add(self.refresh_key, 1, timeout=settings.SOCIAL_JWKS_REFRESH_SECONDS):
+            logger.info(f"Unknown {self.name} key id {kid}; refreshing signing keys")
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise ValueError(f"{self.name.capitalize()} public key not found — please retry")
+        return key
+
+
+google_keys = KeySet("google", "GOOGLE_CERTS_URL")
+apple_keys = KeySet("apple", "APPLE_KEYS_URL")
+
+
+def _decode(token: str, keys: KeySet, audience: str, issuer) -> dict:
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError as e:
+        raise ValueError(f"Malformed token: {e}")
+    key = keys.get_key(kid)
+    try:
+        return jwt.decode(token, key.key, algorithms=["RS256"], audience=audience, issuer=issuer)
+    except jwt.InvalidTokenError as e:
+        raise ValueError(f"Invalid token: {e}")
+
+
+def verify_google_id_token(token: str) -> dict:
+    return _decode(token, google_keys, settings.GOOGLE_CLIENT_ID, GOOGLE_ISSUERS)
+
+
+def verify_apple_id_token(token: str) -> dict:
+    return _decode(token, apple_keys, settings.APPLE_CLIENT_ID, APPLE_ISSUER)
+
+
+def fetch_google_userinfo(access_token: str) -> dict:
+    response = get_session().get(
+        settings.GOOGLE_USERINFO_URL,
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=settings.SOCIAL_HTTP_TIMEOUT,
+    )
+    if response.status_code in (400, 401):
+        raise ValueError("Google access token rejected")
+    response.raise_for_status()
+    return response.json()
@@ -1,6 +1,10 @@
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 from django.core.management import call_command
+from smtplib import SMTPException
 import logging
+from .mail import deliver, close_connection
+from . import activity
 
 logger = logging.getLogger(__name__)
 
@@ -10,4 +14,37 @@ def flush_expired_tokens_task():
         call_command('flushexpiredtokens')
         logger.info("Successfully flushed expired JWT tokens.")
     except Exception as e:
-        logger.error(f"Failed to flush expired JWT tokens: {e}")
\ No newline at end of file
+        logger.error(f"Failed to flush expired JWT tokens: {e}")
+
+@shared_task
+def flush_activity_logs_task():
+    try:
+        flushed = activity.flush()
+        if flushed:
+            logger.info(f"Flushed {flushed} buffered activity log entries.")
+    except Exception as e:
+        logger.error(f"Failed to flush activity logs: {e}")
+
+@shared_task
+def prune_activity_logs_task():
+    try:
+        deleted = activity.prune()
+        logger.info(f"Pruned {deleted} activity log entries past retention.")
+    except Exception as e:
+        logger.error(f"Failed to prune activity logs: {e}")
+
+@shared_task(
+    bind=True,
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    retry_kwargs={'max_retries': 6},
+)
+def send_email_task(self, subject, message, recipient_list, html_message=None, html_template=None, context=None):
+    deliver(subject, message, recipient_list, html_message=html_message, html_template=html_template, context=context)
+    logger.info(f"Sent email '{subject}' to {len(recipient_list)} recipient(s).")
+
+@worker_process_shutdown.connect
+def close_mail_connection(**kwargs):
+    close_connection()
@@ -1,3 +1,97 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.template import TemplateDoesNotExist
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from subscription.models import Subscription
+from .caching import cache_profile, get_cached_profile, get_profile_version, invalidate_profile
+from .entitlements import add_entitlement_claims, claims_current
+from .mail import deliver
+from .utils import send_email
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="parent", email="parent@example.com", password="x")
+        self.client = APIClient(HTTP_HOST="localhost", secure=True)
+        self.client.force_authenticate(self.user)
+
+    def _get_profile(self):
+        response = self.client.get("/api/auth/profile/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_profile_change_is_served_after_commit(self):
+        before = self._get_profile()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.profile.phone_number = "+15550001111"
+            self.user.profile.save()
+        self.assertTrue(callbacks)
+
+        after = self._get_profile()
+        self.assertEqual(after.json()["data"]["phone_number"], "+15550001111")
+        self.assertNotEqual(before["ETag"], after["ETag"])
+
+    def test_body_built_before_an_invalidation_is_not_served(self):
+        version = get_profile_version(self.user.pk)
+        invalidate_profile(self.user.pk)
+        # A request that read the version before the invalidation finishes after it.
+        cache_profile(self.user.pk, version, {"phone_number": "stale"})
+
+        self.assertIsNone(get_cached_profile(self.user.pk, get_profile_version(self.user.pk)))
+        self.assertNotEqual(self._get_profile().json()["data"]["phone_number"], "stale")
+
+
+class EntitlementClaimsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="payer", email="payer@example.com", password="x")
+        Subscription.objects.filter(user=self.user).update(status="active", plan="master")
+
+    def _access_token(self, user):
+        return add_entitlement_claims(AccessToken.for_user(user), user)
+
+    def _expire_subscription(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = Subscription.objects.get(user=self.user)
+            subscription.status, subscription.plan = "expired", "trial"
+            subscription.save()
+
+    def test_subscription_change_revokes_issued_claims(self):
+        token = self._access_token(User.objects.get(pk=self.user.pk))
+        self.assertTrue(claims_current(token))
+
+        self._expire_subscription()
+
+        self.assertFalse(claims_current(AccessToken(str(token))))
+
+    def test_claims_issued_after_a_change_come_from_the_database(self):
+        # A user loaded before the change, as the identity cache may still hold it during a token refresh.
+        user = User.objects.select_related("subscription").get(pk=self.user.pk)
+        self.assertEqual(user.subscription.plan, "master")
+
+        self._expire_subscription()
+        token = self._access_token(user)
+
+        self.assertTrue(claims_current(token))
+        self.assertEqual((token["plan"], token["subscription_status"]), ("trial", "expired"))
+
+
+class SendEmailTests(TestCase):
+    def test_missing_template_fails_before_queueing(self):
+        with self.captureOnCommitCallbacks() as callbacks, self.assertRaises(TemplateDoesNotExist):
+            send_email("Subject", "Body", ["parent@example.com"], html_template="emails/missing.html")
+        self.assertEqual(callbacks, [])
+
+    def test_account_approved_email_renders(self):
+        deliver(
+            "Approved", "Body", ["parent@example.com"], html_template="emails/account_approved_email.html",
+            context={"username": "parent", "login_url": "https://example.com/login"},
+        )
+        html, _ = mail.outbox[0].alternatives[0]
+        self.assertIn("https://example.com/login", html)
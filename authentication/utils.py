@@ -1,5 +1,5 @@
-from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
+from django.template.loader import get_template
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -9,12 +9,13 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
-def send_email(subject, message, recipient_list, html_message=None):
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        recipient_list,
-        fail_silently=False,
-        html_message=html_message
-    )
\ No newline at end of file
+def send_email(subject, message, recipient_list, html_message=None, html_template=None, context=None):
+    """Queues an email for the mail worker, once the current transaction commits.
+
+    Pass `html_template` and a JSON-serializable `context` instead of `html_message` to render it in the worker.
+    The template is looked up here, so a missing one fails the request instead of every delivery attempt."""
+    from .tasks import send_email_task
+    if html_template:
+        get_template(html_template)
+    args = (str(subject), str(message), list(recipient_list), html_message, html_template, context)
+    transaction.on_commit(lambda: send_email_task.delay(*args))
\ No newline at end of file
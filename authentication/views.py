@@ -2,8 +2,8 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.shortcuts import render
-from django.template.loader import render_to_string
 from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -13,14 +13,11 @@ from drf_spectacular.types import OpenApiTypes
 from rest_framework import serializers
 from django.utils.translation import gettext as _
 import logging
-import requests
-import jwt
 from django.db import transaction
-from jwt.algorithms import RSAAlgorithm
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token as google_id_token
 from .utils import get_client_ip, send_email
+from .social import fetch_google_userinfo, verify_apple_id_token, verify_google_id_token
 from .models import AuthToken, UserProfile, PasswordHistory, UserActivityLog
+from . import activity
 from .serializers import (
     SignupSerializer,
     PasswordResetRequestSerializer,
@@ -32,17 +29,19 @@ from .serializers import (
     PasswordResetFormSerializer,
     FCMDeviceSerializer
 )
-from django.core.cache import cache
-from rest_framework.throttling import ScopedRateThrottle
+from magictale.api.throttling import ScopedGCRAThrottle
 from notifications.tasks import create_and_send_notification_task
 from fcm_django.models import FCMDevice
+from magictale.api import conditional
+from magictale.api.pagination import TimestampCursorPagination
+from .caching import get_profile_version, get_cached_profile, cache_profile
 
 logger = logging.getLogger(__name__)
 
 class MyTokenObtainPairView(APIView):
     permission_classes = [AllowAny]
     serializer_class = MyTokenObtainPairSerializer
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedGCRAThrottle]
     throttle_scope = 'login'
 
     @extend_schema(
@@ -96,13 +95,16 @@ class SignupAPIView(APIView):
         if serializer.is_valid():
             user = serializer.save()
             
-            UserActivityLog.objects.create(user=user, activity_type='signup', ip_address=get_client_ip(request))
+            activity.record(user.id, 'signup', ip_address=get_client_ip(request))
             token = AuthToken.objects.create(user=user, token_type='email_verification')
             verification_path = reverse('email_verification') + f'?token={token.token}'
             verification_url = f"{settings.BACKEND_BASE_URL}{verification_path}"
-            html_message = render_to_string('emails/signup_verification_email.html', {'username': user.first_name, 'verification_url': verification_url})
             plain_message = f'Please click the link to verify your email: {verification_url}'
-            send_email('Verify your email for MagicTale', plain_message, [user.email], html_message=html_message)
+            send_email(
+                'Verify your email for MagicTale', plain_message, [user.email],
+                html_template='emails/signup_verification_email.html',
+                context={'username': user.first_name, 'verification_url': verification_url},
+            )
             create_and_send_notification_task.delay(
                 user.id,
                 "Welcome to MagicTale!",
@@ -131,7 +133,7 @@ class EmailVerificationAPIView(APIView):
             user.save()
             token.is_used = True
             token.save()
-            UserActivityLog.objects.create(user=user, activity_type='email_verification_success', ip_address=get_client_ip(request))
+            activity.record(user.id, 'email_verification_success', ip_address=get_client_ip(request))
             context.update({'title': _('Account Verified!'), 'message': _('Your account is now active.')})
             return render(request, 'verification/verification_success.html', context)
         except AuthToken.DoesNotExist:
@@ -160,13 +162,19 @@ class ResendVerificationEmailAPIView(APIView):
                 token = AuthToken.objects.create(user=user, token_type='email_verification')
                 verification_path = reverse('email_verification') + f'?token={token.token}'
                 verification_url = f"{settings.BACKEND_BASE_URL}{verification_path}"
-                html_message = render_to_string('emails/signup_verification_email.html', {'username': user.first_name, 'verification_url': verification_url})
-                send_email('Verify your email', f'Link: {verification_url}', [user.email], html_message=html_message)
+                send_email(
+                    'Verify your email', f'Link: {verification_url}', [user.email],
+                    html_template='emails/signup_verification_email.html',
+                    context={'username': user.first_name, 'verification_url': verification_url},
+                )
                 return Response({"message": _("Verification email has been resent.")}, status=status.HTTP_200_OK)
             except User.DoesNotExist:
                 return Response({'detail': _('User not found.')}, status=status.HTTP_404_NOT_FOUND)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _profile_etag(view, request):
+    return conditional.make_etag("profile", request.user.id, get_profile_version(request.user.id))
+
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -176,9 +184,10 @@ class ProfileView(APIView):
             404: OpenApiResponse(description="User profile not found.")
         }
     )
+    @conditional.conditional(etag_func=_profile_etag)
     def get(self, request):
-        cache_key = f"user_profile_{request.user.id}"
-        cached_profile = cache.get(cache_key)
+        version = get_profile_version(request.user.id)
+        cached_profile = get_cached_profile(request.user.id, version)
 
         if cached_profile:
             return Response(cached_profile, status=status.HTTP_200_OK)
@@ -194,7 +203,7 @@ class ProfileView(APIView):
                 'email': request.user.email,
             }
             response_data = {**user_data, **serializer.data}
-            cache.set(cache_key, response_data, timeout=3600) 
+            cache_profile(request.user.id, version, response_data)
             return Response(response_data, status=status.HTTP_200_OK)
         except UserProfile.DoesNotExist:
             return Response({'detail': _('User profile not found.')}, status=status.HTTP_404_NOT_FOUND)
@@ -219,7 +228,6 @@ class ProfileView(APIView):
                 "Profile Updated",
                 "Your account details have been changed."
             )
-                cache.delete(f"user_profile_{request.user.id}") 
                 return Response({'message': _('Profile updated successfully.')}, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except UserProfile.DoesNotExist:
@@ -227,7 +235,7 @@ class ProfileView(APIView):
 
 class PasswordResetInitiateAPIView(APIView):
     permission_classes = [AllowAny]
-    throttle_classes = [ScopedRateThrottle] 
+    throttle_classes = [ScopedGCRAThrottle] 
     throttle_scope = 'password_reset'      
     
     @extend_schema(
@@ -299,16 +307,13 @@ class PasswordResetConfirmView(APIView):
             context = {'error_message': _('This password reset session is invalid or has expired.'), 'home_url': settings.FRONTEND_URL}
             return render(request, 'verification/verification_error.html', context, status=status.HTTP_400_BAD_REQUEST)
 
-class UserActivityLogAPIView(APIView):
+class UserActivityLogAPIView(ListAPIView):
     permission_classes =[IsAuthenticated]
-    
-    @extend_schema(
-        responses={200: UserActivityLogSerializer(many=True)}
-    )
-    def get(self, request):
-        logs = UserActivityLog.objects.filter(user=request.user).order_by('-timestamp')
-        serializer = UserActivityLogSerializer(logs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    serializer_class = UserActivityLogSerializer
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self):
+        return UserActivityLog.objects.filter(user=self.request.user)
 
 class DeleteAccountView(APIView):
     permission_classes = [IsAuthenticated]
@@ -347,19 +352,10 @@ class GoogleLoginView(APIView):
             return Response({"detail": _("id_token is required")}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            decoded = {}
             if token_str.startswith("ya29"):
-                user_info_resp = requests.get(f"https://www.googleapis.com/oauth2/v3/userinfo?access_token={token_str}")
-                user_info_resp.raise_for_status()
-                decoded = user_info_resp.json()
+                decoded = fetch_google_userinfo(token_str)
             else:
-                decoded = google_id_token.verify_oauth2_token(
-                    token_str,
-                    google_requests.Request(),
-                    settings.GOOGLE_CLIENT_ID
-                )
-                if decoded.get("aud") != settings.GOOGLE_CLIENT_ID:
-                    return Response({"detail": _("Invalid token audience")}, status=status.HTTP_401_UNAUTHORIZED)
+                decoded = verify_google_id_token(token_str)
 
             if not decoded.get("email_verified", False):
                 return Response({"detail": _("Google email not verified")}, status=status.HTTP_401_UNAUTHORIZED)
@@ -399,8 +395,6 @@ class GoogleLoginView(APIView):
 
 class AppleLoginView(APIView):
     permission_classes =[AllowAny]
-    APPLE_KEYS_CACHE_KEY = "apple_public_keys"
-    APPLE_KEYS_URL = "https://appleid.apple.com/auth/keys"
 
     @extend_schema(
         request=inline_serializer(
@@ -429,7 +423,7 @@ class AppleLoginView(APIView):
             return Response({"detail": _("id_token is required")}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            decoded = self._verify_apple_token(id_token_str)
+            decoded = verify_apple_id_token(id_token_str)
         except ValueError as e:
             logger.warning(f"Apple login invalid token: {e}")
             return Response({"detail": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
@@ -459,33 +453,6 @@ class AppleLoginView(APIView):
         tokens = {'refresh': str(refresh), 'access': str(refresh.access_token)}
         return Response(tokens, status=status.HTTP_200_OK)
 
-    def _verify_apple_token(self, id_token_str: str) -> dict:
-        apple_keys = cache.get(self.APPLE_KEYS_CACHE_KEY)
-        if not apple_keys:
-            response = requests.get(self.APPLE_KEYS_URL, timeout=5)
-            response.raise_for_status()
-            apple_keys = response.json()
-            cache.set(self.APPLE_KEYS_CACHE_KEY, apple_keys, timeout=3600 * 24)
-
-        headers = jwt.get_unverified_header(id_token_str)
-        kid = headers.get("kid")
-
-        matching_key = next((k for k in apple_keys["keys"] if k["kid"] == kid), None)
-        if not matching_key:
-            cache.delete(self.APPLE_KEYS_CACHE_KEY)
-            raise ValueError("Apple public key not found — please retry")
-
-        public_key = RSAAlgorithm.from_jwk(matching_key)
-
-        decoded = jwt.decode(
-            id_token_str,
-            public_key,
-            algorithms=["RS256"],
-            audience=settings.APPLE_CLIENT_ID,
-            issuer="https://appleid.apple.com"
-        )
-        return decoded
-
     def _get_or_create_user(self, apple_user_id: str, email: str | None):
         if not email:
             raise ValueError("Email is required on first Apple login")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the dashboard's daily metrics rollup for the last --days days, a chunk of days per query, "
+        "and refreshes today's totals. Run once after upgrading; the periodic task keeps it current afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=400)
+        parser.add_argument("--chunk-days", type=int, default=31)
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options["days"] - 1)
+        written = 0
+
+        while first_day <= today:
+            last_day = min(first_day + timedelta(days=options["chunk_days"] - 1), today)
+            written += metrics.rollup(first_day, last_day)
+            self.stdout.write(f"Rolled up {first_day} to {last_day}")
+            first_day = last_day + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily metrics rows."))
@@ -0,0 +1,136 @@
+import datetime
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from ai.models import StoryProject
+from subscription.models import Subscription
+from .models import DailyMetrics
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = ("signups", "trials_started", "cancellations", "stories_created")
+BREAKDOWN_FIELDS = {
+    "stories_by_status": "status",
+    "stories_by_theme": "theme",
+    "stories_by_art_style": "art_style",
+}
+TOTAL_FIELDS = (
+    "total_users", "total_stories", "total_subscriptions", "active_subscriptions",
+    "trials_active", "trials_expiring_this_week", "canceled_subscriptions",
+)
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=timezone.get_current_timezone())
+
+
+def _counts_by_day(queryset, field: str, start, end) -> dict:
+    rows = (
+        queryset.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+        .annotate(day=TruncDate(field)).values("day").annotate(n=Count("id"))
+    )
+    return {row["day"]: row["n"] for row in rows}
+
+
+def _breakdowns_by_day(dimension: str, start, end) -> dict:
+    rows = (
+        StoryProject.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate("created_at")).values("day", dimension).annotate(n=Count("id"))
+    )
+    result = defaultdict(dict)
+    for row in rows:
+        result[row["day"]][row[dimension] or ""] = row["n"]
+    return result
+
+
+def _totals(now) -> dict:
+    subscriptions = Subscription.objects.aggregate(
+        total_subscriptions=Count("id"),
+        active_subscriptions=Count("id", filter=Q(status__in=["active", "trialing"])),
+        trials_active=Count("id", filter=Q(status="trialing")),
+        trials_expiring_this_week=Count("id", filter=Q(status="trialing", trial_end__gte=now, trial_end__lte=now + timedelta(days=7))),
+        canceled_subscriptions=Count("id", filter=Q(status="canceled")),
+    )
+    return {"total_users": User.objects.count(), "total_stories": StoryProject.objects.count(), **subscriptions}
+
+
+def rollup(first_day: datetime.date, last_day: datetime.date) -> int:
+    """Recounts the daily rows from `first_day` to `last_day` inclusive with one grouped query per counter,
+    and refreshes the totals snapshot when the range includes today. Returns the number of rows written."""
+    now = timezone.now()
+    start, end = _day_start(first_day), _day_start(last_day + timedelta(days=1))
+
+    events = {
+        "signups": _counts_by_day(User.objects.all(), "date_joined", start, end),
+        "trials_started": _counts_by_day(Subscription.objects.all(), "trial_start", start, end),
+        "cancellations": _counts_by_day(Subscription.objects.all(), "canceled_at", start, end),
+        "stories_created": _counts_by_day(StoryProject.objects.all(), "created_at", start, end),
+    }
+    breakdowns = {field: _breakdowns_by_day(dimension, start, end) for field, dimension in BREAKDOWN_FIELDS.items()}
+
+    rows = []
+    day = first_day
+    while day <= last_day:
+        row = DailyMetrics(date=day, refreshed_at=now)
+        for field, counts in events.items():
+            setattr(row, field, counts.get(day, 0))
+        for field, by_day in breakdowns.items():
+            setattr(row, field, by_day.get(day, {}))
+        rows.append(row)
+        day += timedelta(days=1)
+
+    DailyMetrics.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["date"],
+        update_fields=[*EVENT_FIELDS, *BREAKDOWN_FIELDS, "refreshed_at"],
+    )
+
+    today = timezone.localdate(now)
+    if first_day <= today <= last_day:
+        DailyMetrics.objects.filter(date=today).update(**_totals(now))
+    return len(rows)
+
+
+def refresh(days: int | None = None) -> DailyMetrics:
+    """Recounts the last `days` days (DASHBOARD_METRICS_REFRESH_DAYS by default) and returns today's row."""
+    days = days or settings.DASHBOARD_METRICS_REFRESH_DAYS
+    today = timezone.localdate()
+    rollup(today - timedelta(days=days - 1), today)
+    return DailyMetrics.objects.get(date=today)
+
+
+def today() -> DailyMetrics:
+    row = DailyMetrics.objects.filter(date=timezone.localdate()).first()
+    return row or refresh(days=1)
+
+
+def window(first_day: datetime.date, last_day: datetime.date) -> dict:
+    """Sums of the event counters over a date range, read from the rollup table alone."""
+    sums = DailyMetrics.objects.filter(date__gte=first_day, date__lte=last_day).aggregate(
+        **{field: Sum(field) for field in EVENT_FIELDS}
+    )
+    return {field: value or 0 for field, value in sums.items()}
+
+
+def _apply(deltas: dict):
+    try:
+        updated = DailyMetrics.objects.filter(date=timezone.localdate()).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            # First write of the day: count today from the tables, which already include this change.
+            refresh(days=1)
+    except Exception as e:
+        logger.warning(f"Could not update daily metrics {deltas}: {e}")
+
+
+def bump(**deltas):
+    """Adds `deltas` to today's row once the surrounding transaction commits, in a single UPDATE."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply(deltas))
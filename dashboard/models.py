@@ -16,4 +16,37 @@ class SiteSettings(models.Model):
         return obj
 
     def __str__(self):
-        return "Site Application Settings"
\ No newline at end of file
+        return "Site Application Settings"
+
+class DailyMetrics(models.Model):
+    """One row of admin dashboard counters per day, kept by dashboard.metrics.
+
+    Event counts (signups, trials started, cancellations, stories and their breakdowns) describe what happened
+    that day. The totals are a snapshot of the tables as of the row's last refresh."""
+    date = models.DateField(unique=True)
+
+    signups = models.PositiveIntegerField(default=0)
+    trials_started = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    stories_created = models.PositiveIntegerField(default=0)
+    stories_by_status = models.JSONField(default=dict, blank=True)
+    stories_by_theme = models.JSONField(default=dict, blank=True)
+    stories_by_art_style = models.JSONField(default=dict, blank=True)
+
+    total_users = models.IntegerField(default=0)
+    total_stories = models.IntegerField(default=0)
+    total_subscriptions = models.IntegerField(default=0)
+    active_subscriptions = models.IntegerField(default=0)
+    trials_active = models.IntegerField(default=0)
+    trials_expiring_this_week = models.IntegerField(default=0)
+    canceled_subscriptions = models.IntegerField(default=0)
+
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Daily Metrics"
+        verbose_name_plural = "Daily Metrics"
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"Metrics for {self.date}"
\ No newline at end of file
@@ -112,7 +112,7 @@ class AdminProfileUpdateSerializer(serializers.ModelSerializer):
 
 class AdminChangePasswordSerializer(serializers.Serializer):
     # current_password = serializers.CharField(write_only=True, required=True)
-    new_password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength])
+    new_password = serializers.CharField(write_only=True, required=True, validators=[PasswordValidator.validate_password_strength, PasswordValidator.validate_not_breached])
     
     # def validate_current_password(self, value):
     #     user = self.context['request'].user
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+from ai.models import StoryProject
+from subscription.models import Subscription
+from . import metrics
+
+
+def _subscription_totals(subscription, sign):
+    now = timezone.now()
+    trialing = subscription.status == 'trialing'
+    expiring = trialing and subscription.trial_end is not None and now <= subscription.trial_end <= now + timedelta(days=7)
+    return {
+        'total_subscriptions': sign,
+        'active_subscriptions': sign * (subscription.status in ('active', 'trialing')),
+        'trials_active': sign * trialing,
+        'trials_expiring_this_week': sign * expiring,
+        'canceled_subscriptions': sign * (subscription.status == 'canceled'),
+    }
+
+@receiver(post_save, sender=User)
+def count_signup(sender, instance, created, **kwargs):
+    if created:
+        metrics.bump(signups=1, total_users=1)
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    metrics.bump(total_users=-1)
+
+@receiver(post_save, sender=Subscription)
+def count_new_subscription(sender, instance, created, **kwargs):
+    # Status changes, including bulk expiry, are picked up by the periodic refresh.
+    if created:
+        started_today = instance.trial_start is not None and timezone.localdate(instance.trial_start) == timezone.localdate()
+        metrics.bump(trials_started=int(started_today), **_subscription_totals(instance, 1))
+
+@receiver(post_delete, sender=Subscription)
+def count_deleted_subscription(sender, instance, **kwargs):
+    metrics.bump(**_subscription_totals(instance, -1))
+
+@receiver(post_save, sender=StoryProject)
+def count_new_story(sender, instance, created, **kwargs):
+    # No post_delete receiver: it would stop bulk story deletes from running as a single DELETE.
+    # Deleted stories leave the totals at the next refresh.
+    if created:
+        metrics.bump(stories_created=1, total_stories=1)
@@ -0,0 +1,10 @@
+from celery import shared_task
+from . import metrics
+
+@shared_task
+def refresh_daily_metrics_task():
+    try:
+        row = metrics.refresh()
+        print(f"Refreshed dashboard metrics through {row.date}.")
+    except Exception as e:
+        print(f"Error refreshing dashboard metrics: {e}")
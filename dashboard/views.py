@@ -8,7 +8,8 @@ import pytz
 from django.contrib.auth.models import User
 from subscription.models import Subscription
 from ai.models import StoryProject
-from .models import SiteSettings
+from ai.search import search_stories
+from .models import SiteSettings, DailyMetrics
 from .serializers import (
     SubscriptionManagementSerializer,
     SiteSettingsSerializer,
@@ -19,30 +20,30 @@ from .serializers import (
     AdminChangePasswordSerializer
 )
 
+from collections import Counter
 from datetime import timedelta, datetime
 from django.utils import timezone
-from django.db.models import Count, Q
-from django.db.models.functions import TruncMonth
 from django.conf import settings
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from authentication.utils import send_email
-from django.template.loader import render_to_string
 from authentication.models import UserProfile
 from django.core.cache import cache
 from rest_framework.exceptions import ValidationError
-from . import services
+from . import services, metrics
 from django.utils.translation import gettext as _
 from urllib.parse import urlencode
-from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, inline_serializer
+from drf_spectacular.types import OpenApiTypes
 from rest_framework import serializers
 
 class DashboardStatsAPIView(APIView):
     permission_classes = [IsAdminUser]
 
     @extend_schema(
+        parameters=[OpenApiParameter('story_search', OpenApiTypes.STR, description="Ranked full-text search over recent stories.")],
         responses={
             200: inline_serializer(
                 name='DashboardStatsResponse',
@@ -56,38 +57,26 @@ class DashboardStatsAPIView(APIView):
     )
     def get(self, request):
         cache_key = 'dashboard_stats_and_recents'
-        cached_data = cache.get(cache_key)
+        story_search = request.query_params.get('story_search', '').strip()
+        cached_data = None if story_search else cache.get(cache_key)
 
         if cached_data:
             return Response(cached_data)
 
-        now = timezone.now()
-        last_month_start = now - timedelta(days=30)
-
-        user_stats = User.objects.aggregate(
-            total_users=Count('id'),
-            users_this_month=Count('id', filter=Q(date_joined__gte=last_month_start))
-        )
-
-        subscription_stats = Subscription.objects.aggregate(
-            active_subscriptions=Count('id', filter=Q(status__in=['active', 'trialing'])),
-            active_subs_this_month=Count('id', filter=Q(status__in=['active', 'trialing'], trial_start__gte=last_month_start))
-        )
+        current = metrics.today()
+        this_month = metrics.window(current.date - timedelta(days=29), current.date)
 
-        story_stats = StoryProject.objects.aggregate(
-            total_stories=Count('id'),
-            stories_this_month=Count('id', filter=Q(created_at__gte=last_month_start))
-        )
-
-        total_users = user_stats['total_users']
-        users_this_month = user_stats['users_this_month']
-        active_subscriptions = subscription_stats['active_subscriptions']
-        active_subs_this_month = subscription_stats['active_subs_this_month']
-        total_stories = story_stats['total_stories']
-        stories_this_month = story_stats['stories_this_month']
+        total_users = current.total_users
+        users_this_month = this_month['signups']
+        active_subscriptions = current.active_subscriptions
+        active_subs_this_month = this_month['trials_started']
+        total_stories = current.total_stories
+        stories_this_month = this_month['stories_created']
 
         user_list = User.objects.select_related('profile', 'subscription').order_by('-date_joined')
         user_paginator = Paginator(user_list, 10)
+        # The rollup already holds the totals; spare the paginators a COUNT over each table.
+        user_paginator.count = total_users
         user_page_number = request.query_params.get('user_page', 1)
         try:
             paginated_users = user_paginator.page(user_page_number)
@@ -96,7 +85,11 @@ class DashboardStatsAPIView(APIView):
         user_serializer = DashboardUserSerializer(paginated_users, many=True)
         
         story_list = StoryProject.objects.select_related('user').order_by('-created_at')
+        if story_search:
+            story_list = search_stories(story_list, story_search)
         story_paginator = Paginator(story_list, 10)
+        if not story_search:
+            story_paginator.count = total_stories
         story_page_number = request.query_params.get('story_page', 1)
         try:
             paginated_stories = story_paginator.page(story_page_number)
@@ -129,7 +122,8 @@ class DashboardStatsAPIView(APIView):
             'recent_signups': {'count': user_paginator.count, 'num_pages': user_paginator.num_pages, 'current_page': paginated_users.number, 'next': get_next_url(paginated_users, 'user_page'), 'previous': get_previous_url(paginated_users, 'user_page'), 'results': user_serializer.data},
             'recent_stories': {'count': story_paginator.count, 'num_pages': story_paginator.num_pages, 'current_page': paginated_stories.number, 'next': get_next_url(paginated_stories, 'story_page'), 'previous': get_previous_url(paginated_stories, 'story_page'), 'results': story_serializer.data}
         }
-        cache.set(cache_key, data, timeout=900)
+        if not story_search:
+            cache.set(cache_key, data, timeout=900)
         return Response(data)
     def _calculate_change(self, old, new):
         if old <= 0: return 100.0 if new > 0 else 0.0
@@ -161,21 +155,12 @@ class SubscriptionManagementView(generics.ListAPIView):
         }
     )
     def list(self, request, *args, **kwargs):
-        all_subscriptions = Subscription.objects.all()
-        now = timezone.now()
-        last_30_days_start = now - timedelta(days=30)
-        prev_30_days_start = now - timedelta(days=60)
-        total_subscribers = all_subscriptions.count()
-        new_subs_last_30 = all_subscriptions.filter(trial_start__gte=last_30_days_start).count()
-        new_subs_prev_30 = all_subscriptions.filter(trial_start__gte=prev_30_days_start, trial_start__lt=last_30_days_start).count()
-        total_subscribers_change = self._calculate_change(new_subs_prev_30, new_subs_last_30)
-        trials_active = all_subscriptions.filter(status='trialing').count()
-        expiring_this_week = all_subscriptions.filter(status='trialing', trial_end__lte=now + timedelta(days=7), trial_end__gte=now).count()
-        canceled_subscriptions = all_subscriptions.filter(status='canceled').count()
-        canceled_last_30 = all_subscriptions.filter(canceled_at__gte=last_30_days_start).count()
-        canceled_prev_30 = all_subscriptions.filter(canceled_at__gte=prev_30_days_start, canceled_at__lt=last_30_days_start).count()
-        canceled_subscriptions_change = self._calculate_change(canceled_prev_30, canceled_last_30)
-        stats = {'total_subscribers': {'value': total_subscribers, 'change': total_subscribers_change}, 'trials_active': {'value': trials_active, 'expiring_this_week': expiring_this_week}, 'canceled_subscriptions': {'value': canceled_subscriptions, 'change': canceled_subscriptions_change}}
+        current = metrics.today()
+        last_30 = metrics.window(current.date - timedelta(days=29), current.date)
+        prev_30 = metrics.window(current.date - timedelta(days=59), current.date - timedelta(days=30))
+        total_subscribers_change = self._calculate_change(prev_30['trials_started'], last_30['trials_started'])
+        canceled_subscriptions_change = self._calculate_change(prev_30['cancellations'], last_30['cancellations'])
+        stats = {'total_subscribers': {'value': current.total_subscriptions, 'change': total_subscribers_change}, 'trials_active': {'value': current.trials_active, 'expiring_this_week': current.trials_expiring_this_week}, 'canceled_subscriptions': {'value': current.canceled_subscriptions, 'change': canceled_subscriptions_change}}
         paginated_response = super().list(request, *args, **kwargs)
         return Response({'stats': stats, **paginated_response.data})
 
@@ -189,6 +174,9 @@ class AnalyticsAPIView(APIView):
                 fields={
                     'user_growth_over_time': serializers.ListField(child=serializers.DictField()),
                     'stories_created_over_time': serializers.ListField(child=serializers.DictField()),
+                    'stories_by_status': serializers.DictField(child=serializers.IntegerField()),
+                    'stories_by_theme': serializers.DictField(child=serializers.IntegerField()),
+                    'stories_by_art_style': serializers.DictField(child=serializers.IntegerField()),
                     'top_performing_stories': serializers.ListField(child=serializers.DictField())
                 }
             )
@@ -196,19 +184,26 @@ class AnalyticsAPIView(APIView):
     )
     def get(self, request):
         now = timezone.now()
-        one_year_ago = now - timedelta(days=365)
-        user_growth_query = User.objects.filter(date_joined__gte=one_year_ago).annotate(month=TruncMonth('date_joined')).values('month').annotate(count=Count('id')).order_by('month')
-        user_growth_map = {item['month'].month: item['count'] for item in user_growth_query}
+        metrics.today()  # seeds the rollup on a fresh install
+        days = DailyMetrics.objects.filter(date__gt=timezone.localdate(now) - timedelta(days=365)).values_list(
+            'date', 'signups', 'stories_created', 'stories_by_status', 'stories_by_theme', 'stories_by_art_style'
+        )
+        user_growth_map, stories_by_month_map = Counter(), Counter()
+        stories_by_status, stories_by_theme, stories_by_art_style = Counter(), Counter(), Counter()
+        for day, signups, stories_created, by_status, by_theme, by_art_style in days:
+            user_growth_map[day.month] += signups
+            stories_by_month_map[day.month] += stories_created
+            stories_by_status.update(by_status)
+            stories_by_theme.update(by_theme)
+            stories_by_art_style.update(by_art_style)
         user_growth_data = [{"month": datetime(now.year, m, 1).strftime('%b'), "count": user_growth_map.get(m, 0)} for m in range(1, 13)]
-        stories_by_month_query = StoryProject.objects.filter(created_at__gte=one_year_ago).annotate(month=TruncMonth('created_at')).values('month').annotate(count=Count('id')).order_by('month')
-        stories_by_month_map = {item['month'].month: item['count'] for item in stories_by_month_query}
         stories_by_month_data = [{"month": datetime(now.year, m, 1).strftime('%b'), "count": stories_by_month_map.get(m, 0)} for m in range(1, 13)]
         top_stories_query = StoryProject.objects.order_by('-read_count', '-likes_count')[:5].values('theme', 'read_count', 'likes_count', 'shares_count', 'tags', 'audio_duration_seconds')
         top_stories_data = []
         for story in top_stories_query:
             minutes = round((story.get('audio_duration_seconds') or 0) / 60)
             top_stories_data.append({"theme": story.get('theme'), "read_count": story.get('read_count'), "likes_count": story.get('likes_count'), "shares_count": story.get('shares_count'), "tags": story.get('tags'), "reading_time": f"{minutes} min" if story.get('audio_duration_seconds') else "N/A"})
-        return Response({'user_growth_over_time': user_growth_data, 'stories_created_over_time': stories_by_month_data, 'top_performing_stories': top_stories_data})
+        return Response({'user_growth_over_time': user_growth_data, 'stories_created_over_time': stories_by_month_data, 'stories_by_status': dict(stories_by_status), 'stories_by_theme': dict(stories_by_theme.most_common()), 'stories_by_art_style': dict(stories_by_art_style.most_common()), 'top_performing_stories': top_stories_data})
 
 class SiteSettingsView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAdminUser]
@@ -304,9 +299,12 @@ class UserManagementViewSet(viewsets.ModelViewSet):
         user.is_active = True
         user.save()
 
-        html_message = render_to_string('emails/account_approved_email.html', {'username': user.username, 'login_url': f"{settings.FRONTEND_URL}/login"})
         plain_message = _("Congratulations! Your MagicTale account has been approved. You can now log in at {url}").format(url=f"{settings.FRONTEND_URL}/login")
-        send_email(_('Your MagicTale Account is Approved!'), plain_message, [user.email], html_message=html_message)
+        send_email(
+            _('Your MagicTale Account is Approved!'), plain_message, [user.email],
+            html_template='emails/account_approved_email.html',
+            context={'username': user.username, 'login_url': f"{settings.FRONTEND_URL}/login"},
+        )
 
         return Response({'status': _('User approved and notified successfully.')}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,32 @@
+import time
+from django.core.cache import cache
+
+
+def _initial_version() -> int:
+    # Seeded from the clock so a version key that was evicted never restarts below a version
+    # that cached entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key) or _initial_version()
+    return int(version)
+
+
+def bump_version(key: str) -> int:
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            return get_version(key)
+
+
+def bump_versions(keys) -> None:
+    # Dropping the keys is one round trip; the next read re-seeds them above every previous version.
+    cache.delete_many(list(keys))
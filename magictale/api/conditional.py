@@ -0,0 +1,57 @@
+import json
+from functools import lru_cache, wraps
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import salted_hmac
+from django.utils.http import http_date
+
+ETAG_SALT = "magictale.api.conditional"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the identity of a response body (versions, stamps, ids), not the body itself.
+
+    HMAC'd so a client can only present a matching tag it was previously given."""
+    value = ":".join(str(part) for part in parts)
+    return f'"{salted_hmac(ETAG_SALT, value).hexdigest()[:32]}"'
+
+
+@lru_cache(maxsize=None)
+def settings_fingerprint(*names) -> str:
+    payload = json.dumps([getattr(settings, name, None) for name in names], sort_keys=True, default=str)
+    return salted_hmac(ETAG_SALT, payload).hexdigest()[:16]
+
+
+def evaluate(request, etag: str | None = None, last_modified=None):
+    """Returns a 304 response when the client's validators still match, otherwise None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def tag(response, etag: str | None = None, last_modified=None, private: bool = True):
+    if response.status_code != 304 and not 200 <= response.status_code < 300:
+        return response
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    # Clients may keep the body but must revalidate, and shared caches must not mix users.
+    patch_cache_control(response, no_cache=True, **({"private": True} if private else {"public": True}))
+    return response
+
+
+def conditional(etag_func=None, last_modified_func=None, private: bool = True):
+    """Decorator for APIView handlers whose validators can be computed without building the body.
+
+    The funcs receive the same arguments as the handler; they run after authentication and permissions."""
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            etag = etag_func(view, request, *args, **kwargs) if etag_func else None
+            last_modified = last_modified_func(view, request, *args, **kwargs) if last_modified_func else None
+            not_modified = evaluate(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return tag(not_modified, etag=etag, last_modified=last_modified, private=private)
+            return tag(handler(view, request, *args, **kwargs), etag=etag, last_modified=last_modified, private=private)
+        return wrapper
+    return decorator
@@ -0,0 +1,73 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+
+
+class TimestampCursorPagination(CursorPagination):
+    ordering = ("-timestamp", "-id")
+
+
+class HybridCursorPagination(PageNumberPagination):
+    """Page numbers by default; keyset pagination over (created_at, id) when the client opts in
+    with `?pagination=cursor` or follows a `cursor` link. Ranked searches always use page numbers."""
+
+    mode_query_param = "pagination"
+    ranked_query_params = ("q",)
+    cursor_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = self.cursor_class()
+        self.use_cursor = False
+
+    def wants_cursor(self, request) -> bool:
+        if any(request.query_params.get(param) for param in self.ranked_query_params):
+            return False
+        return (
+            self.cursor_paginator.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == "cursor"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.wants_cursor(request)
+        if self.use_cursor:
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.use_cursor:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        page_schema = super().get_paginated_response_schema(schema)
+        cursor_schema = self.cursor_paginator.get_paginated_response_schema(schema)
+        return {"oneOf": [page_schema, cursor_schema]}
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters += [
+            p for p in self.cursor_paginator.get_schema_operation_parameters(view)
+            if p["name"] == self.cursor_paginator.cursor_query_param
+        ]
+        parameters.append({
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Set to 'cursor' for keyset pagination; the response then carries next/previous cursor links instead of a count.",
+            "schema": {"type": "string", "enum": ["cursor"]},
+        })
+        return parameters
+
+    def get_html_context(self):
+        if self.use_cursor:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.use_cursor:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
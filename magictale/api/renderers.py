@@ -1,3 +1,4 @@
+import json
 import time
 from rest_framework.renderers import JSONRenderer
 from django.utils.translation import gettext as _
@@ -33,4 +34,18 @@ class CustomJSONRenderer(JSONRenderer):
             "data": response_data
         }
 
-        return super().render(response_payload, accepted_media_type, renderer_context)
\ No newline at end of file
+        return super().render(response_payload, accepted_media_type, renderer_context)
+
+
+def render_prerendered(content: bytes, status_code: int = 200, message=None) -> bytes:
+    """Wraps already-rendered JSON `data` in the same envelope CustomJSONRenderer produces."""
+    head = {
+        "success": True,
+        "code": status_code,
+        "message": str(message or _("Operation successful.")),
+        "timestamp": int(time.time()),
+    }
+    return b"".join([
+        json.dumps(head, ensure_ascii=False, separators=(",", ":"))[:-1].encode("utf-8"),
+        b',"data":', content, b"}",
+    ])
@@ -0,0 +1,125 @@
+import logging
+import math
+from django.core.cache import cache
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from rest_framework.throttling import SimpleRateThrottle, AnonRateThrottle, UserRateThrottle, ScopedRateThrottle
+from magictale.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "gcra:"
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Generic cell rate algorithm: the only state per key is the theoretical arrival time (TAT) in ms.
+# A request is allowed while TAT - now stays within the burst window (limit * interval).
+# Uses the Redis server clock so every app replica agrees on "now". All values are whole milliseconds,
+# since SET PX rejects fractions.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - interval * limit
+if allow_at > now then
+    return {0, allow_at - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, 0}
+"""
+
+_scripts = {}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+def _script_for(redis):
+    script = _scripts.get(id(redis))
+    if script is None:
+        script = _scripts[id(redis)] = redis.register_script(GCRA_SCRIPT)
+    return script
+
+
+def _consume_cache(key: str, limit: int, period: int, cost: int) -> tuple[bool, float]:
+    # Fixed-window fallback for the local-memory cache; one integer per key.
+    cache.add(key, 0, timeout=period)
+    try:
+        count = cache.incr(key, cost)
+    except ValueError:
+        cache.set(key, cost, timeout=period)
+        count = cost
+    return (True, 0.0) if count <= limit else (False, float(period))
+
+
+def consume(key: str, limit: int, period: int, cost: int = 1) -> tuple[bool, float]:
+    """Spends `cost` from a `limit`-per-`period` allowance. Returns (allowed, seconds until retry)."""
+    redis = get_redis_connection()
+    if redis is None:
+        return _consume_cache(KEY_PREFIX + key, limit, period, cost)
+
+    # Rounded up, so a rate that doesn't divide the period evenly errs towards fewer requests.
+    interval_ms = math.ceil(period * 1000 / limit)
+    try:
+        allowed, retry_ms = _script_for(redis)(keys=[KEY_PREFIX + key], args=[interval_ms, limit, cost])
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.warning(f"Rate limiter unavailable, allowing request for {key}: {e}")
+        return True, 0.0
+    return bool(allowed), int(retry_ms) / 1000
+
+
+class GCRAThrottleMixin:
+    """Swaps DRF's per-key timestamp list for an O(1) GCRA cell in Redis. Without Redis the DRF behaviour is kept."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        if get_redis_connection() is None:
+            self.retry_after = None
+            return SimpleRateThrottle.allow_request(self, request, view)
+
+        allowed, self.retry_after = consume(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        if getattr(self, "retry_after", None) is not None:
+            return self.retry_after
+        return super().wait()
+
+
+class GCRARateThrottle(GCRAThrottleMixin, SimpleRateThrottle):
+    pass
+
+
+class AnonGCRAThrottle(GCRAThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserGCRAThrottle(GCRAThrottleMixin, UserRateThrottle):
+    pass
+
+
+class ScopedGCRAThrottle(GCRAThrottleMixin, ScopedRateThrottle):
+    """Like ScopedRateThrottle, but subclasses can pick the scope per request by overriding get_scope()."""
+
+    def get_scope(self, request, view):
+        return getattr(view, self.scope_attr, None)
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
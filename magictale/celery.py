@@ -19,6 +19,38 @@ app.conf.beat_schedule = {
         'task': 'authentication.tasks.flush_expired_tokens_task',
         'schedule': crontab(minute=0, hour=2),
     },
+    'flush-story-counters-every-minute': {
+        'task': 'ai.tasks.flush_story_counters_task',
+        'schedule': 60.0,
+    },
+    'flush-activity-logs': {
+        'task': 'authentication.tasks.flush_activity_logs_task',
+        'schedule': 30.0,
+    },
+    'drain-subscription-events-every-minute': {
+        'task': 'subscription.tasks.drain_subscription_events_task',
+        'schedule': 60.0,
+    },
+    'expire-subscriptions-every-5-minutes': {
+        'task': 'subscription.tasks.expire_subscriptions_task',
+        'schedule': 300.0,
+    },
+    'reconcile-subscriptions-every-10-minutes': {
+        'task': 'subscription.tasks.reconcile_subscriptions_task',
+        'schedule': 600.0,
+    },
+    'archive-notifications-daily': {
+        'task': 'notifications.tasks.archive_notifications_task',
+        'schedule': crontab(minute=0, hour=4),
+    },
+    'refresh-dashboard-metrics-every-5-minutes': {
+        'task': 'dashboard.tasks.refresh_daily_metrics_task',
+        'schedule': 300.0,
+    },
+    'prune-activity-logs-daily': {
+        'task': 'authentication.tasks.prune_activity_logs_task',
+        'schedule': crontab(minute=30, hour=3),
+    },
 }
 
 @app.task(bind=True)
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+USER_GROUP = "user_{user_id}"
+
+
+def user_group_name(user_id) -> str:
+    return USER_GROUP.format(user_id=user_id)
+
+
+def send_to_user(user_id, message: dict) -> None:
+    """Best-effort push to every realtime socket the user has open."""
+    try:
+        layer = get_channel_layer()
+        if layer:
+            async_to_sync(layer.group_send)(user_group_name(user_id), message)
+    except Exception as e:
+        logger.error(f"Error sending realtime update to user {user_id}: {e}")
+
+
+def send_to_users(messages) -> None:
+    """Best-effort push of many (user_id, message) pairs in one event-loop hop, the sends running concurrently."""
+    messages = list(messages)
+    layer = get_channel_layer()
+    if not layer or not messages:
+        return
+
+    async def send_all():
+        results = await asyncio.gather(
+            *(layer.group_send(user_group_name(user_id), message) for user_id, message in messages),
+            return_exceptions=True,
+        )
+        for (user_id, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending realtime update to user {user_id}: {result}")
+
+    try:
+        async_to_sync(send_all)()
+    except Exception as e:
+        logger.error(f"Error sending realtime updates to {len(messages)} users: {e}")
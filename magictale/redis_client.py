@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def get_redis_connection():
+    """Raw client for the default cache, or None when running on the local-memory cache."""
+    if not settings.REDIS_URL:
+        return None
+    from django_redis import get_redis_connection as django_redis_connection
+    return django_redis_connection("default")
@@ -12,6 +12,14 @@ environ.Env.read_env(BASE_DIR / '.env')
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env('DEBUG', default=False)
 REVENUECAT_API_KEY = env("REVENUECAT_API_KEY", default="")
+REVENUECAT_API_BASE_URL = env("REVENUECAT_API_BASE_URL", default="https://api.revenuecat.com/v1")
+REVENUECAT_API_TIMEOUT = env.float("REVENUECAT_API_TIMEOUT", default=5.0)
+REVENUECAT_API_POOL_SIZE = env.int("REVENUECAT_API_POOL_SIZE", default=20)
+REVENUECAT_SUBSCRIBER_CACHE_SECONDS = env.int("REVENUECAT_SUBSCRIBER_CACHE_SECONDS", default=60)
+REVENUECAT_RECONCILE_BATCH_SIZE = env.int("REVENUECAT_RECONCILE_BATCH_SIZE", default=200)
+REVENUECAT_RECONCILE_CONCURRENCY = env.int("REVENUECAT_RECONCILE_CONCURRENCY", default=8)
+SUBSCRIPTION_EXPIRY_BATCH_SIZE = env.int("SUBSCRIPTION_EXPIRY_BATCH_SIZE", default=1000)
+SUBSCRIPTION_EXPIRY_GRACE_SECONDS = env.int("SUBSCRIPTION_EXPIRY_GRACE_SECONDS", default=3600)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['127.0.0.1', 'localhost'])
 CSRF_TRUSTED_ORIGINS = env.list('CSRF_TRUSTED_ORIGINS', default=['http://localhost:3000'])
@@ -27,7 +35,7 @@ SECURE_SSL_REDIRECT = env.bool('SECURE_SSL_REDIRECT', default=not DEBUG)
 INSTALLED_APPS =[
     'daphne', 'django.contrib.admin', 'django.contrib.auth', 'django.contrib.contenttypes',
     'django.contrib.sessions', 'django.contrib.messages', 'django.contrib.staticfiles',
-    'django.contrib.sites', 'corsheaders', 'rest_framework', 'rest_framework_simplejwt',
+    'django.contrib.sites', 'django.contrib.postgres', 'corsheaders', 'rest_framework', 'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist', 'channels', 'allauth', 'allauth.account',
     'allauth.socialaccount', 
     'allauth.socialaccount.providers.google', 
@@ -117,10 +125,10 @@ TEMPLATES =[
 ]
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.identity.CachedJWTAuthentication',),
     'DEFAULT_RENDERER_CLASSES': ('magictale.api.renderers.CustomJSONRenderer',),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    'DEFAULT_THROTTLE_CLASSES':['rest_framework.throttling.AnonRateThrottle', 'rest_framework.throttling.UserRateThrottle'],
+    'DEFAULT_THROTTLE_CLASSES':['magictale.api.throttling.AnonGCRAThrottle', 'magictale.api.throttling.UserGCRAThrottle'],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
@@ -128,6 +136,7 @@ REST_FRAMEWORK = {
         'password_reset': '5/hour',
         'story_creation_free': '50/day',
         'story_creation_paid': '10000/day',
+        'ws_connect': '20/min',
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination', 'PAGE_SIZE': 10,
     'EXCEPTION_HANDLER': 'magictale.api.exceptions.custom_exception_handler',
@@ -146,10 +155,15 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7), 'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True, 'BLACKLIST_AFTER_ROTATION': True,
     'TOKEN_OBTAIN_SERIALIZER': 'authentication.serializers.MyTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.EntitlementTokenRefreshSerializer',
     'ALGORITHM': 'HS256', 'SIGNING_KEY': SECRET_KEY,
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use django.core.mail.backends.console.EmailBackend or .filebased.EmailBackend (with EMAIL_FILE_PATH) locally and in tests.
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default=str(BASE_DIR / 'tmp' / 'emails'))
+EMAIL_TIMEOUT = env.int('EMAIL_TIMEOUT', default=10)
+EMAIL_CONNECTION_IDLE_SECONDS = env.int('EMAIL_CONNECTION_IDLE_SECONDS', default=60)
 EMAIL_HOST = env('EMAIL_HOST')
 EMAIL_PORT = env.int('EMAIL_PORT', default=587)
 EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
@@ -161,7 +175,13 @@ OPENAI_API_KEY = env("OPENAI_API_KEY")
 ELEVENLABS_API_KEY = env("ELEVENLABS_API_KEY")
 BACKEND_BASE_URL = env('BACKEND_BASE_URL', default='http://127.0.0.1:8001')
 
+GOOGLE_CLIENT_ID = env('GOOGLE_CLIENT_ID')
+APPLE_CLIENT_ID = env('APPLE_CLIENT_ID')
+
 REVENUECAT_WEBHOOK_AUTH_HEADER = env("REVENUECAT_WEBHOOK_AUTH_HEADER", default=None)
+REVENUECAT_WEBHOOK_MAX_ATTEMPTS = env.int("REVENUECAT_WEBHOOK_MAX_ATTEMPTS", default=5)
+REVENUECAT_WEBHOOK_DRAIN_BATCH_SIZE = env.int("REVENUECAT_WEBHOOK_DRAIN_BATCH_SIZE", default=500)
+REVENUECAT_WEBHOOK_QUEUED_SECONDS = env.int("REVENUECAT_WEBHOOK_QUEUED_SECONDS", default=300)
 
 REDIS_URL = env("REDIS_URL", default=None)
 
@@ -193,12 +213,44 @@ else:
         raise ImproperlyConfigured("REDIS_URL is missing! Celery cannot work in production without Redis.")
     
     CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
-    CELERY_BROKER_URL, CELERY_RESULT_BACKEND = 'memory://', 'django-db'
+    CELERY_BROKER_URL, CELERY_RESULT_BACKEND = 'memory://', 'cache+memory://'
     CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'unique-snowflake-for-magictale'}}
 
+STORY_COUNTER_DEDUPE_SECONDS = env.int('STORY_COUNTER_DEDUPE_SECONDS', default=0)
+STORY_COUNTER_FLUSH_LOCK_SECONDS = env.int('STORY_COUNTER_FLUSH_LOCK_SECONDS', default=300)
+STORY_RESPONSE_CACHE_SECONDS = env.int('STORY_RESPONSE_CACHE_SECONDS', default=3600)
+STORY_BATCH_MAX_IDS = env.int('STORY_BATCH_MAX_IDS', default=20)
+STORY_BULK_MAX_IDS = env.int('STORY_BULK_MAX_IDS', default=100)
+IDENTITY_CACHE_SECONDS = env.int('IDENTITY_CACHE_SECONDS', default=300)
+IDENTITY_LOCAL_CACHE_SECONDS = env.int('IDENTITY_LOCAL_CACHE_SECONDS', default=5)
+IDENTITY_LOCAL_CACHE_SIZE = env.int('IDENTITY_LOCAL_CACHE_SIZE', default=10000)
+ENTITLEMENT_CLAIMS_SECONDS = env.int('ENTITLEMENT_CLAIMS_SECONDS', default=900)
+STORY_PROGRESS_TTL_SECONDS = env.int('STORY_PROGRESS_TTL_SECONDS', default=86400)
+STORY_PROGRESS_DEBOUNCE_MS = env.int('STORY_PROGRESS_DEBOUNCE_MS', default=250)
+STORY_EVENTS_HEARTBEAT_SECONDS = env.int('STORY_EVENTS_HEARTBEAT_SECONDS', default=15)
+STORY_EVENTS_RETRY_MS = env.int('STORY_EVENTS_RETRY_MS', default=3000)
+GOOGLE_CERTS_URL = env('GOOGLE_CERTS_URL', default='https://www.googleapis.com/oauth2/v3/certs')
+GOOGLE_USERINFO_URL = env('GOOGLE_USERINFO_URL', default='https://www.googleapis.com/oauth2/v3/userinfo')
+APPLE_KEYS_URL = env('APPLE_KEYS_URL', default='https://appleid.apple.com/auth/keys')
+SOCIAL_HTTP_TIMEOUT = env.float('SOCIAL_HTTP_TIMEOUT', default=5.0)
+SOCIAL_HTTP_POOL_SIZE = env.int('SOCIAL_HTTP_POOL_SIZE', default=20)
+SOCIAL_JWKS_DEFAULT_AGE_SECONDS = env.int('SOCIAL_JWKS_DEFAULT_AGE_SECONDS', default=3600)
+SOCIAL_JWKS_MIN_AGE_SECONDS = env.int('SOCIAL_JWKS_MIN_AGE_SECONDS', default=60)
+SOCIAL_JWKS_MAX_AGE_SECONDS = env.int('SOCIAL_JWKS_MAX_AGE_SECONDS', default=86400)
+SOCIAL_JWKS_REFRESH_SECONDS = env.int('SOCIAL_JWKS_REFRESH_SECONDS', default=60)
+ACTIVITY_LOG_FLUSH_BATCH_SIZE = env.int('ACTIVITY_LOG_FLUSH_BATCH_SIZE', default=1000)
+ACTIVITY_LOG_FLUSH_LOCK_SECONDS = env.int('ACTIVITY_LOG_FLUSH_LOCK_SECONDS', default=300)
+ACTIVITY_LOG_RETENTION_DAYS = env.int('ACTIVITY_LOG_RETENTION_DAYS', default=180)
+ACTIVITY_LOG_PRUNE_BATCH_SIZE = env.int('ACTIVITY_LOG_PRUNE_BATCH_SIZE', default=5000)
+BREACHED_PASSWORDS_INDEX = env('BREACHED_PASSWORDS_INDEX', default=None)
+BREACHED_PASSWORDS_ONLINE = env.bool('BREACHED_PASSWORDS_ONLINE', default=False)
+BREACHED_PASSWORDS_TIMEOUT = env.float('BREACHED_PASSWORDS_TIMEOUT', default=2.0)
+BREACHED_PASSWORDS_RANGE_CACHE_SECONDS = env.int('BREACHED_PASSWORDS_RANGE_CACHE_SECONDS', default=86400)
+
 CELERY_ACCEPT_CONTENT, CELERY_TASK_SERIALIZER = ['json'], 'json'
 CELERY_RESULT_SERIALIZER, CELERY_TIMEZONE = 'json', 'UTC'
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+CELERY_TASK_ROUTES = {'authentication.tasks.send_email_task': {'queue': 'email'}}
 
 LOGGING = {
     'version': 1,
@@ -287,6 +339,14 @@ FCM_DJANGO_SETTINGS = {
     "DELETE_INACTIVE_DEVICES": True,
     "FCM_CREDENTIALS": env('FIREBASE_SERVICE_ACCOUNT_PATH', default=None),
 }
+PUSH_BACKEND = env('PUSH_BACKEND', default='notifications.push.FCMBackend')
+PUSH_STANDIN_URL = env('PUSH_STANDIN_URL', default='http://127.0.0.1:8767')
+NOTIFICATION_UNREAD_COUNT_SECONDS = env.int('NOTIFICATION_UNREAD_COUNT_SECONDS', default=3600)
+NOTIFICATION_RETENTION_DAYS = env.int('NOTIFICATION_RETENTION_DAYS', default=90)
+NOTIFICATION_ARCHIVE_BATCH_SIZE = env.int('NOTIFICATION_ARCHIVE_BATCH_SIZE', default=1000)
+NOTIFICATION_ARCHIVE_PAUSE_MS = env.int('NOTIFICATION_ARCHIVE_PAUSE_MS', default=100)
+NOTIFICATION_FANOUT_CHUNK_SIZE = env.int('NOTIFICATION_FANOUT_CHUNK_SIZE', default=1000)
+DASHBOARD_METRICS_REFRESH_DAYS = env.int('DASHBOARD_METRICS_REFRESH_DAYS', default=2)
 AI_TEXT_MODEL = env("AI_TEXT_MODEL", default="gpt-4o-2024-08-06")
 AI_IMAGE_MODEL = env("AI_IMAGE_MODEL", default="dall-e-3")
 AI_AUDIO_MODEL = env("AI_AUDIO_MODEL", default="tts-1")
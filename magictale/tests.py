@@ -0,0 +1,45 @@
+import time
+from unittest import mock
+
+import fakeredis
+from django.test import SimpleTestCase
+
+from magictale.api import throttling
+
+
+class GCRAConsumeTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(throttling, "get_redis_connection", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rate_that_does_not_divide_the_period_still_limits(self):
+        # 60000 / 7 is not a whole number of milliseconds.
+        results = [throttling.consume("uneven", 7, 60) for _ in range(8)]
+
+        self.assertTrue(all(allowed for allowed, _ in results[:7]))
+        allowed, retry_after = results[7]
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 60 / 7, delta=0.1)
+        self.assertGreater(self.redis.pttl(throttling.KEY_PREFIX + "uneven"), 0)
+
+    def test_burst_then_refill(self):
+        burst = [throttling.consume("refill", 10, 1)[0] for _ in range(10)]
+        self.assertEqual(burst, [True] * 10)
+        self.assertFalse(throttling.consume("refill", 10, 1)[0])
+
+        time.sleep(0.25)
+        # Two 100ms intervals have passed, so two more requests fit and the third doesn't.
+        self.assertTrue(throttling.consume("refill", 10, 1)[0])
+        self.assertTrue(throttling.consume("refill", 10, 1)[0])
+        self.assertFalse(throttling.consume("refill", 10, 1)[0])
+
+    def test_script_errors_are_not_swallowed(self):
+        self.redis.set(throttling.KEY_PREFIX + "broken", "not-a-number")
+        with self.assertRaises(Exception):
+            throttling.consume("broken", 7, 60)
+
+    def test_connection_errors_fail_open(self):
+        with mock.patch.object(throttling, "_script_for", side_effect=throttling.RedisConnectionError("down")):
+            self.assertEqual(throttling.consume("down", 1, 60), (True, 0.0))
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, ArchivedNotification
+from . import unread
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -23,9 +24,23 @@ class NotificationAdmin(admin.ModelAdmin):
     )
 
     def mark_as_read(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True).distinct())
         queryset.update(read=True)
+        unread.invalidate(user_ids)
     mark_as_read.short_description = "Mark selected notifications as read"
 
     def mark_as_unread(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True).distinct())
         queryset.update(read=False)
-    mark_as_unread.short_description = "Mark selected notifications as unread"
\ No newline at end of file
+        unread.invalidate(user_ids)
+    mark_as_unread.short_description = "Mark selected notifications as unread"
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user_id', 'title', 'read', 'created_at', 'archived_at')
+    search_fields = ('user_id', 'title')
+    readonly_fields = ('user_id', 'title', 'body', 'read', 'data', 'created_at', 'archived_at')
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
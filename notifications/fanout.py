@@ -0,0 +1,120 @@
+import logging
+import time
+from dataclasses import dataclass, asdict
+from django.conf import settings
+from django.contrib.auth.models import User
+from fcm_django.models import FCMDevice
+from fcm_django.settings import FCM_DJANGO_SETTINGS
+from magictale.realtime import send_to_users
+from .models import Notification
+from .push import MULTICAST_LIMIT, get_backend
+from .serializers import NotificationSerializer
+from . import retention, unread
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FanOutReport:
+    users: int = 0
+    notifications: int = 0
+    devices: int = 0
+    pushed: int = 0
+    push_failed: int = 0
+    deactivated: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.notifications / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "per_second": round(self.per_second, 1)}
+
+
+def _user_id_chunks(user_ids=None, filters=None):
+    """Yields user ids in primary-key order, a chunk at a time, from explicit ids or User filters.
+
+    Campaigns reach active users only. Explicit ids are sent as given, so an account still waiting on
+    email verification gets its welcome notification."""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    else:
+        users = users.filter(is_active=True)
+    if filters:
+        users = users.filter(**filters)
+
+    chunk_size = settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    last_id = 0
+    while True:
+        chunk = list(users.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def _push(user_ids, title, body, data, report: FanOutReport):
+    devices = list(
+        FCMDevice.objects.filter(user_id__in=user_ids, active=True, user__profile__allow_push_notifications=True)
+        .values_list("registration_id", flat=True)
+    )
+    report.devices += len(devices)
+    if not devices:
+        return
+
+    backend = get_backend()
+    invalid = []
+    for start in range(0, len(devices), MULTICAST_LIMIT):
+        tokens = devices[start:start + MULTICAST_LIMIT]
+        try:
+            result = backend.send_multicast(tokens, title, body, data)
+        except Exception as e:
+            logger.error(f"Push batch of {len(tokens)} failed: {e}")
+            report.push_failed += len(tokens)
+            continue
+        report.pushed += result.sent
+        report.push_failed += result.failed
+        invalid += result.invalid_tokens
+
+    if invalid:
+        devices = FCMDevice.objects.filter(registration_id__in=invalid)
+        report.deactivated += devices.update(active=False)
+        if FCM_DJANGO_SETTINGS["DELETE_INACTIVE_DEVICES"]:
+            devices.delete()
+
+
+def fan_out(title: str, body: str, data=None, user_ids=None, filters=None, realtime: bool = True) -> FanOutReport:
+    """Creates a notification for every selected user and pushes it to their devices.
+
+    Notifications are inserted with bulk_create a chunk of users at a time; each chunk's unread counters move
+    in one Redis round trip and its realtime events go out together. Device tokens go out in multicast
+    batches of up to 500. Tokens FCM reports as invalid are deactivated in one update per chunk."""
+    report = FanOutReport()
+    started = time.monotonic()
+    data = data or {}
+
+    for chunk in _user_id_chunks(user_ids, filters):
+        notifications = Notification.objects.bulk_create(
+            [Notification(user_id=user_id, title=title, body=body, data=data) for user_id in chunk]
+        )
+        report.users += len(chunk)
+        report.notifications += len(notifications)
+        retention.coalesce(chunk, data)
+
+        counts = unread.adjust_many(chunk, 1)
+        if realtime:
+            send_to_users(
+                (notification.user_id, {
+                    "type": "notification_created",
+                    "notification": NotificationSerializer(notification).data,
+                    "unread_count": counts.get(notification.user_id),
+                })
+                for notification in notifications
+            )
+
+        _push(chunk, title, body, data, report)
+
+    report.seconds = time.monotonic() - started
+    return report
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeFCM:
+    """Delivery counters shared by the request handler threads."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "messages": 0, "delivered": 0, "unregistered": 0}
+
+
+def make_handler(fake: FakeFCM, stdout, verbose: bool):
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path != "/stats":
+                self._json(404, {"error": "NOT_FOUND"})
+                return
+            with fake.lock:
+                self._json(200, dict(fake.stats))
+
+        def do_POST(self):
+            if self.path != "/multicast":
+                self._json(404, {"error": "NOT_FOUND"})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            tokens = body.get("tokens", [])
+            if len(tokens) > 500:
+                self._json(400, {"error": "INVALID_ARGUMENT", "message": "At most 500 tokens per multicast."})
+                return
+
+            time.sleep(fake.latency)
+            # Tokens starting with "invalid" behave like uninstalled apps.
+            results = [{"error": "UNREGISTERED"} if t.startswith("invalid") else {"name": f"messages/{i}"} for i, t in enumerate(tokens)]
+            unregistered = sum(1 for r in results if "error" in r)
+            with fake.lock:
+                fake.stats["requests"] += 1
+                fake.stats["messages"] += len(tokens)
+                fake.stats["delivered"] += len(tokens) - unregistered
+                fake.stats["unregistered"] += unregistered
+            self._json(200, {"results": results})
+
+        def log_message(self, format, *args):
+            if verbose:
+                stdout.write(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for FCM multicast, for exercising notification fan-out without Firebase. Set "
+        "PUSH_BACKEND=notifications.push.StandInBackend and PUSH_STANDIN_URL to the printed URL. Tokens "
+        "starting with 'invalid' are rejected as unregistered; /stats reports totals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8767)
+        parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to each multicast request.")
+        parser.add_argument("--quiet", action="store_true", help="Don't log each request.")
+
+    def handle(self, *args, **options):
+        fake = FakeFCM(options["latency_ms"] / 1000)
+        server = ThreadingHTTPServer((options["host"], options["port"]), make_handler(fake, self.stdout, not options["quiet"]))
+        self.stdout.write(self.style.SUCCESS(f"Fake FCM server on http://{options['host']}:{options['port']}"))
+        self.stdout.write(f"  PUSH_STANDIN_URL=http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.fanout import fan_out
+from notifications.tasks import fan_out_notification_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends one notification to many users: to the given --user-id values, to users matching --filter "
+        "lookups, or to every active user with --all. Queued as a Celery task unless --now is passed, in which "
+        "case it runs here and prints the throughput report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("title")
+        parser.add_argument("body")
+        parser.add_argument("--data", default="{}", help="JSON object attached to the notification.")
+        parser.add_argument("--user-id", type=int, action="append", dest="user_ids")
+        parser.add_argument("--filter", action="append", default=[], help="User lookup as key=value; repeatable.")
+        parser.add_argument("--all", action="store_true", help="Every active user.")
+        parser.add_argument("--now", action="store_true", help="Run in this process instead of queueing.")
+
+    def handle(self, *args, **options):
+        try:
+            data = json.loads(options["data"])
+        except ValueError as e:
+            raise CommandError(f"--data is not valid JSON: {e}")
+
+        filters = {}
+        for item in options["filter"]:
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"--filter '{item}' must be key=value.")
+            filters[key] = {"true": True, "false": False}.get(value.lower(), value)
+
+        if not (options["user_ids"] or filters or options["all"]):
+            raise CommandError("Choose recipients with --user-id, --filter or --all.")
+
+        kwargs = {"data": data, "user_ids": options["user_ids"], "filters": filters or None}
+        if not options["now"]:
+            fan_out_notification_task.delay(options["title"], options["body"], **kwargs)
+            self.stdout.write(self.style.SUCCESS("Queued."))
+            return
+
+        report = fan_out(options["title"], options["body"], **kwargs)
+        for key, value in report.as_dict().items():
+            self.stdout.write(f"{key:>14}: {value}")
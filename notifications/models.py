@@ -11,6 +11,24 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'read', 'created_at'], name='notification_user_read_idx'),
+            models.Index(fields=['created_at'], name='notification_created_idx'),
+        ]
 
     def __str__(self):
-        return f"Notification for {self.user.username}: {self.title}"
\ No newline at end of file
+        return f"Notification for {self.user.username}: {self.title}"
+
+
+class ArchivedNotification(models.Model):
+    """Cold copy of notifications past retention. No foreign key, so archiving never locks or joins users."""
+    user_id = models.BigIntegerField(db_index=True)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    read = models.BooleanField(default=False)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived notification for user {self.user_id}: {self.title}"
\ No newline at end of file
@@ -0,0 +1,73 @@
+import json
+import logging
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# FCM's limit for one multicast request.
+MULTICAST_LIMIT = 500
+# Per-token errors that mean the token itself is dead. INVALID_ARGUMENT is left out: FCM returns it for
+# every token when the message is bad (a reserved data key, an oversized payload), not the tokens.
+DEAD_TOKEN_ERRORS = ("UNREGISTERED", "SENDER_ID_MISMATCH")
+
+
+def _string_data(data: dict | None) -> dict[str, str]:
+    # FCM data payloads are string-to-string; nested values travel as JSON.
+    return {str(k): v if isinstance(v, str) else json.dumps(v) for k, v in (data or {}).items()}
+
+
+class PushResult:
+    def __init__(self, sent: int = 0, failed: int = 0, invalid_tokens=None):
+        self.sent = sent
+        self.failed = failed
+        self.invalid_tokens = invalid_tokens or []
+
+
+class FCMBackend:
+    """Firebase Cloud Messaging through firebase_admin, using the app fcm_django initialises."""
+
+    def send_multicast(self, tokens: list[str], title: str, body: str, data=None) -> PushResult:
+        from firebase_admin import messaging
+        from fcm_django.settings import FCM_DJANGO_SETTINGS
+
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            data=_string_data(data),
+        )
+        response = messaging.send_each_for_multicast(message, app=FCM_DJANGO_SETTINGS["DEFAULT_FIREBASE_APP"])
+
+        invalid = [
+            token for token, item in zip(tokens, response.responses)
+            if isinstance(item.exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError))
+        ]
+        return PushResult(response.success_count, response.failure_count, invalid)
+
+
+class StandInBackend:
+    """Posts each multicast batch to PUSH_STANDIN_URL, e.g. `manage.py fake_fcm_server`, for local runs."""
+
+    def __init__(self):
+        self.client = httpx.Client(base_url=settings.PUSH_STANDIN_URL, timeout=10)
+
+    def send_multicast(self, tokens: list[str], title: str, body: str, data=None) -> PushResult:
+        response = self.client.post("/multicast", json={
+            "tokens": tokens, "notification": {"title": title, "body": body}, "data": _string_data(data),
+        })
+        response.raise_for_status()
+        results = response.json()["results"]
+        invalid = [token for token, r in zip(tokens, results) if r.get("error") in DEAD_TOKEN_ERRORS]
+        sent = sum(1 for r in results if not r.get("error"))
+        return PushResult(sent, len(results) - sent, invalid)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.PUSH_BACKEND)()
+    return _backend
@@ -0,0 +1,70 @@
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification, ArchivedNotification
+from . import unread
+
+logger = logging.getLogger(__name__)
+
+# A notification of the key type replaces the user's earlier ones of these types for the same story.
+SUPERSEDES = {
+    "story_complete": ("story_building",),
+}
+
+
+def coalesce(user_ids, data: dict) -> int:
+    """Deletes the notifications a new one with `data` supersedes, keeping unread counters in step."""
+    superseded_types = SUPERSEDES.get((data or {}).get("type"))
+    story_id = (data or {}).get("story_id")
+    if not superseded_types or story_id is None:
+        return 0
+
+    rows = list(
+        Notification.objects
+        .filter(user_id__in=user_ids, data__type__in=superseded_types, data__story_id=story_id)
+        .values_list("pk", "user_id", "read")
+    )
+    if not rows:
+        return 0
+
+    Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    for user_id, count in Counter(user_id for _, user_id, read in rows if not read).items():
+        unread.adjust(user_id, -count)
+    return len(rows)
+
+
+def archive(now=None) -> int:
+    """Moves notifications older than NOTIFICATION_RETENTION_DAYS into ArchivedNotification.
+
+    Each batch is its own short transaction that skips rows other transactions hold, with a pause between
+    batches, so it can run alongside live traffic."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    batch_size = settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+    archived = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.select_for_update(skip_locked=True)
+                .filter(created_at__lt=cutoff).order_by("created_at")[:batch_size]
+            )
+            if not batch:
+                return archived
+            ArchivedNotification.objects.bulk_create([
+                ArchivedNotification(
+                    user_id=n.user_id, title=n.title, body=n.body, read=n.read, data=n.data, created_at=n.created_at,
+                )
+                for n in batch
+            ])
+            Notification.objects.filter(pk__in=[n.pk for n in batch]).delete()
+            unread_user_ids = {n.user_id for n in batch if not n.read}
+            transaction.on_commit(lambda user_ids=unread_user_ids: unread.invalidate(user_ids))
+
+        archived += len(batch)
+        if len(batch) < batch_size:
+            return archived
+        time.sleep(settings.NOTIFICATION_ARCHIVE_PAUSE_MS / 1000)
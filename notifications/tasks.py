@@ -1,36 +1,35 @@
 from celery import shared_task
-from django.contrib.auth.models import User
-from fcm_django.models import FCMDevice
-from .models import Notification
+from .fanout import fan_out
+from . import retention
 
 @shared_task
 def create_and_send_notification_task(user_id, title, body, data=None):
     try:
-        user = User.objects.select_related('profile').get(id=user_id)
+        report = fan_out(title, body, data, user_ids=[user_id])
+        if not report.users:
+            print(f"Could not process notification: User with id={user_id} not found.")
+            return
+        print(f"Saved notification for user {user_id}; pushed to {report.pushed} of {report.devices} device(s).")
+    except Exception as e:
+        print(f"An error occurred while sending notification for user {user_id}: {e}")
 
-        Notification.objects.create(
-            user=user,
-            title=title,
-            body=body,
-            data=data or {}
+@shared_task
+def fan_out_notification_task(title, body, data=None, user_ids=None, filters=None):
+    """`filters` are User queryset lookups, e.g. {"profile__allow_push_notifications": True}."""
+    try:
+        report = fan_out(title, body, data, user_ids=user_ids, filters=filters)
+        print(
+            f"Fan-out '{title}': {report.notifications} notifications, {report.pushed}/{report.devices} pushes, "
+            f"{report.deactivated} tokens deactivated in {report.seconds:.1f}s ({report.per_second:.0f}/s)."
         )
-        print(f"Saved notification for user {user_id}")
-
-        if user.profile.allow_push_notifications:
-            devices = FCMDevice.objects.filter(user=user, active=True)
-            if devices:
-                devices.send_message(
-                    title=title,
-                    body=body,
-                    data=data or {}
-                )
-                print(f"Sent PUSH notification to user {user_id}")
-            else:
-                print(f"User {user_id} has push notifications enabled but no active devices.")
-        else:
-            print(f"Skipping PUSH notification for user {user_id} (disabled in profile).")
+        return report.as_dict()
+    except Exception as e:
+        print(f"Fan-out '{title}' failed: {e}")
 
-    except User.DoesNotExist:
-        print(f"Could not process notification: User with id={user_id} not found.")
+@shared_task
+def archive_notifications_task():
+    try:
+        archived = retention.archive()
+        print(f"Archived {archived} notifications past retention.")
     except Exception as e:
-        print(f"An error occurred while sending notification for user {user_id}: {e}")
\ No newline at end of file
+        print(f"Error archiving notifications: {e}")
@@ -1,3 +1,99 @@
-from django.test import TestCase
-
-# Create your tests here.
+from types import SimpleNamespace
+from unittest import mock
+
+import fakeredis
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django_redis import get_redis_connection
+
+from . import fanout, unread
+from .fanout import fan_out
+from .push import FCMBackend
+from .models import Notification
+from .tasks import create_and_send_notification_task
+
+
+class FanOutRecipientTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pending = User.objects.create_user(username="pending", email="pending@example.com", password="x", is_active=False)
+        cls.active = User.objects.create_user(username="active", email="active@example.com", password="x")
+
+    def test_single_user_send_reaches_an_unverified_account(self):
+        create_and_send_notification_task(self.pending.id, "Welcome to MagicTale!", "Your account has been created successfully.")
+
+        self.assertTrue(Notification.objects.filter(user=self.pending, title="Welcome to MagicTale!").exists())
+
+    def test_campaign_skips_inactive_accounts(self):
+        report = fan_out("News", "Something new", realtime=False)
+
+        self.assertEqual(report.users, 1)
+        self.assertEqual(list(Notification.objects.values_list("user_id", flat=True)), [self.active.id])
+
+
+class FCMBackendTests(SimpleTestCase):
+    def _send(self, exception):
+        from firebase_admin import messaging
+
+        tokens = ["token-a", "token-b"]
+        response = SimpleNamespace(
+            success_count=0, failure_count=len(tokens),
+            responses=[SimpleNamespace(exception=exception) for _ in tokens],
+        )
+        with mock.patch.object(messaging, "send_each_for_multicast", return_value=response):
+            return FCMBackend().send_multicast(tokens, "Title", "Body", {"type": "announcement"})
+
+    def test_message_level_invalid_argument_keeps_tokens(self):
+        from firebase_admin.exceptions import InvalidArgumentError
+
+        result = self._send(InvalidArgumentError("Invalid data payload key: from"))
+
+        self.assertEqual(result.failed, 2)
+        self.assertEqual(result.invalid_tokens, [])
+
+    def test_unregistered_tokens_are_reported(self):
+        from firebase_admin import messaging
+
+        result = self._send(messaging.UnregisteredError("Requested entity was not found."))
+
+        self.assertEqual(result.invalid_tokens, ["token-a", "token-b"])
+
+
+FAKE_REDIS_CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://fake/1",
+        "OPTIONS": {"CONNECTION_POOL_KWARGS": {"connection_class": fakeredis.FakeConnection}},
+    }
+}
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class FanOutBatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f"reader{i}", email=f"reader{i}@example.com", password="x")
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(unread, "get_redis_connection", side_effect=lambda: get_redis_connection("default"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counters_and_realtime_events_go_out_per_chunk(self):
+        warm, cold = self.users[:2], self.users[2]
+        for user in warm:
+            self.assertEqual(unread.get_count(user.id), 0)
+
+        with mock.patch.object(unread, "adjust") as adjust, mock.patch.object(fanout, "send_to_users") as send:
+            fan_out("News", "Something new", user_ids=[u.id for u in self.users])
+
+        adjust.assert_not_called()
+        send.assert_called_once()
+        events = dict(send.call_args.args[0])
+        self.assertEqual({user_id: event["unread_count"] for user_id, event in events.items()}, {warm[0].id: 1, warm[1].id: 1, cold.id: None})
+        self.assertEqual([unread.get_count(u.id) for u in self.users], [1, 1, 1])
@@ -0,0 +1,90 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from magictale.realtime import send_to_user
+from magictale.redis_client import get_redis_connection
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_COUNT_KEY = "notifications_unread_{user_id}"
+
+# adjust() for many counters in one round trip: bumps only counters that exist, drops any that go negative.
+ADJUST_MANY_SCRIPT = """
+local counts = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        local count = redis.call('INCRBY', key, ARGV[1])
+        if count < 0 then
+            redis.call('DEL', key)
+            count = -1
+        end
+        counts[i] = count
+    else
+        counts[i] = -1
+    end
+end
+return counts
+"""
+
+_scripts = {}
+
+
+def _key(user_id) -> str:
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def get_count(user_id) -> int:
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read=False).count()
+        # add, not set: never overwrite a counter another request seeded and has since adjusted.
+        cache.add(_key(user_id), count, timeout=settings.NOTIFICATION_UNREAD_COUNT_SECONDS)
+    return max(int(count), 0)
+
+
+def adjust(user_id, delta: int) -> int | None:
+    """Applies `delta` to a cached counter. Returns the new count, or None when nothing is cached and
+    the next read will count from the table anyway."""
+    try:
+        count = cache.incr(_key(user_id), delta)
+    except ValueError:
+        return None
+    if count < 0:
+        # Drifted below zero (a write the counter never saw); recount on the next read.
+        cache.delete(_key(user_id))
+        return None
+    return count
+
+
+def adjust_many(user_ids, delta: int) -> dict:
+    """adjust() for a batch of users. Returns {user_id: new count or None}."""
+    user_ids = list(user_ids)
+    redis = get_redis_connection()
+    if redis is None or not user_ids:
+        return {user_id: adjust(user_id, delta) for user_id in user_ids}
+
+    script = _scripts.get(id(redis))
+    if script is None:
+        script = _scripts[id(redis)] = redis.register_script(ADJUST_MANY_SCRIPT)
+    try:
+        counts = script(keys=[cache.make_key(_key(user_id)) for user_id in user_ids], args=[delta])
+    except Exception as e:
+        logger.warning(f"Could not adjust {len(user_ids)} unread counters, dropping them: {e}")
+        invalidate(user_ids)
+        return dict.fromkeys(user_ids)
+    return {user_id: (int(count) if int(count) >= 0 else None) for user_id, count in zip(user_ids, counts)}
+
+
+def reset(user_id, count: int = 0):
+    cache.set(_key(user_id), count, timeout=settings.NOTIFICATION_UNREAD_COUNT_SECONDS)
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(user_id) for user_id in set(user_ids)])
+
+
+def push(user_id, count: int | None = None):
+    if count is None:
+        count = get_count(user_id)
+    send_to_user(user_id, {"type": "unread_count", "count": count})
@@ -2,9 +2,12 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Notification
+from . import unread
 from .serializers import NotificationSerializer
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, inline_serializer
+from rest_framework import serializers
 from drf_spectacular.types import OpenApiTypes
+from magictale.api.pagination import HybridCursorPagination
 
 @extend_schema(
     parameters=[OpenApiParameter("id", OpenApiTypes.INT, OpenApiParameter.PATH, description="ID of the notification")]
@@ -14,9 +17,15 @@ class NotificationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     http_method_names = ['get', 'post', 'delete']
     lookup_url_kwarg = 'id'
+    pagination_class = HybridCursorPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).select_related('user')
+        return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        if not instance.read:
+            unread.push(instance.user_id, unread.adjust(instance.user_id, -1))
 
     @extend_schema(
         parameters=[OpenApiParameter("id", OpenApiTypes.INT, OpenApiParameter.PATH, description="ID of the notification")],
@@ -24,13 +33,22 @@ class NotificationViewSet(viewsets.ModelViewSet):
         responses={204: OpenApiResponse(description="Notification marked as read")}
     )
     @action(detail=True, methods=['post'], url_path='mark-read')
-    def mark_as_read(self, request, pk=None):
+    def mark_as_read(self, request, id=None):
         notification = self.get_object()
-        notification.read = True
-        notification.save(update_fields=['read'])
+        if Notification.objects.filter(pk=notification.pk, read=False).update(read=True):
+            unread.push(request.user.id, unread.adjust(request.user.id, -1))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['post'], url_path='mark-all-read')
     def mark_all_as_read(self, request):
-        self.get_queryset().update(read=True)
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        if self.get_queryset().filter(read=False).update(read=True):
+            unread.reset(request.user.id)
+            unread.push(request.user.id, 0)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @extend_schema(
+        responses={200: inline_serializer(name='UnreadCountResponse', fields={'unread_count': serializers.IntegerField()})}
+    )
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({"unread_count": unread.get_count(request.user.id)})
\ No newline at end of file
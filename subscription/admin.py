@@ -9,10 +9,14 @@ class SubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(ProcessedWebhookEvent)
 class ProcessedWebhookEventAdmin(admin.ModelAdmin):
-    list_display = ('event_id', 'processed_at')
-    search_fields = ('event_id',)
-    ordering = ('-processed_at',)
-    readonly_fields = ('event_id', 'processed_at')
+    list_display = ('event_id', 'event_type', 'app_user_id', 'status', 'attempts', 'received_at', 'processed_at')
+    search_fields = ('event_id', 'app_user_id')
+    list_filter = ('status', 'event_type')
+    ordering = ('-received_at',)
+    readonly_fields = (
+        'event_id', 'app_user_id', 'event_type', 'event_timestamp_ms', 'payload', 'status', 'attempts', 'error',
+        'received_at', 'processed_at',
+    )
 
     def has_add_permission(self, request):
         return False
@@ -0,0 +1,112 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SUBSCRIBER_PATH = re.compile(r"^/v1/subscribers/([^/?]+)$")
+FAKE_PATH = re.compile(r"^/fake/subscribers/([^/?]+)$")
+
+
+class FakeRevenueCat:
+    """Subscriber documents plus per-user hit counts, shared by the request handler threads."""
+
+    def __init__(self, plan: str, latency: float):
+        self.plan = plan
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.hits = {}
+
+    def entitlements_for(self, plan: str) -> dict:
+        if plan == "none":
+            return {}
+        expires = (datetime.now(timezone.utc) + timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return {plan: {"expires_date": expires, "product_identifier": f"{plan}_monthly"}}
+
+    def document(self, app_user_id: str) -> dict:
+        with self.lock:
+            entitlements = self.subscribers.get(app_user_id)
+        if entitlements is None:
+            entitlements = self.entitlements_for(self.plan)
+        return {"subscriber": {"original_app_user_id": app_user_id, "entitlements": entitlements}}
+
+
+def make_handler(fake: FakeRevenueCat, stdout):
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/fake/stats":
+                with fake.lock:
+                    self._json(200, dict(fake.hits))
+                return
+
+            match = SUBSCRIBER_PATH.match(self.path)
+            if not match:
+                self._json(404, {"message": "Not found"})
+                return
+            if self.headers.get("Authorization") != f"Bearer {settings.REVENUECAT_API_KEY}":
+                self._json(401, {"message": "Invalid API key"})
+                return
+
+            app_user_id = match.group(1)
+            with fake.lock:
+                fake.hits[app_user_id] = fake.hits.get(app_user_id, 0) + 1
+            time.sleep(fake.latency)
+            if not app_user_id.isdigit():
+                self._json(404, {"message": "Subscriber not found"})
+                return
+            self._json(200, fake.document(app_user_id))
+
+        def do_POST(self):
+            # {"plan": "master" | "creator" | "none"} sets what later GETs for this user return.
+            match = FAKE_PATH.match(self.path)
+            if not match:
+                self._json(404, {"message": "Not found"})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            with fake.lock:
+                fake.subscribers[match.group(1)] = fake.entitlements_for(body.get("plan", "none"))
+            self._json(200, fake.document(match.group(1)))
+
+        def log_message(self, format, *args):
+            stdout.write(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for the RevenueCat subscribers API, for exercising /subscriptions/sync/ without "
+        "RevenueCat. Point REVENUECAT_API_BASE_URL at it. POST /fake/subscribers/<id> with {\"plan\": ...} "
+        "changes a user's entitlements; /fake/stats reports upstream calls per user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8766)
+        parser.add_argument("--plan", default="creator", help="Entitlement returned for unknown users: master, creator or none.")
+        parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to each subscriber lookup.")
+
+    def handle(self, *args, **options):
+        fake = FakeRevenueCat(options["plan"], options["latency_ms"] / 1000)
+        server = ThreadingHTTPServer((options["host"], options["port"]), make_handler(fake, self.stdout))
+        self.stdout.write(self.style.SUCCESS(f"Fake RevenueCat server on http://{options['host']}:{options['port']}"))
+        self.stdout.write(f"  REVENUECAT_API_BASE_URL=http://{options['host']}:{options['port']}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from subscription.models import ProcessedWebhookEvent, Subscription
+from subscription.services import process_user_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-runs stored RevenueCat webhook events through the subscription processor. Selected events are reset "
+        "to pending and applied per user in event-time order. Without --all-statuses only failed and ignored "
+        "events are picked up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event-id", action="append", default=[], help="Event id to replay; repeatable.")
+        parser.add_argument("--app-user-id", action="append", default=[], help="Replay events for this user; repeatable.")
+        parser.add_argument("--since", help="Only events received at or after this ISO 8601 datetime.")
+        parser.add_argument("--all-statuses", action="store_true", help="Include events that were already processed.")
+        parser.add_argument(
+            "--reset-ordering", action="store_true",
+            help="Forget each user's last applied event time, so replayed events older than it are applied too.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        events = ProcessedWebhookEvent.objects.exclude(app_user_id="").exclude(payload=None)
+        if options["event_id"]:
+            events = events.filter(event_id__in=options["event_id"])
+        if options["app_user_id"]:
+            events = events.filter(app_user_id__in=options["app_user_id"])
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError(f"Could not parse --since '{options['since']}'.")
+            events = events.filter(received_at__gte=since)
+        if not options["all_statuses"]:
+            events = events.filter(status__in=(ProcessedWebhookEvent.Status.FAILED, ProcessedWebhookEvent.Status.IGNORED))
+        if not (options["event_id"] or options["app_user_id"] or options["since"]):
+            raise CommandError("Select events with --event-id, --app-user-id or --since.")
+
+        app_user_ids = sorted(set(events.values_list("app_user_id", flat=True)))
+        count = events.count()
+        self.stdout.write(f"{count} event(s) across {len(app_user_ids)} user(s) selected.")
+        if options["dry_run"] or not count:
+            return
+
+        events.update(status=ProcessedWebhookEvent.Status.PENDING, attempts=0, error="", processed_at=None)
+        if options["reset_ordering"]:
+            Subscription.objects.filter(user_id__in=[int(i) for i in app_user_ids if i.isdigit()]).update(last_event_ms=None)
+
+        failed = 0
+        for app_user_id in app_user_ids:
+            try:
+                process_user_events(app_user_id)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"app_user_id '{app_user_id}' failed: {e}")
+
+        summary = f"Replayed {count} event(s) for {len(app_user_ids) - failed} user(s)."
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(f"{summary} {failed} failed."))
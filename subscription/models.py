@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class Subscription(models.Model):
     PLAN_CHOICES = [
@@ -22,17 +23,45 @@ class Subscription(models.Model):
     trial_end = models.DateTimeField(null=True, blank=True)
     current_period_end = models.DateTimeField(null=True, blank=True)
     canceled_at = models.DateTimeField(null=True, blank=True)
+    # event_timestamp_ms of the newest RevenueCat event applied; older events arriving late are skipped.
+    last_event_ms = models.BigIntegerField(null=True, blank=True)
+    last_reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "trial_end"], name="subscription_trial_end_idx"),
+            models.Index(fields=["status", "current_period_end"], name="subscription_period_end_idx"),
+            models.Index(fields=["status", "last_reconciled_at"], name="subscription_reconcile_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.plan} ({self.status})"
 
 class ProcessedWebhookEvent(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        IGNORED = "ignored", "Ignored"
+        FAILED = "failed", "Failed"
+
     event_id = models.CharField(max_length=255, unique=True)
-    processed_at = models.DateTimeField(auto_now_add=True)
+    app_user_id = models.CharField(max_length=255, blank=True, default="")
+    event_type = models.CharField(max_length=50, blank=True, default="")
+    event_timestamp_ms = models.BigIntegerField(null=True, blank=True)
+    payload = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = "Processed Webhook Event"
         verbose_name_plural = "Processed Webhook Events"
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="webhook_event_status_idx"),
+            models.Index(fields=["app_user_id", "status"], name="webhook_event_user_idx"),
+        ]
 
     def __str__(self):
         return self.event_id
\ No newline at end of file
@@ -0,0 +1,204 @@
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Subscription
+from .services import CREATOR_IDENTIFIERS, MASTER_IDENTIFIERS
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_KEY = "revenuecat_subscriber_{app_user_id}"
+SYNC_LOCK_KEY = "revenuecat_sync_lock_{app_user_id}"
+NOT_FOUND = "not_found"
+SYNCED_FIELDS = ("status", "plan", "current_period_end", "revenue_cat_id")
+# What a concurrent write (a webhook, a user-triggered sync, the expiry sweep) would change.
+RECONCILE_GUARD_FIELDS = SYNCED_FIELDS + ("last_event_ms",)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class SubscriberNotFound(Exception):
+    pass
+
+
+class RevenueCatUnavailable(Exception):
+    pass
+
+
+def get_client() -> httpx.Client:
+    """One keep-alive connection pool per process for RevenueCat API calls."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    base_url=settings.REVENUECAT_API_BASE_URL,
+                    headers={"Authorization": f"Bearer {settings.REVENUECAT_API_KEY}"},
+                    timeout=settings.REVENUECAT_API_TIMEOUT,
+                    limits=httpx.Limits(max_connections=settings.REVENUECAT_API_POOL_SIZE, max_keepalive_connections=settings.REVENUECAT_API_POOL_SIZE),
+                )
+    return _client
+
+
+def invalidate_subscriber(app_user_id):
+    cache.delete(SUBSCRIBER_KEY.format(app_user_id=app_user_id))
+
+
+def _active_entitlement(entitlements: dict, identifiers) -> tuple[bool, datetime.datetime | None]:
+    for ident in identifiers:
+        ent = entitlements.get(ident)
+        if not ent:
+            continue
+        expires_date_str = ent.get("expires_date")
+        if not expires_date_str:
+            return True, None
+        expires_date = datetime.datetime.fromisoformat(expires_date_str.replace('Z', '+00:00'))
+        if expires_date > timezone.now():
+            return True, expires_date
+    return False, None
+
+
+def apply_subscriber(subscription: Subscription, subscriber: dict, app_user_id: str) -> bool:
+    """Maps a subscriber document onto `subscription`. Saves, and returns True, only when something changed,
+    so an unchanged sync doesn't invalidate the user's access tokens."""
+    before = tuple(getattr(subscription, f) for f in SYNCED_FIELDS)
+    entitlements = subscriber.get('entitlements', {})
+
+    active_plan, max_expiration = None, None
+    for plan, identifiers in (("master", MASTER_IDENTIFIERS), ("creator", CREATOR_IDENTIFIERS)):
+        active, expiration = _active_entitlement(entitlements, identifiers)
+        if active:
+            active_plan, max_expiration = plan, expiration
+            break
+
+    if active_plan:
+        subscription.status = 'active'
+        subscription.plan = active_plan
+        if max_expiration:
+            subscription.current_period_end = max_expiration
+    elif subscription.status == 'active':
+        subscription.status = 'expired'
+        subscription.plan = 'trial'
+        subscription.current_period_end = timezone.now()
+
+    subscription.revenue_cat_id = app_user_id
+    if tuple(getattr(subscription, f) for f in SYNCED_FIELDS) == before:
+        return False
+    subscription.save(update_fields=list(SYNCED_FIELDS))
+    return True
+
+
+def _fetch(app_user_id: str):
+    try:
+        response = get_client().get(f"/subscribers/{app_user_id}")
+    except httpx.HTTPError as e:
+        raise RevenueCatUnavailable(str(e))
+    if response.status_code == 404:
+        return NOT_FOUND
+    if response.status_code != 200:
+        raise RevenueCatUnavailable(f"RevenueCat returned {response.status_code}")
+    return response.json().get('subscriber', {})
+
+
+def _result(document, user) -> Subscription:
+    if document == NOT_FOUND:
+        raise SubscriberNotFound()
+    subscription, _ = Subscription.objects.get_or_create(user=user)
+    return subscription
+
+
+def sync(user) -> Subscription:
+    """Returns the user's subscription, refreshed from RevenueCat unless it was synced in the last
+    REVENUECAT_SUBSCRIBER_CACHE_SECONDS.
+
+    Concurrent calls for one user make a single upstream request: the first takes a lock and fetches,
+    the rest wait for its result to land in the cache."""
+    app_user_id = str(user.id)
+    key = SUBSCRIBER_KEY.format(app_user_id=app_user_id)
+
+    document = cache.get(key)
+    if document is not None:
+        return _result(document, user)
+
+    lock_key = SYNC_LOCK_KEY.format(app_user_id=app_user_id)
+    if cache.add(lock_key, 1, timeout=int(settings.REVENUECAT_API_TIMEOUT) + 5):
+        try:
+            document = _fetch(app_user_id)
+            if document != NOT_FOUND:
+                subscription, _ = Subscription.objects.get_or_create(user=user)
+                apply_subscriber(subscription, document, app_user_id)
+            cache.set(key, document, timeout=settings.REVENUECAT_SUBSCRIBER_CACHE_SECONDS)
+            return _result(document, user)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + settings.REVENUECAT_API_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        document = cache.get(key)
+        if document is not None:
+            return _result(document, user)
+        if not cache.get(lock_key):
+            break
+    # The leader failed or is still waiting on RevenueCat; the stored state is the best answer available.
+    logger.info(f"RevenueCat sync for user {app_user_id} did not finish in time; returning stored subscription.")
+    subscription, _ = Subscription.objects.get_or_create(user=user)
+    return subscription
+
+
+def _fetch_quietly(app_user_id: str):
+    try:
+        return _fetch(app_user_id)
+    except RevenueCatUnavailable as e:
+        logger.warning(f"RevenueCat reconcile fetch failed for user {app_user_id}: {e}")
+        return None
+
+
+def reconcile(limit: int | None = None) -> int:
+    """Re-checks the least recently reconciled active subscriptions against RevenueCat, a slice per run.
+
+    Fetches run on a small thread pool sharing the pooled client, so a run costs at most
+    REVENUECAT_RECONCILE_CONCURRENCY parallel requests. Each row is then re-read under a row lock, and
+    skipped if anything changed it while the fetches ran: the fetched document may predate that write.
+    Returns the number of subscriptions changed."""
+    limit = limit or settings.REVENUECAT_RECONCILE_BATCH_SIZE
+    subscriptions = list(
+        Subscription.objects.filter(status='active')
+        .order_by(F('last_reconciled_at').asc(nulls_first=True), 'pk')[:limit]
+    )
+    if not subscriptions:
+        return 0
+
+    app_user_ids = [str(s.user_id) for s in subscriptions]
+    with ThreadPoolExecutor(max_workers=settings.REVENUECAT_RECONCILE_CONCURRENCY) as pool:
+        documents = list(pool.map(_fetch_quietly, app_user_ids))
+
+    changed = 0
+    reconciled = []
+    for subscription, app_user_id, document in zip(subscriptions, app_user_ids, documents):
+        if document is None:
+            continue
+        if document == NOT_FOUND:
+            reconciled.append(subscription.pk)
+            continue
+        before = tuple(getattr(subscription, f) for f in RECONCILE_GUARD_FIELDS)
+        with transaction.atomic():
+            current = Subscription.objects.select_for_update().filter(pk=subscription.pk).first()
+            if current is None or tuple(getattr(current, f) for f in RECONCILE_GUARD_FIELDS) != before:
+                logger.info(f"Subscription for user {app_user_id} changed during reconcile; leaving it for the next run.")
+                continue
+            if apply_subscriber(current, document, app_user_id):
+                changed += 1
+        reconciled.append(subscription.pk)
+        cache.set(SUBSCRIBER_KEY.format(app_user_id=app_user_id), document, timeout=settings.REVENUECAT_SUBSCRIBER_CACHE_SECONDS)
+
+    Subscription.objects.filter(pk__in=reconciled).update(last_reconciled_at=timezone.now())
+    return changed
@@ -0,0 +1,222 @@
+import datetime
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from authentication.caching import invalidate_profile
+from authentication.entitlements import bump_entitlements
+from authentication.identity import invalidate_identity
+from magictale.realtime import send_to_user
+from .models import Subscription, ProcessedWebhookEvent
+from .serializers import SubscriptionSerializer
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+Status = ProcessedWebhookEvent.Status
+QUEUED_KEY = "revenuecat_events_queued_{app_user_id}"
+
+MASTER_IDENTIFIERS = ["pro max", "pro_max", "master", "story_master", "story master"]
+CREATOR_IDENTIFIERS = ["pro", "creator", "story_creator", "story creator"]
+UPDATE_TYPES = ['INITIAL_PURCHASE', 'RENEWAL', 'UNCANCELLATION', 'PRODUCT_CHANGE', 'TEST']
+
+
+def send_subscription_update(subscription):
+    serializer = SubscriptionSerializer(subscription)
+    send_to_user(subscription.user_id, {"type": "send_subscription_update", "status_data": serializer.data})
+
+
+def store_event(payload: dict) -> ProcessedWebhookEvent | None:
+    """Persists a raw webhook payload in one insert. Returns None for an event id already stored."""
+    event = payload.get('event', {})
+    try:
+        with transaction.atomic():
+            return ProcessedWebhookEvent.objects.create(
+                event_id=event['id'],
+                app_user_id=str(event.get('app_user_id') or ''),
+                event_type=event.get('type') or '',
+                event_timestamp_ms=event.get('event_timestamp_ms'),
+                payload=payload,
+            )
+    except IntegrityError:
+        return None
+
+
+def enqueue(app_user_id: str):
+    """Queues processing for a user unless a run is already queued, so a burst of events costs one task."""
+    from .tasks import process_subscription_events_task
+
+    if cache.add(QUEUED_KEY.format(app_user_id=app_user_id), 1, timeout=settings.REVENUECAT_WEBHOOK_QUEUED_SECONDS):
+        process_subscription_events_task.delay(app_user_id)
+
+
+def _plan_for(entitlement_ids) -> str:
+    if any(id in entitlement_ids for id in MASTER_IDENTIFIERS):
+        return "master"
+    if any(id in entitlement_ids for id in CREATOR_IDENTIFIERS):
+        return "creator"
+    return "trial"
+
+
+def apply_event(subscription: Subscription, event: dict):
+    event_type = event.get('type')
+    entitlement_ids = event.get('entitlement_ids') or []
+    expiration_at_ms = event.get('expiration_at_ms')
+    new_plan = _plan_for(entitlement_ids)
+
+    logger.info(f"Processing event {event_type} for User {subscription.user_id}. Entitlements: {entitlement_ids}. Detected Plan: {new_plan}")
+
+    if event_type in UPDATE_TYPES:
+        subscription.status = 'active'
+        subscription.plan = new_plan
+        if expiration_at_ms:
+            subscription.current_period_end = datetime.datetime.fromtimestamp(
+                expiration_at_ms / 1000.0,
+                tz=datetime.timezone.utc
+            )
+        elif event_type == 'TEST':
+            subscription.current_period_end = timezone.now() + datetime.timedelta(days=30)
+
+    elif event_type == 'CANCELLATION':
+        logger.info(f"User {subscription.user_id} cancelled. Status remains active until expiration.")
+
+    elif event_type == 'EXPIRATION':
+        subscription.status = 'expired'
+        subscription.plan = 'trial'
+        subscription.current_period_end = timezone.now()
+
+    subscription.revenue_cat_id = event.get('app_user_id')
+
+
+def _outstanding(app_user_id: str):
+    return ProcessedWebhookEvent.objects.filter(
+        app_user_id=app_user_id,
+        status__in=(Status.PENDING, Status.FAILED),
+        attempts__lt=settings.REVENUECAT_WEBHOOK_MAX_ATTEMPTS,
+    )
+
+
+def _finish(events, status, error=""):
+    ProcessedWebhookEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+        status=status, error=error, processed_at=timezone.now()
+    )
+
+
+def process_user_events(app_user_id: str) -> int:
+    """Applies a user's pending events in event-time order while holding their subscription row lock.
+
+    Concurrent runs for the same user queue behind the lock, and an event older than the last one applied
+    (a late renewal after an expiration) is recorded as ignored, so the outcome never depends on delivery
+    order. Returns the number of events handled."""
+    if not app_user_id.isdigit() or not User.objects.filter(pk=int(app_user_id)).exists():
+        ignored = _outstanding(app_user_id).update(
+            status=Status.IGNORED, error="Unknown app_user_id", processed_at=timezone.now()
+        )
+        if ignored:
+            logger.info(f"Ignored {ignored} RevenueCat event(s) for unknown app_user_id '{app_user_id}'")
+        return ignored
+
+    events = []
+    try:
+        with transaction.atomic():
+            Subscription.objects.get_or_create(user_id=int(app_user_id))
+            subscription = Subscription.objects.select_for_update().get(user_id=int(app_user_id))
+            # Read under the lock so a run that waited never re-applies what the previous one finished.
+            events = list(_outstanding(app_user_id).order_by('event_timestamp_ms', 'id'))
+
+            applied, stale = [], []
+            for stored in events:
+                event = (stored.payload or {}).get('event', {})
+                if stored.event_timestamp_ms is not None and subscription.last_event_ms is not None \
+                        and stored.event_timestamp_ms < subscription.last_event_ms:
+                    stale.append(stored)
+                    continue
+                apply_event(subscription, event)
+                if stored.event_timestamp_ms is not None:
+                    subscription.last_event_ms = stored.event_timestamp_ms
+                applied.append(stored)
+
+            if applied:
+                from .revenuecat import invalidate_subscriber
+
+                subscription.save()
+                transaction.on_commit(lambda: send_subscription_update(subscription))
+                # The next /sync should see this event rather than a subscriber document fetched before it.
+                transaction.on_commit(lambda: invalidate_subscriber(app_user_id))
+            _finish(applied, Status.PROCESSED)
+            _finish(stale, Status.IGNORED, "Older than the last applied event")
+    except Exception as e:
+        logger.error(f"Failed to process RevenueCat events for app_user_id '{app_user_id}': {e}")
+        ProcessedWebhookEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+            status=Status.FAILED, error=str(e), attempts=F('attempts') + 1
+        )
+        raise
+
+    if applied:
+        logger.info(f"Updated subscription for User {app_user_id} to {subscription.plan} via RevenueCat.")
+    return len(events)
+
+
+def drain(limit: int | None = None) -> int:
+    """Processes users with outstanding events, oldest first. Picks up events whose task was lost or failed."""
+    limit = limit or settings.REVENUECAT_WEBHOOK_DRAIN_BATCH_SIZE
+    # Events without a user (and rows stored before payloads were kept) have nothing to apply.
+    ProcessedWebhookEvent.objects.filter(status=Status.PENDING, app_user_id="").update(
+        status=Status.IGNORED, processed_at=timezone.now()
+    )
+    app_user_ids = list(
+        ProcessedWebhookEvent.objects
+        .filter(status__in=(Status.PENDING, Status.FAILED), attempts__lt=settings.REVENUECAT_WEBHOOK_MAX_ATTEMPTS)
+        .values('app_user_id').annotate(first=Min('received_at')).order_by('first')
+        .values_list('app_user_id', flat=True)[:limit]
+    )
+    handled = 0
+    for app_user_id in app_user_ids:
+        try:
+            handled += process_user_events(app_user_id)
+        except Exception:
+            continue
+    return handled
+
+
+def _after_bulk_update(pks):
+    # queryset.update() skips the post_save handlers that normally drop cached state and stale token claims.
+    from .revenuecat import invalidate_subscriber
+
+    for subscription in Subscription.objects.filter(pk__in=pks):
+        invalidate_identity(subscription.user_id)
+        invalidate_profile(subscription.user_id)
+        bump_entitlements(subscription.user_id)
+        invalidate_subscriber(subscription.user_id)
+        send_subscription_update(subscription)
+
+
+def expire_lapsed(now=None) -> int:
+    """Moves trials past trial_end and paid plans past current_period_end (plus a grace period for late
+    renewal webhooks) to expired, in batches of bulk updates over the (status, date) indexes."""
+    now = now or timezone.now()
+    batch_size = settings.SUBSCRIPTION_EXPIRY_BATCH_SIZE
+    sweeps = (
+        Q(status='trialing', trial_end__lte=now),
+        Q(status='active', current_period_end__lte=now - timedelta(seconds=settings.SUBSCRIPTION_EXPIRY_GRACE_SECONDS)),
+    )
+    expired = 0
+    for condition in sweeps:
+        while True:
+            with transaction.atomic():
+                # Locked in the same transaction as the update, so every selected row is one it changes;
+                # rows a webhook or sync is writing right now are left for the next batch or run.
+                pks = list(
+                    Subscription.objects.select_for_update(skip_locked=True)
+                    .filter(condition).values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                updated = Subscription.objects.filter(pk__in=pks).update(status='expired', plan='trial')
+                transaction.on_commit(lambda pks=pks: _after_bulk_update(pks))
+            expired += updated
+    return expired
@@ -0,0 +1,42 @@
+from celery import shared_task
+from django.core.cache import cache
+import logging
+from . import revenuecat, services
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def process_subscription_events_task(app_user_id):
+    # Clear the queued marker first so events arriving mid-run queue another pass.
+    cache.delete(services.QUEUED_KEY.format(app_user_id=app_user_id))
+    try:
+        services.process_user_events(app_user_id)
+    except Exception as e:
+        logger.error(f"RevenueCat events for app_user_id '{app_user_id}' failed; the drain will retry: {e}")
+
+@shared_task
+def drain_subscription_events_task():
+    try:
+        handled = services.drain()
+        if handled:
+            logger.info(f"Drained {handled} outstanding RevenueCat event(s).")
+    except Exception as e:
+        logger.error(f"Failed to drain RevenueCat events: {e}")
+
+@shared_task
+def expire_subscriptions_task():
+    try:
+        expired = services.expire_lapsed()
+        if expired:
+            logger.info(f"Expired {expired} lapsed trial(s) and subscription(s).")
+    except Exception as e:
+        logger.error(f"Failed to expire lapsed subscriptions: {e}")
+
+@shared_task
+def reconcile_subscriptions_task():
+    try:
+        changed = revenuecat.reconcile()
+        if changed:
+            logger.info(f"Reconciled {changed} subscription(s) with RevenueCat.")
+    except Exception as e:
+        logger.error(f"Failed to reconcile subscriptions with RevenueCat: {e}")
@@ -1,3 +1,183 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from . import revenuecat, services, webhooks
+from .models import ProcessedWebhookEvent, Subscription
+
+Status = ProcessedWebhookEvent.Status
+
+
+class InlinePool:
+    # Runs reconcile's fetches on the test thread, which the SQLite test database needs for writes.
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+def subscriber_document(plan_entitlement: str, expires_in: timedelta) -> dict:
+    expires = (timezone.now() + expires_in).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"entitlements": {plan_entitlement: {"expires_date": expires}}}
+
+
+class ReconcileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="payer", email="payer@example.com", password="x")
+        Subscription.objects.filter(user=self.user).update(
+            status="active", plan="creator", current_period_end=timezone.now() + timedelta(days=3),
+        )
+        self.creator_entitlement = revenuecat.CREATOR_IDENTIFIERS[0]
+        self.master_entitlement = revenuecat.MASTER_IDENTIFIERS[0]
+
+    def test_applies_the_fetched_document(self):
+        document = subscriber_document(self.master_entitlement, timedelta(days=30))
+        with mock.patch.object(revenuecat, "_fetch", return_value=document):
+            self.assertEqual(revenuecat.reconcile(), 1)
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertEqual(subscription.plan, "master")
+        self.assertIsNotNone(subscription.last_reconciled_at)
+
+    def test_webhook_during_fetch_is_not_overwritten(self):
+        def fetch_while_webhook_lands(app_user_id):
+            # An EXPIRATION processed while the reconcile request is in flight.
+            Subscription.objects.filter(user=self.user).update(
+                status="expired", plan="trial", last_event_ms=int(timezone.now().timestamp() * 1000),
+            )
+            return subscriber_document(self.creator_entitlement, timedelta(days=3))
+
+        with mock.patch.object(revenuecat, "_fetch", side_effect=fetch_while_webhook_lands), \
+                mock.patch.object(revenuecat, "ThreadPoolExecutor", InlinePool):
+            self.assertEqual(revenuecat.reconcile(), 0)
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertEqual((subscription.status, subscription.plan), ("expired", "trial"))
+        self.assertIsNone(subscription.last_reconciled_at)
+
+
+class ExpireLapsedTests(TestCase):
+    def test_only_lapsed_rows_are_expired_and_refreshed(self):
+        now = timezone.now()
+        lapsed, current = (
+            User.objects.create_user(username=name, email=f"{name}@example.com", password="x")
+            for name in ("lapsed", "current")
+        )
+        Subscription.objects.filter(user=lapsed).update(trial_end=now - timedelta(minutes=1))
+        Subscription.objects.filter(user=current).update(trial_end=now + timedelta(days=3))
+
+        with mock.patch.object(services, "_after_bulk_update") as after, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(services.expire_lapsed(now), 1)
+
+        after.assert_called_once_with([lapsed.subscription.pk])
+        self.assertEqual(Subscription.objects.get(user=lapsed).status, "expired")
+        self.assertEqual(Subscription.objects.get(user=current).status, "trialing")
+
+
+@override_settings(REVENUECAT_WEBHOOK_AUTH_HEADER="Bearer test-secret")
+class WebhookEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="subscriber", email="subscriber@example.com", password="x")
+        self.app_user_id = str(self.user.pk)
+        self.now_ms = int(timezone.now().timestamp() * 1000)
+        self.client = Client(HTTP_HOST="localhost", secure=True)
+
+    def _payload(self, event_id: str, event_type: str, offset_ms: int) -> dict:
+        return {"event": {
+            "id": event_id, "type": event_type, "app_user_id": self.app_user_id,
+            "event_timestamp_ms": self.now_ms + offset_ms,
+            "entitlement_ids": [services.MASTER_IDENTIFIERS[0]],
+            "expiration_at_ms": self.now_ms + 30 * 24 * 3600 * 1000,
+        }}
+
+    def _post(self, payload: dict):
+        with mock.patch.object(webhooks, "enqueue") as enqueue:
+            response = self.client.post(
+                "/api/subscriptions/webhooks/revenuecat/", data=json.dumps(payload),
+                content_type="application/json", HTTP_AUTHORIZATION="Bearer test-secret",
+            )
+        self.assertEqual(response.status_code, 200)
+        return enqueue
+
+    def _subscription(self):
+        subscription = Subscription.objects.get(user=self.user)
+        return subscription.status, subscription.plan
+
+    def _status(self, event_id: str) -> str:
+        return ProcessedWebhookEvent.objects.get(event_id=event_id).status
+
+    def test_ingest_stores_the_event_and_queues_the_user(self):
+        enqueue = self._post(self._payload("evt-renewal", "RENEWAL", 0))
+
+        enqueue.assert_called_once_with(self.app_user_id)
+        self.assertEqual(self._status("evt-renewal"), Status.PENDING)
+        self.assertEqual(services.process_user_events(self.app_user_id), 1)
+        self.assertEqual(self._subscription(), ("active", "master"))
+
+    def test_duplicate_event_id_is_stored_and_applied_once(self):
+        self._post(self._payload("evt-renewal", "RENEWAL", 0))
+        services.process_user_events(self.app_user_id)
+
+        enqueue = self._post(self._payload("evt-renewal", "RENEWAL", 0))
+
+        enqueue.assert_not_called()
+        self.assertEqual(ProcessedWebhookEvent.objects.filter(event_id="evt-renewal").count(), 1)
+        self.assertEqual(services.process_user_events(self.app_user_id), 0)
+
+    def test_events_delivered_out_of_order_are_applied_in_event_time_order(self):
+        self._post(self._payload("evt-expiration", "EXPIRATION", 1000))
+        self._post(self._payload("evt-renewal", "RENEWAL", 0))
+
+        self.assertEqual(services.process_user_events(self.app_user_id), 2)
+
+        self.assertEqual(self._subscription(), ("expired", "trial"))
+        self.assertEqual(self._status("evt-renewal"), Status.PROCESSED)
+        self.assertEqual(self._status("evt-expiration"), Status.PROCESSED)
+
+    def test_late_renewal_after_an_applied_expiration_is_ignored(self):
+        self._post(self._payload("evt-expiration", "EXPIRATION", 1000))
+        services.process_user_events(self.app_user_id)
+        self._post(self._payload("evt-renewal", "RENEWAL", 0))
+        services.process_user_events(self.app_user_id)
+
+        self.assertEqual(self._subscription(), ("expired", "trial"))
+        self.assertEqual(self._status("evt-renewal"), Status.IGNORED)
+
+    def test_replay_applies_failed_events(self):
+        self._post(self._payload("evt-renewal", "RENEWAL", 0))
+        with mock.patch.object(services, "apply_event", side_effect=RuntimeError("bad payload")):
+            with self.assertRaises(RuntimeError):
+                services.process_user_events(self.app_user_id)
+        self.assertEqual(self._status("evt-renewal"), Status.FAILED)
+
+        call_command("replay_webhook_events", app_user_id=[self.app_user_id], stdout=StringIO())
+
+        self.assertEqual(self._status("evt-renewal"), Status.PROCESSED)
+        self.assertEqual(self._subscription(), ("active", "master"))
+
+    def test_replay_keeps_event_order_unless_told_to_reset_it(self):
+        self._post(self._payload("evt-expiration", "EXPIRATION", 1000))
+        services.process_user_events(self.app_user_id)
+        self._post(self._payload("evt-renewal", "RENEWAL", 0))
+        services.process_user_events(self.app_user_id)
+
+        call_command("replay_webhook_events", event_id=["evt-renewal"], stdout=StringIO())
+        self.assertEqual(self._status("evt-renewal"), Status.IGNORED)
+        self.assertEqual(self._subscription(), ("expired", "trial"))
+
+        call_command("replay_webhook_events", event_id=["evt-renewal"], reset_ordering=True, stdout=StringIO())
+        self.assertEqual(self._status("evt-renewal"), Status.PROCESSED)
+        self.assertEqual(self._subscription(), ("active", "master"))
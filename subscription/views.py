@@ -1,16 +1,16 @@
-import requests
-import datetime
-from django.conf import settings
-from django.utils import timezone
+import logging
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Subscription
 from .serializers import SubscriptionSerializer
+from . import revenuecat
 from django.utils.translation import gettext as _
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
+logger = logging.getLogger(__name__)
+
 @extend_schema(
     parameters=[OpenApiParameter("id", OpenApiTypes.INT, OpenApiParameter.PATH, description="ID of the subscription")],
 )
@@ -29,82 +29,11 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"], url_path='sync')
     def sync_subscription(self, request):
-        user = request.user
-        app_user_id = str(user.id)
-        
-        headers = {
-            "Authorization": f"Bearer {settings.REVENUECAT_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        url = f"https://api.revenuecat.com/v1/subscribers/{app_user_id}"
-        
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                subscriber = data.get('subscriber', {})
-                entitlements = subscriber.get('entitlements', {})
-                
-                subscription, _ = Subscription.objects.get_or_create(user=user)
-                
-                active_plan = None
-                max_expiration = None
-                
-                master_identifiers = ["pro max", "pro_max", "master", "story_master", "story master"]
-                creator_identifiers = ["pro", "creator", "story_creator", "story creator"]
-
-                for ident in master_identifiers:
-                    ent = entitlements.get(ident)
-                    if ent:
-                        expires_date_str = ent.get("expires_date")
-                        if expires_date_str:
-                            expires_date = datetime.datetime.fromisoformat(expires_date_str.replace('Z', '+00:00'))
-                            if expires_date > timezone.now():
-                                active_plan = "master"
-                                max_expiration = expires_date
-                                break
-                        else:
-                            active_plan = "master"
-                            break
-
-                if not active_plan:
-                    for ident in creator_identifiers:
-                        ent = entitlements.get(ident)
-                        if ent:
-                            expires_date_str = ent.get("expires_date")
-                            if expires_date_str:
-                                expires_date = datetime.datetime.fromisoformat(expires_date_str.replace('Z', '+00:00'))
-                                if expires_date > timezone.now():
-                                    active_plan = "creator"
-                                    max_expiration = expires_date
-                                    break
-                            else:
-                                active_plan = "creator"
-                                break
-
-                if active_plan:
-                    subscription.status = 'active'
-                    subscription.plan = active_plan
-                    if max_expiration:
-                        subscription.current_period_end = max_expiration
-                else:
-                    if subscription.status == 'active':
-                        subscription.status = 'expired'
-                        subscription.plan = 'trial'
-                        subscription.current_period_end = timezone.now()
-                
-                subscription.revenue_cat_id = app_user_id
-                subscription.save()
-                
-                return Response(SubscriptionSerializer(subscription).data, status=status.HTTP_200_OK)
-            
-            elif response.status_code == 404:
-                return Response({"detail": _("User not found in RevenueCat")}, status=status.HTTP_404_NOT_FOUND)
-            
-            else:
-                return Response({"detail": _("Failed to connect to RevenueCat")}, status=status.HTTP_502_BAD_GATEWAY)
-
-        except Exception as e:
-            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            subscription = revenuecat.sync(request.user)
+        except revenuecat.SubscriberNotFound:
+            return Response({"detail": _("User not found in RevenueCat")}, status=status.HTTP_404_NOT_FOUND)
+        except revenuecat.RevenueCatUnavailable as e:
+            logger.warning(f"RevenueCat sync failed for user {request.user.id}: {e}")
+            return Response({"detail": _("Failed to connect to RevenueCat")}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(SubscriptionSerializer(subscription).data, status=status.HTTP_200_OK)
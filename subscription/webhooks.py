@@ -1,36 +1,15 @@
 import logging
 import json
-import datetime
 from django.conf import settings
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
-from django.contrib.auth import get_user_model
-from django.db import IntegrityError
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import AllowAny
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
-from .models import Subscription, ProcessedWebhookEvent
-from .serializers import SubscriptionSerializer
+from .services import enqueue, store_event
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
-
-def _send_subscription_update(subscription):
-    try:
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            serializer = SubscriptionSerializer(subscription)
-            user_group_name = f"user_{subscription.user.id}"
-            async_to_sync(channel_layer.group_send)(
-                user_group_name,
-                {"type": "send_subscription_update", "status_data": serializer.data}
-            )
-    except Exception as e:
-        logger.error(f"Error sending channel update: {e}")
 
 @extend_schema(
     request=None,
@@ -58,81 +37,27 @@ def revenuecat_webhook(request):
 
     try:
         payload = json.loads(request.body)
-        logger.info(f"RevenueCat Webhook received: {json.dumps(payload)}")
         event = payload.get('event', {})
         event_id = event.get('id')
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, AttributeError):
         return HttpResponseBadRequest("Invalid JSON")
 
     if not event_id:
         logger.warning("RevenueCat Webhook: Missing event ID in payload")
         return HttpResponse(status=200)
 
-    try:
-        ProcessedWebhookEvent.objects.create(event_id=event_id)
-    except IntegrityError:
-        logger.info(f"RevenueCat event {event_id} already processed.")
-        return HttpResponse(status=200)
-
-    app_user_id = event.get('app_user_id')
-    event_type = event.get('type')
-
-    if not app_user_id:
-        logger.warning(f"RevenueCat Webhook: Missing app_user_id for event {event_type}")
-        return HttpResponse(status=200)
-
-    if not str(app_user_id).isdigit():
-        logger.info(f"Ignoring non-integer app_user_id: {app_user_id} for event {event_type}")
-        return HttpResponse(status=200)
-        
-    try:
-        user_id = int(app_user_id)
-        user = User.objects.get(id=user_id)
-    except (ValueError, TypeError, User.DoesNotExist):
-        logger.error(f"RevenueCat Webhook: Could not find Django User for app_user_id='{app_user_id}'")
+    # Only persist here; RevenueCat retries slow responses, so the subscription update runs in a worker.
+    stored = store_event(payload)
+    if stored is None:
+        logger.info(f"RevenueCat event {event_id} already received.")
         return HttpResponse(status=200)
 
-    entitlement_ids = event.get('entitlement_ids', [])
-    expiration_at_ms = event.get('expiration_at_ms')
-    
-    subscription, _ = Subscription.objects.get_or_create(user=user)
-    
-    new_plan = "trial" 
-    master_identifiers = ["pro max", "pro_max", "master", "story_master", "story master"]
-    creator_identifiers = ["pro", "creator", "story_creator", "story creator"]
-    
-    if any(id in entitlement_ids for id in master_identifiers):
-        new_plan = "master"
-    elif any(id in entitlement_ids for id in creator_identifiers):
-        new_plan = "creator"
-
-    logger.info(f"Processing event {event_type} for User {user.id}. Entitlements: {entitlement_ids}. Detected Plan: {new_plan}")
-
-    update_types = ['INITIAL_PURCHASE', 'RENEWAL', 'UNCANCELLATION', 'PRODUCT_CHANGE', 'TEST']
-    
-    if event_type in update_types:
-        subscription.status = 'active'
-        subscription.plan = new_plan
-        if expiration_at_ms:
-            subscription.current_period_end = datetime.datetime.fromtimestamp(
-                expiration_at_ms / 1000.0, 
-                tz=datetime.timezone.utc
-            )
-        elif event_type == 'TEST' and not expiration_at_ms:
-            subscription.current_period_end = timezone.now() + datetime.timedelta(days=30)
-        
-    elif event_type in ['CANCELLATION']:
-        logger.info(f"User {user.id} cancelled. Status remains active until expiration.")
-        
-    elif event_type in ['EXPIRATION']:
-        subscription.status = 'expired'
-        subscription.plan = 'trial'
-        subscription.current_period_end = timezone.now()
-
-    subscription.revenue_cat_id = app_user_id
-    subscription.save()
-    
-    logger.info(f"Updated subscription for User {user.id} to {subscription.plan} via RevenueCat.")
-    _send_subscription_update(subscription)
+    logger.info(f"RevenueCat Webhook received {stored.event_type} event {event_id} for app_user_id '{stored.app_user_id}'")
+    if stored.app_user_id:
+        try:
+            enqueue(stored.app_user_id)
+        except Exception as e:
+            # The event is stored; the periodic drain will pick it up.
+            logger.warning(f"Could not queue RevenueCat event {event_id}: {e}")
 
     return HttpResponse(status=200)
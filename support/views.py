@@ -9,6 +9,7 @@ from .serializers import UserReportSerializer, LegalDocumentSerializer
 from rest_framework.permissions import IsAdminUser
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework import serializers
+from magictale.api import conditional
 
 class UserReportViewSet(viewsets.ModelViewSet):
     queryset = UserReport.objects.all().order_by('-created_at')
@@ -46,8 +47,12 @@ class LegalDocumentView(APIView):
     @extend_schema(responses={200: LegalDocumentSerializer})
     def get(self, request, doc_type):
         document = get_object_or_404(LegalDocument, doc_type=doc_type)
+        etag = conditional.make_etag("legal", doc_type, document.last_updated.isoformat())
+        not_modified = conditional.evaluate(request, etag=etag, last_modified=document.last_updated)
+        if not_modified is not None:
+            return conditional.tag(not_modified, etag=etag, last_modified=document.last_updated, private=False)
         serializer = LegalDocumentSerializer(document)
-        return Response(serializer.data)
+        return conditional.tag(Response(serializer.data), etag=etag, last_modified=document.last_updated, private=False)
 
 class AdminLegalDocumentView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]